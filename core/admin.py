@@ -1,6 +1,8 @@
 from django.contrib import admin
-from .models import Issuer, StockPrice, IssuerNews
+from .models import Issuer, StockPrice, IssuerNews, IssuerQuote, DailySentiment
 
 admin.site.register(Issuer)
 admin.site.register(StockPrice)
-admin.site.register(IssuerNews)
\ No newline at end of file
+admin.site.register(IssuerNews)
+admin.site.register(IssuerQuote)
+admin.site.register(DailySentiment)
\ No newline at end of file
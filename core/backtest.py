@@ -0,0 +1,141 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from .technical_analysis import (
+    INDICATOR_NAMES, BUY, calculate_indicators, generate_signals, get_consensus_signal
+)
+
+TRADING_DAYS = 252
+
+METRICS = ['total_return', 'annual_return', 'hit_rate', 'trades', 'max_drawdown', 'turnover', 'exposure']
+
+def left_align(values: np.ndarray, valid: np.ndarray):
+    """Move each column's valid rows to the top; returns (aligned, order) for np.put_along_axis."""
+    order = np.argsort(~valid, axis=0, kind='stable')
+    return np.take_along_axis(values, order, axis=0), order
+
+def signal_positions(codes: np.ndarray) -> np.ndarray:
+    """Long/flat positions from signal codes: BUY enters, SELL exits, HOLD keeps the position."""
+    codes = np.asarray(codes)
+    rows = np.arange(len(codes)).reshape(-1, *([1] * (codes.ndim - 1)))
+    last_signal = np.maximum.accumulate(np.where(codes != 0, rows, 0), axis=0)
+    return (np.take_along_axis(codes, last_signal, axis=0) == BUY).astype(np.int8)
+
+def strategy_metrics(positions: np.ndarray, returns: np.ndarray, active: np.ndarray) -> Dict[str, np.ndarray]:
+    """Metrics of (T, N) long/flat positions held from one close to the next.
+
+    Args:
+        positions: Position after each bar's close (0 or 1)
+        returns: Simple return from the previous bar to each bar, NaN where missing
+        active: Boolean mask of the rows holding a bar (left-aligned columns)
+
+    Returns:
+        Dictionary of METRICS, one value per column
+    """
+    positions = positions * active
+    bars = active.sum(axis=0)
+    held = np.zeros(positions.shape, dtype=np.int8)
+    held[1:] = positions[:-1]
+    returns = np.nan_to_num(returns)
+    log_returns = np.log1p(held * returns)
+    equity = np.exp(np.cumsum(log_returns, axis=0))
+
+    years = np.maximum(bars, 1) / TRADING_DAYS
+    total_return = equity[-1] - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annual_return = np.where(bars > 1, (1 + total_return) ** (1 / years) - 1, np.nan)
+    max_drawdown = np.max(1 - equity / np.maximum.accumulate(equity, axis=0), axis=0)
+
+    # Each entry starts a trade; sum the log returns of every trade with one bincount
+    entries = np.diff(held, axis=0, prepend=0) == 1
+    trade_ids = np.cumsum(entries, axis=0) * held
+    length = len(held) + 1
+    flat_ids = (trade_ids + np.arange(held.shape[1]) * length).ravel()
+    trade_log_returns = np.bincount(flat_ids, weights=log_returns.ravel(), minlength=length * held.shape[1])
+    trade_log_returns = trade_log_returns.reshape(held.shape[1], length)[:, 1:]
+    trades = entries.sum(axis=0)
+    winners = (trade_log_returns > 0).sum(axis=1)
+
+    return {
+        'total_return': total_return,
+        'annual_return': annual_return,
+        'hit_rate': np.where(trades > 0, winners / np.maximum(trades, 1), np.nan),
+        'trades': trades,
+        'max_drawdown': max_drawdown,
+        'turnover': (np.abs(np.diff(positions, axis=0, prepend=0)) * active).sum(axis=0) / years,
+        'exposure': held.sum(axis=0) / np.maximum(bars, 1),
+    }
+
+def backtest_chunk(close: np.ndarray, high: np.ndarray, low: np.ndarray,
+                   periods: List[int]) -> Dict[str, Dict[str, np.ndarray]]:
+    """Backtest every indicator and the consensus for a block of issuers.
+
+    Runs in a worker process; the arrays are (dates x issuers) as returned
+    by load_price_matrix. Bars without a trade price are skipped.
+
+    Returns:
+        {strategy: {metric: per-issuer array}}, including 'buy_and_hold'
+    """
+    valid = np.isfinite(close) & (close > 0)
+    bars = valid.sum(axis=0)
+    close, _ = left_align(np.where(valid, close, np.nan), valid)
+    high, _ = left_align(high, valid)
+    low, _ = left_align(low, valid)
+    returns = np.full(close.shape, np.nan)
+    returns[1:] = close[1:] / close[:-1] - 1
+    active = np.arange(len(close))[:, None] < bars
+
+    results = {'buy_and_hold': strategy_metrics(active.astype(np.int8), returns, active)}
+    indicators = calculate_indicators({'close_price': close, 'high': high, 'low': low}, INDICATOR_NAMES, periods)
+    for period in periods:
+        signals = generate_signals(indicators[period], period)
+        signals[f'consensus_signal_{period}'] = get_consensus_signal(signals, period)
+        for column, codes in signals.items():
+            results[column.replace('_signal', '')] = strategy_metrics(signal_positions(codes), returns, active)
+    return results
+
+def run_backtest(close: np.ndarray, high: np.ndarray, low: np.ndarray, issuer_ids,
+                 periods: List[int] = [1, 5, 20], jobs: int = 1, chunk_size: int = None) -> pd.DataFrame:
+    """Backtest all strategies over all issuers, spreading issuer blocks across processes.
+
+    Work is vectorized across the issuers of a block, so by default every
+    worker gets one block of about len(issuer_ids) / jobs issuers.
+
+    Returns:
+        DataFrame with one row per (strategy, issuer) and METRICS columns
+    """
+    chunk_size = chunk_size or max(1, -(-close.shape[1] // jobs))
+    chunks = [slice(start, start + chunk_size) for start in range(0, close.shape[1], chunk_size)]
+    arguments = [(close[:, chunk], high[:, chunk], low[:, chunk], periods) for chunk in chunks]
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunk_results = list(executor.map(backtest_chunk, *zip(*arguments)))
+    else:
+        chunk_results = [backtest_chunk(*args) for args in arguments]
+
+    frames = []
+    for chunk, results in zip(chunks, chunk_results):
+        for strategy, metrics in results.items():
+            frame = pd.DataFrame(metrics)
+            frame.insert(0, 'issuer_id', np.asarray(issuer_ids)[chunk])
+            frame.insert(0, 'strategy', strategy)
+            frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+def summarize_backtest(report: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate per-issuer results into one row per strategy."""
+    traded = report[report['trades'] > 0]
+    summary = report.groupby('strategy').agg(
+        issuers=('issuer_id', 'count'),
+        mean_return=('total_return', 'mean'),
+        median_annual_return=('annual_return', 'median'),
+        max_drawdown=('max_drawdown', 'mean'),
+        turnover=('turnover', 'mean'),
+        exposure=('exposure', 'mean'),
+    )
+    # Hit rate over all trades of all issuers, not the mean of per-issuer rates
+    winners = (traded['hit_rate'] * traded['trades']).groupby(traded['strategy']).sum()
+    summary['trades'] = report.groupby('strategy')['trades'].sum()
+    summary['hit_rate'] = winners / summary['trades'].where(summary['trades'] > 0)
+    return summary.sort_values('median_annual_return', ascending=False)
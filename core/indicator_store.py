@@ -0,0 +1,150 @@
+from typing import List
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from .models import Issuer, StockPrice, IndicatorValue, IndicatorState
+from .technical_analysis import IndicatorEngine
+
+INDICATOR_FIELDS = ['sma', 'ema', 'wma', 'tema', 'kama', 'rsi', 'stoch', 'cci', 'macd', 'willr']
+
+# Periods served by the stock_data API: 1 day, 1 week, 1 month
+INDICATOR_PERIODS = [1, 5, 20]
+
+def load_price_frame(issuer: Issuer, since=None) -> pd.DataFrame:
+    """Load an issuer's bars in date order as the frame calculate_technical_indicators expects.
+
+    With since, only bars after that date are loaded.
+    """
+    fields = ('date', 'last_trade_price', 'max_price', 'min_price', 'volume')
+    prices = StockPrice.objects.filter(issuer=issuer)
+    if since is not None:
+        prices = prices.filter(date__gt=since)
+    rows = list(prices.order_by('date').values_list(*fields))
+    return pd.DataFrame(rows, columns=['date', 'close_price', 'high', 'low', 'volume'])
+
+def update_indicator_values(issuer: Issuer, periods: List[int] = INDICATOR_PERIODS, since=None) -> int:
+    """Compute and store indicator values for bars not yet in IndicatorValue.
+
+    Each period resumes from its stored IndicatorState, so only bars after
+    the last stored date are fed through the engine. When `since` is on or
+    before that date (older bars were changed), or no state exists yet,
+    the period is recomputed from the first bar.
+
+    Returns:
+        Number of IndicatorValue rows written
+    """
+    stored = {state.period: state for state in IndicatorState.objects.filter(issuer=issuer, period__in=periods)}
+    engines = {}
+    resume_dates = {}
+    for period in periods:
+        state = stored.get(period)
+        if state is not None and (since is None or since > state.date):
+            engines[period] = IndicatorEngine.from_state(state.state)
+            resume_dates[period] = state.date
+        else:
+            engines[period] = IndicatorEngine(period)
+            resume_dates[period] = None
+
+    known_dates = [value for value in resume_dates.values() if value is not None]
+    first_date = None if len(known_dates) < len(periods) else min(known_dates)
+    df = load_price_frame(issuer, first_date)
+    if df.empty:
+        return 0
+
+    values = []
+    states = []
+    for period in periods:
+        frame = df
+        if resume_dates[period] is not None:
+            frame = df[df['date'] > resume_dates[period]]
+        if frame.empty:
+            continue
+        engine = engines[period]
+        indicators = engine.run(frame).replace([np.inf, -np.inf], np.nan)
+        columns = {field: indicators[f'{field}_{period}'].to_numpy() for field in INDICATOR_FIELDS}
+        for i, price_date in enumerate(frame['date']):
+            values.append(IndicatorValue(
+                issuer=issuer,
+                date=price_date,
+                period=period,
+                **{
+                    field: None if np.isnan(column[i]) else float(column[i])
+                    for field, column in columns.items()
+                }
+            ))
+        states.append(IndicatorState(
+            issuer=issuer, period=period, date=frame['date'].iloc[-1], state=engine.to_state()
+        ))
+
+    with transaction.atomic():
+        if values:
+            IndicatorValue.objects.bulk_create(
+                values,
+                batch_size=5000,
+                update_conflicts=True,
+                unique_fields=['issuer', 'period', 'date'],
+                update_fields=INDICATOR_FIELDS
+            )
+        if states:
+            IndicatorState.objects.bulk_create(
+                states,
+                update_conflicts=True,
+                unique_fields=['issuer', 'period'],
+                update_fields=['date', 'state']
+            )
+    return len(values)
+
+def read_indicator_values(issuer: Issuer, dates, periods: List[int] = INDICATOR_PERIODS):
+    """Return {period: DataFrame} with '<field>_<period>' columns aligned to dates.
+
+    Returns None when any period is missing a stored value for one of the
+    dates, so callers can fall back to computing the indicators.
+    """
+    dates = list(dates)
+    if not dates:
+        return None
+    rows = pd.DataFrame.from_records(
+        IndicatorValue.objects.filter(
+            issuer=issuer,
+            period__in=periods,
+            date__range=[min(dates), max(dates)]
+        ).values_list('period', 'date', *INDICATOR_FIELDS),
+        columns=['period', 'date', *INDICATOR_FIELDS]
+    )
+
+    results = {}
+    for period in periods:
+        stored = rows[rows['period'] == period].set_index('date')
+        if not set(dates).issubset(stored.index):
+            return None
+        stored = stored.reindex(dates)[INDICATOR_FIELDS].astype(float)
+        stored.columns = [f'{field}_{period}' for field in INDICATOR_FIELDS]
+        results[period] = stored.reset_index(drop=True)
+    return results
+
+def load_price_matrix(issuer_ids=None):
+    """Load close, high and low prices of many issuers in one query.
+
+    Returns:
+        (dates, issuer_ids, close, high, low) where the price arrays are
+        (dates x issuers) and NaN where an issuer has no bar, ready for
+        calculate_indicator_matrix
+    """
+    prices = StockPrice.objects.all()
+    if issuer_ids is not None:
+        prices = prices.filter(issuer_id__in=list(issuer_ids))
+    rows = pd.DataFrame.from_records(
+        prices.values_list('date', 'issuer_id', 'last_trade_price', 'max_price', 'min_price'),
+        columns=['date', 'issuer_id', 'close_price', 'high', 'low']
+    )
+    columns = {}
+    for field in ['close_price', 'high', 'low']:
+        columns[field] = rows.pivot(index='date', columns='issuer_id', values=field).sort_index().astype(float)
+    close = columns['close_price']
+    return (
+        close.index.to_numpy(),
+        close.columns.to_numpy(),
+        close.to_numpy(),
+        columns['high'].to_numpy(),
+        columns['low'].to_numpy(),
+    )
@@ -0,0 +1,249 @@
+from datetime import timedelta
+from decimal import Decimal
+import io
+from typing import Dict
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from .models import Issuer, StockPrice, IssuerQuote
+
+# Alternative column names used by older MSE exports
+COLUMN_MAPPING = {
+    'last trade price': 'last_trade_price',
+    'avg. price': 'avg_price',
+    '%chg.': 'price_change',
+    'turnover in best in denars': 'turnover_best',
+    'total turnover in denars': 'total_turnover'
+}
+
+PRICE_FIELDS = [
+    'last_trade_price', 'max_price', 'min_price', 'avg_price',
+    'price_change', 'volume', 'turnover_best', 'total_turnover'
+]
+
+DECIMAL_PLACES = {
+    field: StockPrice._meta.get_field(field).decimal_places
+    for field in PRICE_FIELDS if field != 'volume'
+}
+
+def clean_price_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Return a frame with one row per date and numeric StockPrice columns.
+
+    Values are cleaned column-wise: thousands separators are stripped,
+    unparsable values become 0 and decimals are rounded to the model's
+    precision.
+    """
+    df = df.rename(columns=COLUMN_MAPPING)
+    cleaned = pd.DataFrame({'date': pd.to_datetime(df['date'], errors='coerce')})
+
+    for field in PRICE_FIELDS:
+        column = df[field] if field in df.columns else pd.Series(0, index=df.index)
+        if column.dtype == object:
+            column = column.astype(str).str.replace(',', '', regex=False)
+        column = pd.to_numeric(column, errors='coerce').fillna(0)
+        if field == 'volume':
+            cleaned[field] = column.astype('int64')
+        else:
+            cleaned[field] = column.astype('float64').round(DECIMAL_PLACES[field])
+
+    cleaned = cleaned.dropna(subset=['date'])
+    cleaned['date'] = cleaned['date'].dt.date
+    return cleaned.drop_duplicates(subset='date', keep='last').reset_index(drop=True)
+
+def drop_placeholder_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop the zero-filled rows the scrapers return for days without trades."""
+    values = df[[field for field in PRICE_FIELDS if field in df.columns]]
+    values = values.apply(pd.to_numeric, errors='coerce').fillna(0)
+    return df[values.ne(0).any(axis=1)]
+
+def to_decimal_columns(df: pd.DataFrame) -> Dict[str, list]:
+    """Convert the cleaned price columns into lists of model-ready values."""
+    columns = {}
+    for field in PRICE_FIELDS:
+        values = df[field].to_numpy()
+        if field == 'volume':
+            columns[field] = values.tolist()
+        else:
+            formatted = np.char.mod(f'%.{DECIMAL_PLACES[field]}f', values.astype('float64'))
+            columns[field] = list(map(Decimal, formatted))
+    return columns
+
+def upsert_stock_prices(issuer: Issuer, df: pd.DataFrame, batch_size: int = 5000) -> Dict[str, int]:
+    """Insert or update the prices of one issuer keyed on (issuer, date).
+
+    Existing rows for the date range are read in one query so unchanged
+    rows are skipped, and new and changed rows are written with a single
+    INSERT ... ON CONFLICT DO UPDATE per batch.
+
+    Returns:
+        Dictionary with 'inserted', 'updated' and 'unchanged' row counts and
+        'changed_from', the earliest inserted or updated date (or None)
+    """
+    stats = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'changed_from': None}
+    df = clean_price_frame(df)
+    if df.empty:
+        return stats
+
+    existing = {
+        row[0]: row[1:]
+        for row in StockPrice.objects.filter(
+            issuer=issuer,
+            date__range=[df['date'].min(), df['date'].max()]
+        ).values_list('date', *PRICE_FIELDS)
+    }
+
+    columns = to_decimal_columns(df)
+    to_write = []
+    for i, price_date in enumerate(df['date']):
+        values = tuple(columns[field][i] for field in PRICE_FIELDS)
+        current = existing.get(price_date)
+        if current is None:
+            stats['inserted'] += 1
+        elif current == values:
+            stats['unchanged'] += 1
+            continue
+        else:
+            stats['updated'] += 1
+        if stats['changed_from'] is None or price_date < stats['changed_from']:
+            stats['changed_from'] = price_date
+        to_write.append(StockPrice(issuer=issuer, date=price_date, **dict(zip(PRICE_FIELDS, values))))
+
+    if to_write:
+        StockPrice.objects.bulk_create(
+            to_write,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['issuer', 'date'],
+            update_fields=PRICE_FIELDS
+        )
+    return stats
+
+def _stock_price_columns():
+    return ['issuer_id', 'date'] + PRICE_FIELDS
+
+def copy_stock_prices(frames) -> int:
+    """Load cleaned frames into StockPrice on PostgreSQL using COPY.
+
+    Each frame (with an 'issuer_id' column) is streamed into a temporary
+    staging table, which is then merged into the price table with a single
+    INSERT ... ON CONFLICT DO NOTHING. Returns the number of inserted rows.
+    """
+    table = StockPrice._meta.db_table
+    columns = _stock_price_columns()
+    column_list = ', '.join(columns)
+    staging_columns = ', '.join(
+        ['issuer_id bigint', 'date date'] +
+        [f'{field} bigint' if field == 'volume' else f'{field} numeric' for field in PRICE_FIELDS]
+    )
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TEMP TABLE stockprice_staging ({staging_columns}) ON COMMIT DROP')
+        for frame in frames:
+            buffer = io.StringIO()
+            frame[columns].to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            cursor.copy_expert(f'COPY stockprice_staging ({column_list}) FROM STDIN WITH (FORMAT csv)', buffer)
+        cursor.execute(
+            f'INSERT INTO {table} ({column_list}) '
+            f'SELECT DISTINCT ON (issuer_id, date) {column_list} FROM stockprice_staging '
+            f'ORDER BY issuer_id, date '
+            f'ON CONFLICT (issuer_id, date) DO NOTHING'
+        )
+        return cursor.rowcount
+
+def bulk_insert_stock_prices(frames, batch_size: int = 5000) -> int:
+    """Portable fallback for copy_stock_prices using batched bulk_create.
+
+    Returns the number of rows sent to the database; rows that already
+    exist are ignored.
+    """
+    total = 0
+    with transaction.atomic():
+        for frame in frames:
+            columns = to_decimal_columns(frame)
+            prices = [
+                StockPrice(
+                    issuer_id=issuer_id,
+                    date=price_date,
+                    **{field: columns[field][i] for field in PRICE_FIELDS}
+                )
+                for i, (issuer_id, price_date) in enumerate(zip(frame['issuer_id'], frame['date']))
+            ]
+            StockPrice.objects.bulk_create(prices, ignore_conflicts=True, batch_size=batch_size)
+            total += len(prices)
+    return total
+
+QUOTE_OFFSETS = {
+    'price_1w': 7,
+    'price_1m': 30,
+    'price_3m': 91,
+    'price_1y': 365,
+}
+
+def refresh_issuer_quotes(issuer_ids=None) -> int:
+    """Rebuild IssuerQuote rows from StockPrice for the given issuers (all if None).
+
+    Reads the year before each issuer's last trade for all requested issuers
+    in one query and writes the quotes with a single bulk upsert. Rows without a
+    trade price (placeholders for days without trading) are ignored.
+    Returns the number of quotes written.
+    """
+    prices = StockPrice.objects.filter(last_trade_price__gt=0)
+    if issuer_ids is not None:
+        prices = prices.filter(issuer_id__in=list(issuer_ids))
+
+    last_dates = dict(
+        prices.values('issuer').annotate(last_date=Max('date')).values_list('issuer', 'last_date')
+    )
+    if not last_dates:
+        return 0
+
+    # Each issuer only needs the year before its own last trade; issuers
+    # sharing a last date share one condition, so a stale issuer does not
+    # widen the window of the others
+    max_offset = max(QUOTE_OFFSETS.values())
+    issuers_by_last_date = {}
+    for issuer_id, last_date in last_dates.items():
+        issuers_by_last_date.setdefault(last_date, []).append(issuer_id)
+    window = Q()
+    for last_date, ids in issuers_by_last_date.items():
+        window |= Q(issuer_id__in=ids, date__gte=last_date - timedelta(days=max_offset + 10))
+    rows = pd.DataFrame.from_records(
+        prices.filter(window)
+        .order_by('issuer_id', 'date')
+        .values_list('issuer_id', 'date', 'last_trade_price', 'price_change', 'volume'),
+        columns=['issuer_id', 'date', 'last_trade_price', 'price_change', 'volume']
+    )
+    rows['date'] = pd.to_datetime(rows['date']).to_numpy().astype('datetime64[D]')
+
+    quotes = []
+    for issuer_id, group in rows.groupby('issuer_id', sort=False):
+        dates = group['date'].to_numpy()
+        closes = group['last_trade_price'].to_numpy()
+        last = len(group) - 1
+        quote = IssuerQuote(
+            issuer_id=issuer_id,
+            date=group['date'].iloc[last].date(),
+            last_price=closes[last],
+            previous_close=closes[last - 1] if last > 0 else None,
+            price_change=group['price_change'].iloc[last],
+            last_volume=int(group['volume'].iloc[last])
+        )
+        # Index of the last close on or before each reference date
+        reference_dates = dates[last] - np.array(list(QUOTE_OFFSETS.values()), dtype='timedelta64[D]')
+        positions = np.searchsorted(dates, reference_dates, side='right') - 1
+        for field, position in zip(QUOTE_OFFSETS, positions):
+            setattr(quote, field, closes[position] if position >= 0 else None)
+        quotes.append(quote)
+
+    IssuerQuote.objects.bulk_create(
+        quotes,
+        update_conflicts=True,
+        unique_fields=['issuer'],
+        update_fields=[
+            'date', 'last_price', 'previous_close', 'price_change', 'last_volume',
+            *QUOTE_OFFSETS, 'updated_at'
+        ]
+    )
+    return len(quotes)
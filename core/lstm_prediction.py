@@ -3,6 +3,8 @@ import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.neural_network import MLPRegressor
 from sklearn.metrics import mean_squared_error, mean_absolute_error
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.special import expit
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
 import matplotlib.pyplot as plt
@@ -10,11 +12,136 @@ import io
 import base64
 import joblib
 import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
 from django.conf import settings
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from .models import Issuer, IssuerQuote, StockPrice
+
+# Issuers need more price rows than this to be trained
+MIN_TRAINING_DAYS = 30
+
+# Days predicted at once by a direct multi-output model; issuers with too
+# short a history for that many training windows get a one-day model
+# that is applied recursively
+FORECAST_HORIZON = 30
+
+# Epochs of an incremental update, and how far its validation RMSE may
+# rise above that of the last full training before a full retrain
+INCREMENTAL_EPOCHS = 20
+DRIFT_TOLERANCE = 1.25
+
+# Bump when the bundle layout changes; older bundles are refused
+BUNDLE_FORMAT = 1
+
+# Files of the three-file layout written before model bundles
+LEGACY_ARTIFACTS = ('model', 'scaler', 'metrics')
+
+def bundle_path(symbol, models_dir=None):
+    return os.path.join(models_dir or settings.TRAINED_MODELS_DIR, f'{symbol}.joblib')
+
+def legacy_artifact_paths(symbol, models_dir=None):
+    """Paths of the separate model, scaler and metrics files of an issuer."""
+    models_dir = models_dir or settings.TRAINED_MODELS_DIR
+    return {kind: os.path.join(models_dir, f'{symbol}_{kind}.joblib') for kind in LEGACY_ARTIFACTS}
+
+def save_model_bundle(symbol, predictor, metrics, data_range, models_dir=None, baseline_val_rmse=None):
+    """Write everything needed to predict for an issuer as one file, atomically.
+
+    The bundle is dumped uncompressed to a temporary file next to the
+    target and renamed into place, so readers see either the previous or
+    the new bundle, never a mix. Uncompressed arrays (the network weights)
+    can be memory-mapped by load_model_bundle.
+
+    Args:
+        predictor: Trained TimeSeriesPredictor
+        metrics: Error metrics returned by TimeSeriesPredictor.train
+        data_range: (first date, last date) of the training prices
+        baseline_val_rmse: Validation RMSE of the last full training, when
+            saving an incremental update
+
+    Returns:
+        The version string of the written bundle
+    """
+    path = bundle_path(symbol, models_dir)
+    trained_at = datetime.now(timezone.utc)
+    bundle = {
+        'format': BUNDLE_FORMAT,
+        'version': trained_at.strftime('%Y%m%dT%H%M%S.%fZ'),
+        'symbol': symbol,
+        'trained_at': trained_at,
+        'data_range': tuple(data_range),
+        'features': {
+            'price_field': 'last_trade_price',
+            'sequence_length': predictor.sequence_length,
+            'horizon': predictor.horizon,
+        },
+        'model': predictor.model,
+        'scaler': predictor.scaler,
+        'metrics': metrics,
+        'baseline_val_rmse': metrics['val_rmse'] if baseline_val_rmse is None else baseline_val_rmse,
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f'.{symbol}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            joblib.dump(bundle, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return bundle['version']
+
+def load_model_bundle(symbol, models_dir=None, mmap_mode='r'):
+    """Load an issuer's bundle, falling back to the legacy three-file layout.
+
+    With mmap_mode='r' the weight arrays are mapped read-only from the page
+    cache, so processes serving the same model share its memory.
+    Raises FileNotFoundError when the issuer has no trained model.
+    """
+    path = bundle_path(symbol, models_dir)
+    if os.path.exists(path):
+        bundle = joblib.load(path, mmap_mode=mmap_mode)
+        if bundle.get('format') != BUNDLE_FORMAT:
+            raise ValueError(f"Unsupported model bundle format {bundle.get('format')} in {path}")
+        return bundle
+
+    paths = legacy_artifact_paths(symbol, models_dir)
+    if not (os.path.exists(paths['model']) and os.path.exists(paths['scaler'])):
+        raise FileNotFoundError(f"No trained model found for {symbol}")
+    return {
+        'format': None,
+        'version': None,
+        'symbol': symbol,
+        'data_range': None,
+        'features': {'price_field': 'last_trade_price', 'sequence_length': 10, 'horizon': 1},
+        'model': joblib.load(paths['model']),
+        'scaler': joblib.load(paths['scaler']),
+        'metrics': joblib.load(paths['metrics']),
+        'baseline_val_rmse': None,
+    }
+
+def model_files(symbol, models_dir=None):
+    """Files a loaded model of the issuer comes from (the bundle, or the legacy files)."""
+    path = bundle_path(symbol, models_dir)
+    if os.path.exists(path):
+        return [path]
+    return list(legacy_artifact_paths(symbol, models_dir).values())
 
 class TimeSeriesPredictor:
-    def __init__(self, sequence_length=10):
+    def __init__(self, sequence_length=10, horizon=1):
+        """
+        Args:
+            sequence_length: Number of past prices fed to the model
+            horizon: Number of future prices the model outputs at once; 1
+                predicts the next day only and is applied recursively
+        """
         self.sequence_length = sequence_length
+        self.horizon = horizon
         self.scaler = MinMaxScaler(feature_range=(0, 1))
         self.model = MLPRegressor(
             hidden_layer_sizes=(100, 50),
@@ -27,18 +154,33 @@ class TimeSeriesPredictor:
             n_iter_no_change=10
         )
         
-    def prepare_data(self, data):
-        # Scale the data
-        scaled_data = self.scaler.fit_transform(data.reshape(-1, 1))
+    @classmethod
+    def from_bundle(cls, bundle):
+        """Predictor continuing from a saved bundle (load it with mmap_mode=None to train)."""
+        features = bundle['features']
+        predictor = cls(sequence_length=features['sequence_length'], horizon=features.get('horizon', 1))
+        predictor.model = bundle['model']
+        predictor.scaler = bundle['scaler']
+        return predictor
         
-        X, y = [], []
-        for i in range(len(scaled_data) - self.sequence_length):
-            X.append(scaled_data[i:(i + self.sequence_length), 0])
-            y.append(scaled_data[i + self.sequence_length, 0])
+    def prepare_data(self, data, fit_scaler=True):
+        # Scale the data
+        if fit_scaler:
+            scaled_data = self.scaler.fit_transform(data.reshape(-1, 1))
+        else:
+            scaled_data = self.scaler.transform(data.reshape(-1, 1))
         
-        X = np.array(X)
-        y = np.array(y)
+        # Each window holds sequence_length inputs followed by horizon targets
+        windows = sliding_window_view(scaled_data[:, 0], self.sequence_length + self.horizon)
+        X = np.ascontiguousarray(windows[:, :self.sequence_length])
+        y = np.ascontiguousarray(windows[:, self.sequence_length:])
+        if self.horizon == 1:
+            y = y[:, 0]
         return X, y
+    
+    def covers(self, prices):
+        """Whether prices lie in the range the scaler was fitted on."""
+        return bool(prices.min() >= self.scaler.data_min_[0] and prices.max() <= self.scaler.data_max_[0])
         
     def train(self, data, validation_split=0.3):
         # Prepare data
@@ -51,12 +193,40 @@ class TimeSeriesPredictor:
         
         # Train model
         self.model.fit(X_train, y_train)
+        return self.evaluate(X_train, y_train, X_val, y_val)
+    
+    def train_incremental(self, data, epochs=INCREMENTAL_EPOCHS, validation_split=0.3):
+        """Continue training the current weights for a few epochs on the extended history.
         
+        The scaler is kept as fitted (check covers() first), so windows are
+        scaled exactly as the model was trained on. The train/validation
+        split is the same as in train().
+        """
+        X, y = self.prepare_data(data, fit_scaler=False)
+        train_size = int(len(X) * (1 - validation_split))
+        X_train, X_val = X[:train_size], X[train_size:]
+        y_train, y_val = y[:train_size], y[train_size:]
+        
+        # partial_fit runs one epoch over the data per call and does not
+        # support early stopping; the validation error is checked by the caller
+        early_stopping = self.model.early_stopping
+        self.model.set_params(early_stopping=False)
+        if getattr(self.model, 'best_loss_', None) is None:
+            # Left unset by a fit with early stopping
+            self.model.best_loss_ = np.inf
+        try:
+            for _ in range(epochs):
+                self.model.partial_fit(X_train, y_train)
+        finally:
+            self.model.set_params(early_stopping=early_stopping)
+        return self.evaluate(X_train, y_train, X_val, y_val)
+    
+    def evaluate(self, X_train, y_train, X_val, y_val):
         # Calculate metrics
         train_predictions = self.model.predict(X_train)
         val_predictions = self.model.predict(X_val)
         
-        # Inverse transform predictions
+        # Inverse transform predictions (all horizons of a multi-output model together)
         train_predictions = self.scaler.inverse_transform(train_predictions.reshape(-1, 1))
         y_train_inv = self.scaler.inverse_transform(y_train.reshape(-1, 1))
         val_predictions = self.scaler.inverse_transform(val_predictions.reshape(-1, 1))
@@ -85,48 +255,98 @@ class TimeSeriesPredictor:
             }
         }
 
+def load_training_prices(issuer_ids=None):
+    """Price history of the given issuers (all if None) with a single query.
+
+    Returns:
+        {issuer code: (dates, prices)} with datetime64[D] dates and float64
+        last trade prices in date order
+    """
+    rows = StockPrice.objects.all()
+    if issuer_ids is not None:
+        rows = rows.filter(issuer_id__in=list(issuer_ids))
+    df = pd.DataFrame.from_records(
+        rows.annotate(price=Cast('last_trade_price', FloatField()))
+        .order_by('issuer__code', 'date')
+        .values_list('issuer__code', 'date', 'price'),
+        columns=['symbol', 'date', 'price']
+    )
+    if df.empty:
+        return {}
+    symbols = df['symbol'].to_numpy()
+    dates = pd.to_datetime(df['date']).to_numpy().astype('datetime64[D]')
+    prices = df['price'].to_numpy(dtype=np.float64)
+    starts = np.flatnonzero(np.r_[True, symbols[1:] != symbols[:-1]])
+    ends = np.r_[starts[1:], len(df)]
+    return {symbols[start]: (dates[start:end], prices[start:end]) for start, end in zip(starts, ends)}
+
+def train_price_model(symbol, dates, prices, models_dir=None, incremental=False, epochs=INCREMENTAL_EPOCHS,
+                      horizon=FORECAST_HORIZON):
+    """Train a predictor on one issuer's prices and save it as a bundle.
+
+    Runs in train_price_predictor's worker processes, so it only touches
+    the models directory and never the database. Legacy three-file
+    artifacts of the issuer are removed once the bundle is written.
+
+    With incremental=True an existing bundle is updated instead when
+    possible: if there are new days whose prices lie within the fitted
+    scaler range, the saved weights are trained `epochs` more epochs and
+    kept unless their validation RMSE drifts more than DRIFT_TOLERANCE
+    above the last full training's. Otherwise the model is retrained in full.
+
+    The model predicts `horizon` days at once, or only the next day when
+    the history has fewer than MIN_TRAINING_DAYS windows of that length.
+
+    Returns:
+        (metrics, mode) where mode is 'full', 'incremental' or 'unchanged'
+    """
+    data_range = (dates[0].item(), dates[-1].item())
+    sequence_length = 10
+    if len(prices) - sequence_length - horizon + 1 < MIN_TRAINING_DAYS:
+        horizon = 1
+    if incremental:
+        try:
+            bundle = load_model_bundle(symbol, models_dir, mmap_mode=None)
+        except FileNotFoundError:
+            bundle = None
+        # Legacy models have no data range to resume from
+        if bundle is not None and bundle['data_range'] is not None \
+                and bundle['features'].get('horizon', 1) == horizon:
+            if tuple(bundle['data_range']) == data_range:
+                return bundle['metrics'], 'unchanged'
+            predictor = TimeSeriesPredictor.from_bundle(bundle)
+            if predictor.covers(prices):
+                training_results = predictor.train_incremental(prices, epochs)
+                baseline = bundle.get('baseline_val_rmse') or bundle['metrics']['val_rmse']
+                if training_results['metrics']['val_rmse'] <= baseline * DRIFT_TOLERANCE:
+                    save_model_bundle(symbol, predictor, training_results['metrics'], data_range,
+                                      models_dir, baseline_val_rmse=baseline)
+                    return training_results['metrics'], 'incremental'
+
+    predictor = TimeSeriesPredictor(sequence_length=sequence_length, horizon=horizon)
+    training_results = predictor.train(prices)
+    save_model_bundle(symbol, predictor, training_results['metrics'], data_range, models_dir)
+    for path in legacy_artifact_paths(symbol, models_dir).values():
+        if os.path.exists(path):
+            os.remove(path)
+    return training_results['metrics'], 'full'
+
 class PricePredictor:
-    def __init__(self, symbol, sequence_length=10):
+    def __init__(self, symbol, models_dir=None):
         self.symbol = symbol
-        self.sequence_length = sequence_length
-        self.models_dir = os.path.join(settings.BASE_DIR, 'trained_models')
+        self.models_dir = models_dir or settings.TRAINED_MODELS_DIR
         
-        # Load saved model and scaler
-        model_path = os.path.join(self.models_dir, f'{symbol}_model.joblib')
-        scaler_path = os.path.join(self.models_dir, f'{symbol}_scaler.joblib')
-        metrics_path = os.path.join(self.models_dir, f'{symbol}_metrics.joblib')
-        
-        if not (os.path.exists(model_path) and os.path.exists(scaler_path)):
-            raise FileNotFoundError(f"No trained model found for {symbol}")
-        
-        self.model = joblib.load(model_path)
-        self.scaler = joblib.load(scaler_path)
-        self.metrics = joblib.load(metrics_path)
+        bundle = load_model_bundle(symbol, self.models_dir)
+        self.version = bundle['version']
+        self.data_range = bundle['data_range']
+        self.sequence_length = bundle['features']['sequence_length']
+        self.horizon = bundle['features'].get('horizon', 1)
+        self.model = bundle['model']
+        self.scaler = bundle['scaler']
+        self.metrics = bundle['metrics']
     
     def predict_future(self, data, days_ahead=30):
-        # Scale the data
-        scaled_data = self.scaler.transform(data.reshape(-1, 1))
-        
-        # Prepare the last sequence
-        last_sequence = scaled_data[-self.sequence_length:]
-        current_sequence = last_sequence.reshape(1, -1)
-        
-        # Make predictions
-        predictions = []
-        for _ in range(days_ahead):
-            # Get prediction
-            next_pred = self.model.predict(current_sequence)[0]
-            predictions.append(next_pred)
-            
-            # Update sequence
-            current_sequence = np.roll(current_sequence, -1)
-            current_sequence[0, -1] = next_pred
-        
-        # Inverse transform predictions
-        predictions = np.array(predictions).reshape(-1, 1)
-        predictions = self.scaler.inverse_transform(predictions)
-        
-        return predictions.flatten()
+        return predict_batch([self], [data], days_ahead)[0]
 
     def generate_plots(self, data, predictions):
         # Create figure with subplots
@@ -152,13 +372,193 @@ class PricePredictor:
         
         return base64.b64encode(image_png).decode()
 
+# Hidden layer activations of MLPRegressor; the output layer is linear
+ACTIVATIONS = {
+    'identity': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'logistic': expit,
+}
+
+def _architecture(predictor):
+    model = predictor.model
+    return (
+        predictor.sequence_length, predictor.horizon, model.activation,
+        tuple(coef.shape for coef in model.coefs_)
+    )
+
+def predict_batch(predictors, series, days_ahead=30):
+    """Forecast the next days_ahead prices of many issuers at once.
+
+    Predictors with the same architecture have their weights stacked, so
+    each layer of a whole group is one batched matrix multiply. Models
+    whose horizon covers days_ahead need one forward pass; shorter ones
+    feed their outputs back in, horizon days at a time.
+
+    Args:
+        predictors: PricePredictor per issuer
+        series: Price history per issuer (at least sequence_length prices)
+        days_ahead: Number of days to forecast
+
+    Returns:
+        List with one array of days_ahead prices per predictor
+
+    Raises:
+        ValueError: If a history is shorter than its predictor's sequence_length
+    """
+    for predictor, prices in zip(predictors, series):
+        if len(prices) < predictor.sequence_length:
+            raise ValueError(
+                f'Forecasting {predictor.symbol} needs at least {predictor.sequence_length} prices, '
+                f'got {len(prices)}'
+            )
+
+    groups = {}
+    for i, predictor in enumerate(predictors):
+        groups.setdefault(_architecture(predictor), []).append(i)
+
+    forecasts = [None] * len(predictors)
+    for (sequence_length, horizon, activation, _), members in groups.items():
+        models = [predictors[i].model for i in members]
+        weights = [np.stack(layer) for layer in zip(*(model.coefs_ for model in models))]
+        biases = [np.stack(layer)[:, None, :] for layer in zip(*(model.intercepts_ for model in models))]
+        hidden_activation = ACTIVATIONS[activation]
+        # MinMaxScaler: scaled = price * scale_ + min_
+        scale = np.array([predictors[i].scaler.scale_[0] for i in members])[:, None]
+        offset = np.array([predictors[i].scaler.min_[0] for i in members])[:, None]
+
+        window = np.stack([
+            np.asarray(series[i], dtype=float)[-sequence_length:] for i in members
+        ]) * scale + offset
+        outputs = []
+        while sum(output.shape[1] for output in outputs) < days_ahead:
+            values = window[:, None, :]
+            for layer, (weight, bias) in enumerate(zip(weights, biases)):
+                values = np.matmul(values, weight) + bias
+                if layer < len(weights) - 1:
+                    values = hidden_activation(values)
+            outputs.append(values[:, 0, :])
+            window = np.concatenate([window, values[:, 0, :]], axis=1)[:, -sequence_length:]
+
+        predictions = (np.concatenate(outputs, axis=1)[:, :days_ahead] - offset) / scale
+        for row, i in enumerate(members):
+            forecasts[i] = predictions[row]
+    return forecasts
+
+def forecast_issuers(symbols, days_ahead=30):
+    """Forecast every issuer in symbols that has a trained model.
+
+    Predictors come from the process registry and prices from one query.
+    Issuers with fewer prices than their model's sequence_length are left out.
+
+    Returns:
+        {issuer code: array of days_ahead prices}
+    """
+    registry = get_predictor_registry()
+    predictors = []
+    for symbol in symbols:
+        try:
+            predictors.append(registry.get(symbol))
+        except FileNotFoundError:
+            continue
+    histories = load_training_prices(
+        Issuer.objects.filter(code__in=[predictor.symbol for predictor in predictors]).values_list('id', flat=True)
+    )
+    predictors = [
+        predictor for predictor in predictors
+        if len(histories.get(predictor.symbol, ((), ()))[1]) >= predictor.sequence_length
+    ]
+    forecasts = predict_batch(predictors, [histories[predictor.symbol][1] for predictor in predictors], days_ahead)
+    return {predictor.symbol: forecast for predictor, forecast in zip(predictors, forecasts)}
+
+class PredictorRegistry:
+    """Per-process LRU of loaded PricePredictors.
+
+    Entries are keyed by symbol and the inode, mtime and size of the model
+    files, so a predictor is loaded again as soon as train_price_predictor
+    rewrites them, and the least recently used one is dropped beyond
+    max_size. Safe to share between the threads of a worker.
+    """
+
+    def __init__(self, max_size=None, models_dir=None):
+        self.max_size = max_size or settings.PREDICTOR_CACHE_SIZE
+        self.models_dir = models_dir or settings.TRAINED_MODELS_DIR
+        self._predictors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def version(self, symbol):
+        """Identify the model files on disk; raises FileNotFoundError when there are none."""
+        stats = [os.stat(path) for path in model_files(symbol, self.models_dir)]
+        return tuple((stat.st_ino, stat.st_mtime_ns, stat.st_size) for stat in stats)
+
+    def get(self, symbol):
+        version = self.version(symbol)
+        with self._lock:
+            cached = self._predictors.get(symbol)
+            if cached is not None and cached[0] == version:
+                self._predictors.move_to_end(symbol)
+                return cached[1]
+
+        # Loaded outside the lock so other symbols are served meanwhile
+        predictor = PricePredictor(symbol, models_dir=self.models_dir)
+        with self._lock:
+            self._predictors[symbol] = (version, predictor)
+            self._predictors.move_to_end(symbol)
+            while len(self._predictors) > self.max_size:
+                self._predictors.popitem(last=False)
+        return predictor
+
+    def preload(self, symbols, limit=None):
+        """Load predictors for the given symbols, skipping those without a model.
+
+        Stops after `limit` (default: max_size) predictors; returns the number loaded.
+        """
+        limit = min(limit or self.max_size, self.max_size)
+        loaded = 0
+        for symbol in symbols:
+            if loaded >= limit:
+                break
+            try:
+                self.get(symbol)
+                loaded += 1
+            except FileNotFoundError:
+                continue
+        return loaded
+
+    def clear(self):
+        with self._lock:
+            self._predictors.clear()
+
+    def __len__(self):
+        return len(self._predictors)
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_predictor_registry():
+    """Process-wide PredictorRegistry, built on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = PredictorRegistry()
+    return _registry
+
+def hot_symbols():
+    """Issuer codes ordered by the turnover of their last trading day, most traded first."""
+    return list(
+        IssuerQuote.objects.annotate(turnover=F('last_price') * F('last_volume'))
+        .order_by('-turnover')
+        .values_list('issuer__code', flat=True)
+    )
+
 def prepare_prediction(symbol, stock_prices, days_ahead=30):
     try:
         # Convert prices to numpy array
         prices = np.array([float(price) for price in stock_prices])
         
-        # Initialize predictor with saved model
-        predictor = PricePredictor(symbol)
+        # Loaded predictors are cached per process
+        predictor = get_predictor_registry().get(symbol)
         
         # Make future predictions
         future_predictions = predictor.predict_future(prices, days_ahead)
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+from core.models import Issuer
+from core.indicator_store import load_price_matrix, INDICATOR_PERIODS
+from core.backtest import run_backtest, summarize_backtest
+import pandas as pd
+import time
+import multiprocessing
+
+class Command(BaseCommand):
+    help = 'Backtests the technical analysis signals and their consensus over the stored price history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbol',
+            type=str,
+            help='Issuer code to backtest. If not provided, backtests all issuers.',
+        )
+        parser.add_argument(
+            '--periods',
+            type=int,
+            nargs='+',
+            default=INDICATOR_PERIODS,
+            help=f'Indicator periods to test (default: {" ".join(map(str, INDICATOR_PERIODS))})'
+        )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=multiprocessing.cpu_count(),
+            help='Number of worker processes (default: number of CPU cores)'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Write the per-issuer results to this CSV file'
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        
+        issuers = Issuer.objects.all()
+        if options['symbol']:
+            issuers = issuers.filter(code=options['symbol'])
+        codes = dict(issuers.values_list('id', 'code'))
+        if not codes:
+            self.stdout.write(self.style.ERROR('No issuers found!'))
+            return
+        
+        dates, issuer_ids, close, high, low = load_price_matrix(codes)
+        if len(dates) == 0:
+            self.stdout.write(self.style.ERROR('No stock prices found!'))
+            return
+        self.stdout.write(
+            f'Loaded {len(dates)} dates x {len(issuer_ids)} issuers '
+            f'({dates[0]} - {dates[-1]}) in {time.time() - start_time:.2f} seconds'
+        )
+        
+        # Workers only get numpy arrays; don't let them inherit open connections
+        connections.close_all()
+        report = run_backtest(close, high, low, issuer_ids, options['periods'], jobs=options['jobs'])
+        report.insert(1, 'symbol', report['issuer_id'].map(codes))
+        
+        if options['output']:
+            report.to_csv(options['output'], index=False)
+            self.stdout.write(f'Wrote per-issuer results to {options["output"]}')
+        
+        summary = summarize_backtest(report)
+        with pd.option_context('display.width', 200, 'display.max_rows', None, 'display.float_format', '{:.4f}'.format):
+            self.stdout.write(summary.to_string())
+        
+        duration = time.time() - start_time
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Backtested {summary.shape[0]} strategies on {len(issuer_ids)} issuers in {duration:.2f} seconds'
+            )
+        )
@@ -1,15 +1,20 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import datetime
-from core.pipeline import Pipeline, IssuerListFilter
-from core.management.commands.fetch_stock_data_for_symbol import Command as FetchCommand
+from core.pipeline import Pipeline, IssuerListFilter, DataFetchFilter, IncrementalFetchFilter, FETCH_BACKENDS
+from core.models import Issuer
+from core.ingest import PRICE_FIELDS, drop_placeholder_rows
+from core.price_store import PriceStore, PRICE_STORE_DIR
 import pandas as pd
 import os
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 class Command(BaseCommand):
-    help = 'Fetches historical stock data for all symbols and saves yearly CSV files'
+    help = (
+        'Fetches historical stock data for all symbols and saves yearly CSV files, '
+        'or with --incremental stores only the days after each issuer\'s last stored date'
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -23,12 +28,31 @@ class Command(BaseCommand):
             action='store_true',
             help='Enable debug logging'
         )
+        parser.add_argument(
+            '--backend',
+            choices=FETCH_BACKENDS,
+            default='http',
+            help='Fetch backend: plain HTTP form submit with Selenium fallback, or Selenium only (default: http)'
+        )
+        parser.add_argument(
+            '--output',
+            choices=['csv', 'store'],
+            default='csv',
+            help=f'Write yearly CSV files to stock_data/ or append to the per-issuer binary store in {PRICE_STORE_DIR}/ (default: csv)'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Fetch only data after the last stored date of each issuer and save it to the database'
+        )
 
     def handle(self, *args, **options):
         if options['debug']:
             logging.basicConfig(level=logging.DEBUG)
         
-        os.makedirs('stock_data', exist_ok=True)
+        store = PriceStore() if options['output'] == 'store' else None
+        if store is None:
+            os.makedirs('stock_data', exist_ok=True)
         
         self.stdout.write(self.style.WARNING('Fetching symbol list...'))
         pipeline = Pipeline()
@@ -41,25 +65,33 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS(f'Found {len(symbols)} symbols'))
         
+        if options['incremental']:
+            self._handle_incremental(symbols, options)
+            return
+        
         from_year = options['from_year']
-        to_year = 2024
+        to_year = timezone.now().year
         
         completed_symbols = set()
         total_symbols = len(symbols)
         
-        with ThreadPoolExecutor(max_workers=10) as executor:
+        # One filter is shared by all workers so HTTP connections and browsers are reused
+        fetch_filter = DataFetchFilter(max_workers=10, save_to_db=False, backend=options['backend'])
+        
+        with fetch_filter, ThreadPoolExecutor(max_workers=10) as executor:
             futures = []
             for symbol in symbols:
                 for year in range(from_year, to_year + 1):
-                    filename = f'stock_data/{symbol}_{year}.csv'
-                    if os.path.exists(filename):
-                        logging.debug(f'Skipping {filename} - already exists')
+                    if self._year_exists(store, symbol, year):
+                        logging.debug(f'Skipping {symbol} {year} - already exists')
                         continue
                     
                     futures.append(executor.submit(
                         self._process_year,
+                        fetch_filter=fetch_filter,
                         symbol=symbol,
-                        year=year
+                        year=year,
+                        store=store
                     ))
             
             for future in as_completed(futures):
@@ -83,33 +115,91 @@ class Command(BaseCommand):
                         self.style.ERROR(f'Failed processing: {str(e)}')
                     )
 
-    def _process_year(self, symbol, year):
+    def _year_exists(self, store, symbol, year):
+        # The current year keeps getting new trades, so it is fetched on every run
+        if year >= timezone.now().year:
+            return False
+        if store is not None:
+            return store.is_covered(symbol, datetime(year, 1, 1).date(), datetime(year, 12, 31).date())
+        return os.path.exists(f'stock_data/{symbol}_{year}.csv')
+
+    def _process_year(self, fetch_filter, symbol, year, store=None):
         try:
-            fetch_command = FetchCommand()
-            start_date = datetime(year, 1, 1)
-            end_date = datetime(year, 12, 31)
+            start_date = datetime(year, 1, 1).date()
+            # MSE zero-fills the requested range, so don't ask for days still to come
+            end_date = min(datetime(year, 12, 31).date(), timezone.now().date())
             
             logging.debug(f'Fetching {symbol} for {year}')
             
-            data = fetch_command.handle(
-                symbol=symbol,
-                from_date=start_date.strftime('%Y-%m-%d'),
-                to_date=end_date.strftime('%Y-%m-%d'),
-                quiet=True,
-                return_data=True,
-                no_db_save=True
-            )
+            # Failed fetches raise, so an empty result really means no trades
+            data = fetch_filter.process({
+                'symbol': symbol,
+                'issuer': None,
+                'from_date': start_date,
+                'to_date': end_date,
+                'raise_errors': True
+            })
             
-            if data:
-                df = pd.DataFrame(data)
-                if not df.empty:
-                    filename = f'stock_data/{symbol}_{year}.csv'
-                    df.to_csv(filename, index=False)
-                    logging.debug(f'Saved {filename}')
-                    return symbol, year, True
+            df = pd.DataFrame(data)
+            if not df.empty:
+                df = drop_placeholder_rows(df)
+            if store is not None:
+                row_count = store.append(symbol, df) if not df.empty else 0
+                logging.debug(f'Appended {row_count} rows to {store.path(symbol)}')
+                if row_count == 0 and end_date < timezone.now().date():
+                    # Remember finished years without trades so they are not fetched again
+                    store.mark_empty(symbol, start_date, end_date)
+                return symbol, year, row_count > 0
+            filename = f'stock_data/{symbol}_{year}.csv'
+            if not df.empty:
+                df.to_csv(filename, index=False)
+                logging.debug(f'Saved {filename}')
+                return symbol, year, True
+            if end_date < timezone.now().date():
+                # A header-only file marks a finished year without trades
+                pd.DataFrame(columns=['date', *PRICE_FIELDS]).to_csv(filename, index=False)
             
             return symbol, year, False
                 
         except Exception as e:
             logging.error(f'Error processing {symbol} for {year}: {str(e)}')
-            raise
\ No newline at end of file
+            raise
+
+    def _handle_incremental(self, symbols, options):
+        issuers = Issuer.objects.filter(code__in=symbols)
+        high_water_marks = IncrementalFetchFilter.get_high_water_marks()
+        default_from_date = datetime(options['from_year'], 1, 1).date()
+        to_date = timezone.now().date()
+        total_rows = 0
+        
+        fetch_filter = IncrementalFetchFilter(max_workers=10, save_to_db=True, backend=options['backend'])
+        
+        with fetch_filter, ThreadPoolExecutor(max_workers=10) as executor:
+            futures = {
+                executor.submit(fetch_filter.process, {
+                    'symbol': issuer.code,
+                    'issuer': issuer,
+                    'last_date': high_water_marks.get(issuer.pk),
+                    'from_date': default_from_date,
+                    'to_date': to_date
+                }): issuer
+                for issuer in issuers
+            }
+            
+            for future in as_completed(futures):
+                issuer = futures[future]
+                try:
+                    row_count = future.result()
+                    total_rows += row_count
+                    last_date = high_water_marks.get(issuer.pk)
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f'{issuer.code}: {row_count} new rows since {last_date or default_from_date}'
+                        )
+                    )
+                except Exception as e:
+                    self.stdout.write(
+                        self.style.ERROR(f'Failed processing {issuer.code}: {str(e)}')
+                    )
+        
+        self.stdout.write(self.style.SUCCESS(f'Incremental update stored {total_rows} new rows'))
\ No newline at end of file
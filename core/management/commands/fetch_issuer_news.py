@@ -1,12 +1,16 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from django.utils.dateparse import parse_datetime
 from core.models import Issuer, IssuerNews
+from core.sentiment_analysis import get_sentiment_analyzer, refresh_daily_sentiment
+from core.utils import get_http_session, HostRateLimiter
 import requests
 from bs4 import BeautifulSoup
 import logging
 from datetime import datetime
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+ISSUER_URL = 'https://www.mse.mk/en/issuer/{name}'
+REQUEST_TIMEOUT = 30
 
 class Command(BaseCommand):
     help = 'Fetches latest news for issuers from MSE website'
@@ -16,80 +20,143 @@ class Command(BaseCommand):
             '--issuer',
             help='Specific issuer code to fetch news for'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of concurrent requests (default: 4)'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=1.0,
+            help='Maximum requests per second to the MSE website (default: 1)'
+        )
 
     def handle(self, *args, **options):
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
-        
+        start_time = time.time()
+
         if options['issuer']:
             issuers = Issuer.objects.filter(code=options['issuer'])
         else:
             issuers = Issuer.objects.all()
-            
-        for issuer in issuers:
-            try:
-                self.fetch_news_for_issuer(issuer)
-                time.sleep(1)  # Be nice to the server
-            except Exception as e:
-                logging.error(f"Error processing {issuer.code}: {str(e)}")
+
+        self.analyzer = get_sentiment_analyzer()
+        # Retries go through the rate limiter instead of urllib3
+        self.session = get_http_session(pool_size=options['workers'], retries=False)
+        # Politeness is enforced by the rate limit, not by sleeping between issuers
+        self.rate_limiter = HostRateLimiter(rate=options['rate'])
+
+        # Pages are fetched and parsed in threads, the database work stays in this thread
+        added = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {
+                executor.submit(self.fetch_news_for_issuer, issuer): issuer
+                for issuer in issuers
+            }
+            for future in as_completed(futures):
+                issuer = futures[future]
+                try:
+                    news_items = future.result()
+                    if news_items:
+                        added += self.save_news(issuer, news_items)
+                except Exception as e:
+                    logging.error(f"Error processing {issuer.code}: {str(e)}")
+
+        duration = time.time() - start_time
+        self.stdout.write(
+            self.style.SUCCESS(f'Added {added} news items for {len(futures)} issuers in {duration:.2f} seconds')
+        )
 
     def fetch_news_for_issuer(self, issuer):
+        """Return the (title, published_date, source_url) items listed on the issuer page."""
         # Convert issuer name to URL format
-        issuer_url_name = issuer.name.replace(' ', '-')
-        url = f'https://www.mse.mk/en/issuer/{issuer_url_name}'
-        
+        url = ISSUER_URL.format(name=issuer.name.replace(' ', '-'))
+
         logging.info(f"Fetching news for {issuer.code} from {url}")
-        
+
         try:
-            response = requests.get(url)
+            response = self.rate_limiter.get(self.session, url, timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            news_div = soup.find('div', {'id': 'seiNetIssuerLatestNews'})
-            if not news_div:
-                logging.warning(f"No news section found for {issuer.code}")
-                return
-                
-            news_items = news_div.find_all('li')
-            for item in news_items:
-                try:
-                    news_link = item.find('a')
-                    if not news_link:
-                        continue
-                        
-                    source_url = news_link.get('href', '')
-                    if not source_url:
-                        continue
-                        
-                    # Extract title and date
-                    h4_text = item.find('h4').text.strip()
-                    date_str, title = h4_text.split(' - ', 1)
-                    
-                    # Parse date (assuming format MM/DD/YYYY)
-                    try:
-                        published_date = datetime.strptime(date_str, '%m/%d/%Y')
-                    except ValueError:
-                        logging.error(f"Could not parse date: {date_str}")
-                        continue
-                    
-                    # Check if we already have this news item
-                    if not IssuerNews.objects.filter(
-                        issuer=issuer,
-                        source_url=source_url
-                    ).exists():
-                        news = IssuerNews(
-                            issuer=issuer,
-                            title=title,
-                            content='',  # We could fetch the content from seinet.com.mk if needed
-                            published_date=published_date,
-                            source_url=source_url
-                        )
-                        news.save()
-                        logging.info(f"Added news for {issuer.code}: {title}")
-                    
-                except Exception as e:
-                    logging.error(f"Error processing news item for {issuer.code}: {str(e)}")
-                    continue
-                    
         except requests.RequestException as e:
             logging.error(f"Request failed for {issuer.code}: {str(e)}")
-            return 
\ No newline at end of file
+            return None
+
+        soup = BeautifulSoup(response.text, 'lxml')
+        news_div = soup.find('div', {'id': 'seiNetIssuerLatestNews'})
+        if not news_div:
+            logging.warning(f"No news section found for {issuer.code}")
+            return None
+
+        news_items = []
+        for item in news_div.find_all('li'):
+            try:
+                news_link = item.find('a')
+                if not news_link:
+                    continue
+
+                source_url = news_link.get('href', '')
+                if not source_url:
+                    continue
+
+                # Extract title and date
+                h4_text = item.find('h4').text.strip()
+                date_str, title = h4_text.split(' - ', 1)
+
+                # Parse date (assuming format MM/DD/YYYY)
+                try:
+                    published_date = datetime.strptime(date_str, '%m/%d/%Y')
+                except ValueError:
+                    logging.error(f"Could not parse date: {date_str}")
+                    continue
+
+                news_items.append((title, published_date, source_url))
+            except Exception as e:
+                logging.error(f"Error processing news item for {issuer.code}: {str(e)}")
+                continue
+        return news_items
+
+    def save_news(self, issuer, news_items):
+        """Insert the items not stored yet with one lookup and one bulk insert; returns the inserted count."""
+        known_urls = set(
+            IssuerNews.objects.filter(
+                issuer=issuer,
+                source_url__in=[source_url for _, _, source_url in news_items]
+            ).values_list('source_url', flat=True)
+        )
+
+        new_news = []
+        for title, published_date, source_url in news_items:
+            if source_url in known_urls:
+                continue
+            known_urls.add(source_url)
+            news = IssuerNews(
+                issuer=issuer,
+                title=title,
+                content='',  # Filled in by fetch_issuer_news_content
+                published_date=published_date,
+                source_url=source_url
+            )
+            self.analyzer.apply_scores(news)
+            new_news.append(news)
+        if not new_news:
+            return 0
+
+        # The (issuer, source_url) constraint covers items added concurrently by another run
+        IssuerNews.objects.bulk_create(new_news, ignore_conflicts=True)
+        # Rows rejected by the constraint belong to the other run and carry its created_at
+        stored = set(
+            IssuerNews.objects.filter(
+                issuer=issuer,
+                source_url__in=[news.source_url for news in new_news]
+            ).values_list('source_url', 'created_at')
+        )
+        inserted = [news for news in new_news if (news.source_url, news.created_at) in stored]
+        if not inserted:
+            return 0
+
+        for news in inserted:
+            logging.info(f"Added news for {issuer.code}: {news.title}")
+        refresh_daily_sentiment([issuer.id], since=min(news.published_date.date() for news in inserted))
+        return len(inserted)
@@ -1,120 +1,132 @@
 from django.core.management.base import BaseCommand
+from django.utils import timezone
 from core.models import IssuerNews
+from core.sentiment_analysis import get_sentiment_analyzer, refresh_daily_sentiment
+from core.utils import WebScraper, HostRateLimiter, get_http_session, parse_news_content, NEWS_ROW_SELECTOR
+from selenium.webdriver.common.by import By
 import logging
 import time
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+CONTENT_FIELDS = ['content', 'updated_at', 'title_sentiment', 'content_sentiment', 'sentiment_score', 'sentiment_version']
+REQUEST_TIMEOUT = 30
 
 class Command(BaseCommand):
     help = 'Fetches content for news items from seinet.com.mk'
-    
-    def __init__(self):
-        super().__init__()
-        # Initialize Chrome options
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        
-        # Use webdriver_manager to get the correct ChromeDriver
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
-        
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--empty_only',
             action='store_true',
             help='Only fetch content for news items with empty content'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of concurrent fetches; also caps the number of browsers (default: 4)'
+        )
+        parser.add_argument(
+            '--backend',
+            choices=['http', 'selenium'],
+            default='http',
+            help='Try plain HTTP first and fall back to a browser for pages rendered by '
+                 'JavaScript, or always use a browser (default: http)'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=2.0,
+            help='Maximum page loads per second per host (default: 2)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Updated news items per database write (default: 100)'
+        )
 
     def handle(self, *args, **options):
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
-        
+        start_time = time.time()
+
+        self.analyzer = get_sentiment_analyzer()
+        self.backend = options['backend']
+        # Retries go through the rate limiter instead of urllib3
+        self.session = get_http_session(pool_size=options['workers'], retries=False)
+        self.rate_limiter = HostRateLimiter(rate=options['rate'])
+        # Browsers are only started when a page needs one
+        self.scraper = WebScraper(max_workers=options['workers'], headless=True)
+
+        # Get news items that need content
+        if options['empty_only']:
+            news_items = IssuerNews.objects.filter(content='')
+        else:
+            news_items = IssuerNews.objects.all()
+        news_items = list(news_items.exclude(source_url=''))
+
+        total = len(news_items)
+        logging.info(f"Found {total} news items to process")
+
+        # Earliest day with updated content per issuer, for DailySentiment
+        updated_since = {}
+        updates = []
+        updated = 0
         try:
-            # Get news items that need content
-            if options['empty_only']:
-                news_items = IssuerNews.objects.filter(content='')
-            else:
-                news_items = IssuerNews.objects.all()
-                
-            total = news_items.count()
-            logging.info(f"Found {total} news items to process")
-            
-            for i, news in enumerate(news_items, 1):
-                try:
-                    self.fetch_content(news, i, total)
-                    time.sleep(1)  # Be nice to the server
-                except Exception as e:
-                    logging.error(f"Error processing news {news.id}: {str(e)}")
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                futures = {executor.submit(self.fetch_content, news): news for news in news_items}
+                for i, future in enumerate(as_completed(futures), 1):
+                    news = futures[future]
+                    try:
+                        content = future.result()
+                    except Exception as e:
+                        logging.error(f"Error processing {news.source_url}: {str(e)}")
+                        continue
+
+                    if not content:
+                        logging.warning(f"No content found in {news.source_url}")
+                        continue
+                    news.content = content
+                    news.updated_at = timezone.now()  # bulk_update skips auto_now
+                    self.analyzer.apply_scores(news)
+                    updates.append(news)
+                    published = timezone.localdate(news.published_date)
+                    updated_since[news.issuer_id] = min(published, updated_since.get(news.issuer_id, published))
+                    logging.info(f"Updated content for news {news.id} ({i}/{total})")
+
+                    if len(updates) >= options['batch_size']:
+                        updated += self.save_content(updates)
+                        updates = []
+            updated += self.save_content(updates)
         finally:
-            self.driver.quit()
-    
-    def get_text_recursive(self, element):
-        """Recursively get text from all nested divs"""
-        if not element.find_elements(By.TAG_NAME, 'div'):
-            # If no more nested divs, get the text
-            text = element.text.strip()
-            if text:
-                return text
-            # Check for links
-            links = element.find_elements(By.TAG_NAME, 'a')
-            if links:
-                return '\n'.join(f"Link: {link.get_attribute('href')}" 
-                               for link in links 
-                               if link.get_attribute('href') and 
-                               not link.get_attribute('href').startswith('#'))
-            return None
-        
-        # If has nested divs, recurse into them
-        texts = []
-        for div in element.find_elements(By.TAG_NAME, 'div'):
-            text = self.get_text_recursive(div)
-            if text:
-                texts.append(text)
-        return '\n'.join(texts) if texts else None
+            self.scraper.close()
 
-    def fetch_content(self, news, current, total):
-        if not news.source_url:
-            logging.warning(f"No source URL for news {news.id}")
-            return
-            
-        logging.info(f"Processing {current}/{total}: {news.source_url}")
-        
-        try:
-            self.driver.get(news.source_url)
-            wait = WebDriverWait(self.driver, 10)
-            
-            # Get the root div
-            root = wait.until(EC.presence_of_element_located((By.ID, 'root')))
-            
-            # Find main container
-            main = root.find_element(By.CSS_SELECTOR, 'main.main.text-center')
-            container = main.find_element(By.CLASS_NAME, 'container')
-            
-            content_parts = []
-            
-            # Get content from each row div recursively
-            rows = container.find_elements(By.CLASS_NAME, 'row')
-            for row in rows:
-                text = self.get_text_recursive(row)
-                if text:
-                    content_parts.append(text)
-            
-            # Clean and join content
-            content = '\n\n'.join(part for part in content_parts if part)
-            
-            if content:
-                news.content = content
-                news.save()
-                logging.info(f"Updated content for news {news.id} to {content}")
-            else:
-                logging.warning(f"No content found in {news.source_url}")
-                
-        except Exception as e:
-            logging.error(f"Error processing {news.source_url}: {str(e)}")
-            return 
\ No newline at end of file
+        for issuer_id, since in updated_since.items():
+            refresh_daily_sentiment([issuer_id], since=since)
+
+        duration = time.time() - start_time
+        self.stdout.write(
+            self.style.SUCCESS(f'Updated content of {updated}/{total} news items in {duration:.2f} seconds')
+        )
+
+    def fetch_content(self, news):
+        """Return the article text of a news item; runs in a worker thread."""
+        if self.backend == 'http':
+            try:
+                response = self.rate_limiter.get(self.session, news.source_url, timeout=REQUEST_TIMEOUT)
+                response.raise_for_status()
+                content = parse_news_content(response.text, news.source_url)
+                if content:
+                    return content
+            except Exception as e:
+                logging.warning(f"HTTP fetch failed for {news.source_url}, falling back to Selenium: {str(e)}")
+
+        # The app shell already has #root; wait until the article rows are rendered
+        self.rate_limiter.wait(news.source_url)
+        page_source = self.scraper.get_page_source(news.source_url, wait_for=(By.CSS_SELECTOR, NEWS_ROW_SELECTOR))
+        return parse_news_content(page_source, news.source_url)
+
+    def save_content(self, updates):
+        if updates:
+            IssuerNews.objects.bulk_update(updates, CONTENT_FIELDS)
+        return len(updates)
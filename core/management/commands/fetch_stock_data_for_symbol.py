@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from core.pipeline import Pipeline, DataFetchFilter
+from core.pipeline import Pipeline, DataFetchFilter, FETCH_BACKENDS
 from core.models import Issuer
 from datetime import datetime
 
@@ -36,6 +36,12 @@ class Command(BaseCommand):
             action='store_true',
             help='Do not save data to database'
         )
+        parser.add_argument(
+            '--backend',
+            choices=FETCH_BACKENDS,
+            default='http',
+            help='Fetch backend: plain HTTP form submit with Selenium fallback, or Selenium only (default: http)'
+        )
 
     def handle(self, *args, **options):
         try:
@@ -59,9 +65,15 @@ class Command(BaseCommand):
             }
             
             pipeline = Pipeline()
-            pipeline.add_filter(DataFetchFilter(save_to_db=not options.get('no_db_save', False)))
+            pipeline.add_filter(DataFetchFilter(
+                save_to_db=not options.get('no_db_save', False),
+                backend=options.get('backend', 'http')
+            ))
             
-            result = pipeline.execute(input_data)
+            try:
+                result = pipeline.execute(input_data)
+            finally:
+                pipeline.close()
             
             if not options.get('quiet'):
                 self.stdout.write(
@@ -1,86 +1,163 @@
 from django.core.management.base import BaseCommand
-from core.models import Issuer, StockPrice
-from decimal import Decimal
+from django.db import connection
+from core.models import Issuer
+from core.ingest import clean_price_frame, drop_placeholder_rows, copy_stock_prices, bulk_insert_stock_prices, refresh_issuer_quotes
+from core.price_store import PriceStore, PRICE_STORE_DIR
+from core.indicator_store import update_indicator_values
 import pandas as pd
 import os
 import glob
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from django.db import transaction
 import multiprocessing
 
 class Command(BaseCommand):
-    help = 'Imports stock data from CSV files in stock_data folder into the database'
+    help = 'Imports stock data from CSV files in stock_data folder (or the binary price store) into the database'
 
     def add_arguments(self, parser):
         parser.add_argument(
             '--threads',
             type=int,
             default=multiprocessing.cpu_count(),
-            help='Number of threads to use (default: number of CPU cores)'
+            help='Number of threads used to parse CSV files (default: number of CPU cores)'
+        )
+        parser.add_argument(
+            '--source',
+            choices=['csv', 'store'],
+            default='csv',
+            help=f'Read yearly CSV files from stock_data/ or per-issuer files from {PRICE_STORE_DIR}/ (default: csv)'
+        )
+        parser.add_argument(
+            '--write-store',
+            action='store_true',
+            help='Also append the parsed CSV data to the binary price store'
         )
 
     def handle(self, *args, **options):
         start_time = time.time()
-        
+
+        # Preload all Issuer ids into a dictionary for quick access
+        issuer_ids = dict(Issuer.objects.values_list('code', 'id'))
+        if not issuer_ids:
+            self.stdout.write(self.style.ERROR('No issuers found in the database!'))
+            return
+
+        if options['source'] == 'store':
+            frames = self._read_store(PriceStore(), issuer_ids)
+        else:
+            frames = self._read_csv_files(issuer_ids, options)
+        if frames is None:
+            return
+
+        parsed_records = sum(len(frame) for frame in frames)
+        parse_duration = time.time() - start_time
+        self.stdout.write(
+            f'Parsed {parsed_records} records from {len(frames)} files in {parse_duration:.2f} seconds'
+        )
+
+        load_start = time.time()
+        if connection.vendor == 'postgresql':
+            self.stdout.write('Loading with COPY into a staging table')
+            imported = copy_stock_prices(frames)
+        else:
+            self.stdout.write(f'Loading with batched inserts ({connection.vendor} has no COPY)')
+            imported = bulk_insert_stock_prices(frames)
+        load_duration = time.time() - load_start
+
+        quote_count = refresh_issuer_quotes({frame['issuer_id'].iloc[0] for frame in frames})
+
+        # Recompute indicators from the earliest loaded bar of each issuer
+        loaded_from = {}
+        for frame in frames:
+            issuer_id = frame['issuer_id'].iloc[0]
+            first_date = frame['date'].min()
+            loaded_from[issuer_id] = min(first_date, loaded_from.get(issuer_id, first_date))
+        indicator_count = 0
+        for issuer in Issuer.objects.filter(id__in=list(loaded_from)):
+            indicator_count += update_indicator_values(issuer, since=loaded_from[issuer.id])
+
+        duration = time.time() - start_time
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\nImport completed in {duration:.2f} seconds\n'
+                f'Total files processed: {len(frames)}\n'
+                f'Total records imported: {imported}\n'
+                f'Quotes refreshed: {quote_count}\n'
+                f'Indicator values stored: {indicator_count}\n'
+                f'Load throughput: {parsed_records / max(load_duration, 1e-9):,.0f} rows/s '
+                f'({parsed_records / max(duration, 1e-9):,.0f} rows/s overall)'
+            )
+        )
+
+    def _read_store(self, store, issuer_ids):
+        symbols = store.symbols()
+        if not symbols:
+            self.stdout.write(self.style.ERROR(f'No issuer files found in {store.root} directory!'))
+            return None
+
+        self.stdout.write(f'Found {len(symbols)} issuer files to process')
+        frames = []
+        for symbol in symbols:
+            issuer_id = issuer_ids.get(symbol)
+            if not issuer_id:
+                self.stdout.write(self.style.ERROR(f'Issuer "{symbol}" not found!'))
+                continue
+            df = store.read_frame(symbol)
+            df['issuer_id'] = issuer_id
+            frames.append(df)
+        return frames
+
+    def _read_csv_files(self, issuer_ids, options):
         csv_dir = 'stock_data'
         if not os.path.exists(csv_dir):
             self.stdout.write(self.style.ERROR(f'"{csv_dir}" directory not found!'))
-            return
+            return None
 
         csv_files = glob.glob(os.path.join(csv_dir, '*.csv'))
         if not csv_files:
             self.stdout.write(self.style.ERROR('No CSV files found in stock_data directory!'))
-            return
+            return None
 
         self.stdout.write(f'Found {len(csv_files)} CSV files to process')
 
-        # Preload all Issuers into a dictionary for quick access
-        issuers = {issuer.code: issuer for issuer in Issuer.objects.all()}
-        if not issuers:
-            self.stdout.write(self.style.ERROR('No issuers found in the database!'))
-            return
-
-        total_records = 0
-        processed_files = 0
         threads = options['threads']
-        self.stdout.write(f'Using {threads} threads for processing')
+        self.stdout.write(f'Using {threads} threads for parsing')
 
+        # Parsing runs in threads (pandas' C parser releases the GIL); the database
+        # load itself is a single streamed statement
+        frames = []
         with ThreadPoolExecutor(max_workers=threads) as executor:
             futures = [
-                executor.submit(self._process_file, filepath, issuers)
+                executor.submit(self._read_file, filepath, issuer_ids)
                 for filepath in csv_files
             ]
-            
+
             for future in as_completed(futures):
-                result = future.result()
-                if result:
-                    symbol, year, record_count = result
-                    total_records += record_count
-                    processed_files += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'Processed {symbol} {year}: {record_count} records '
-                            f'({processed_files}/{len(csv_files)} files)'
-                        )
-                    )
+                frame = future.result()
+                if frame is not None and not frame.empty:
+                    frames.append(frame)
 
-        duration = time.time() - start_time
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'\nImport completed in {duration:.2f} seconds\n'
-                f'Total files processed: {processed_files}\n'
-                f'Total records imported: {total_records}'
-            )
-        )
+        if options['write_store']:
+            # Files finish parsing in any order; append each issuer's years in
+            # date order with one call so the store only appends in place
+            store = PriceStore()
+            frames_by_symbol = {}
+            for frame in frames:
+                frames_by_symbol.setdefault(frame.attrs['symbol'], []).append(frame)
+            for symbol, symbol_frames in frames_by_symbol.items():
+                history = pd.concat(symbol_frames, ignore_index=True).sort_values('date', kind='stable')
+                store.append(symbol, history)
+            self.stdout.write(f'Appended {len(frames)} files for {len(frames_by_symbol)} issuers to {store.root}')
 
-    def _process_file(self, filepath, issuers):
+        return frames
+
+    def _read_file(self, filepath, issuer_ids):
         try:
             filename = os.path.basename(filepath)
             symbol, year = filename.replace('.csv', '').split('_')
-            
-            issuer = issuers.get(symbol)
-            if not issuer:
+
+            issuer_id = issuer_ids.get(symbol)
+            if not issuer_id:
                 self.stdout.write(
                     self.style.ERROR(f'Issuer "{symbol}" not found!')
                 )
@@ -90,56 +167,14 @@ class Command(BaseCommand):
                 'date', 'last_trade_price', 'max_price', 'min_price',
                 'avg_price', 'price_change', 'volume', 'turnover_best', 'total_turnover'
             ])
-            df.dropna(subset=['date'], inplace=True)
-
-            df.fillna({
-                'last_trade_price': 0,
-                'max_price': 0,
-                'min_price': 0,
-                'avg_price': 0,
-                'price_change': 0,
-                'volume': 0,
-                'turnover_best': 0,
-                'total_turnover': 0
-            }, inplace=True)
-
-            df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d').dt.date
-            df['last_trade_price'] = df['last_trade_price'].astype(float)
-            df['max_price'] = df['max_price'].astype(float)
-            df['min_price'] = df['min_price'].astype(float)
-            df['avg_price'] = df['avg_price'].astype(float)
-            df['price_change'] = df['price_change'].astype(float)
-            df['volume'] = df['volume'].astype(int)
-            df['turnover_best'] = df['turnover_best'].astype(float)
-            df['total_turnover'] = df['total_turnover'].astype(float)
-
-            stock_prices = [
-                StockPrice(
-                    issuer=issuer,
-                    date=row['date'],
-                    last_trade_price=Decimal(f"{row['last_trade_price']:.2f}"),
-                    max_price=Decimal(f"{row['max_price']:.2f}"),
-                    min_price=Decimal(f"{row['min_price']:.2f}"),
-                    avg_price=Decimal(f"{row['avg_price']:.2f}"),
-                    price_change=Decimal(f"{row['price_change']:.2f}"),
-                    volume=row['volume'],
-                    turnover_best=Decimal(f"{row['turnover_best']:.2f}"),
-                    total_turnover=Decimal(f"{row['total_turnover']:.2f}")
-                )
-                for _, row in df.iterrows()
-            ]
+            # Files written by older runs may hold zero-filled days, some of them in the future
+            df = drop_placeholder_rows(clean_price_frame(df)).reset_index(drop=True)
+            df['issuer_id'] = issuer_id
+            df.attrs['symbol'] = symbol
+            return df
 
-            with transaction.atomic():
-                StockPrice.objects.bulk_create(
-                    stock_prices,
-                    ignore_conflicts=True,
-                    batch_size=50000
-                )
-            
-            return symbol, year, len(stock_prices)
-                
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'Error processing {filepath}: {str(e)}')
             )
-            return None
\ No newline at end of file
+            return None
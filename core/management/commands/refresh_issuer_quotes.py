@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from core.ingest import refresh_issuer_quotes
+from core.models import Issuer
+import time
+
+class Command(BaseCommand):
+    help = 'Rebuilds the latest-quote table from stored stock prices'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbol',
+            type=str,
+            help='Issuer code to refresh. If not provided, refreshes all issuers.',
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        
+        issuer_ids = None
+        if options['symbol']:
+            issuer_ids = Issuer.objects.filter(code=options['symbol']).values_list('id', flat=True)
+        
+        count = refresh_issuer_quotes(issuer_ids)
+        
+        duration = time.time() - start_time
+        self.stdout.write(
+            self.style.SUCCESS(f'Refreshed {count} quotes in {duration:.2f} seconds')
+        )
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+from core.models import IssuerNews
+from core.sentiment_analysis import get_sentiment_analyzer, refresh_daily_sentiment, SENTIMENT_VERSION
+from concurrent.futures import ProcessPoolExecutor
+import time
+import multiprocessing
+
+SCORE_FIELDS = ['title_sentiment', 'content_sentiment', 'sentiment_score', 'sentiment_version']
+
+def _score_batch(batch):
+    """Score (id, title, content) rows in a worker process."""
+    analyzer = get_sentiment_analyzer()
+    return [(news_id, analyzer.score_news(title, content)) for news_id, title, content in batch]
+
+class Command(BaseCommand):
+    help = 'Scores the sentiment of stored news items that have no score for the current analyzer version'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rescore every news item, not only unscored or outdated ones'
+        )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=multiprocessing.cpu_count(),
+            help='Number of worker processes (default: number of CPU cores)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='News items per worker task and database update (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        
+        news_items = IssuerNews.objects.all()
+        if not options['all']:
+            news_items = news_items.filter(
+                Q(sentiment_score__isnull=True) | ~Q(sentiment_version=SENTIMENT_VERSION)
+            )
+        rows = list(news_items.order_by('id').values_list('id', 'title', 'content'))
+        issuer_ids = set(news_items.values_list('issuer_id', flat=True).distinct())
+        self.stdout.write(f'Found {len(rows)} news items to score')
+        if not rows:
+            return
+        
+        batch_size = options['batch_size']
+        batches = [rows[start:start + batch_size] for start in range(0, len(rows), batch_size)]
+        
+        # Load the lexicon before forking so workers share it; they only get
+        # plain tuples, so don't let them inherit open connections either
+        get_sentiment_analyzer()
+        connections.close_all()
+        scored = 0
+        with ProcessPoolExecutor(max_workers=options['jobs']) as executor:
+            for results in executor.map(_score_batch, batches):
+                updates = []
+                for news_id, scores in results:
+                    news = IssuerNews(id=news_id, **scores)
+                    updates.append(news)
+                IssuerNews.objects.bulk_update(updates, SCORE_FIELDS)
+                scored += len(updates)
+                self.stdout.write(f'Scored {scored}/{len(rows)} news items')
+        
+        daily_count = refresh_daily_sentiment(issuer_ids)
+        self.stdout.write(f'Rebuilt {daily_count} daily sentiment rows for {len(issuer_ids)} issuers')
+        
+        duration = time.time() - start_time
+        self.stdout.write(
+            self.style.SUCCESS(f'Scored {scored} news items in {duration:.2f} seconds')
+        )
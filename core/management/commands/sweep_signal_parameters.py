@@ -0,0 +1,116 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from core.models import Issuer
+from core.indicator_store import load_price_matrix, INDICATOR_PERIODS
+from core.sweep import (
+    run_sweep, sweep_settings, validate_sweep, best_settings, default_setting, SETTING_COLUMNS, FORWARD_DAYS
+)
+import pandas as pd
+import time
+import multiprocessing
+
+class Command(BaseCommand):
+    help = (
+        'Scores a grid of oscillator thresholds, consensus quorums and periods '
+        'against historical forward returns and reports the best settings per issuer'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbol',
+            type=str,
+            help='Issuer code to evaluate. If not provided, evaluates all issuers.',
+        )
+        parser.add_argument(
+            '--periods',
+            type=int,
+            nargs='+',
+            default=INDICATOR_PERIODS,
+            help=f'Indicator periods to try (default: {" ".join(map(str, INDICATOR_PERIODS))})'
+        )
+        parser.add_argument(
+            '--horizon',
+            type=int,
+            default=FORWARD_DAYS,
+            help=f'Trading days ahead used to score a signal (default: {FORWARD_DAYS})'
+        )
+        parser.add_argument(
+            '--min-signals',
+            type=int,
+            default=20,
+            help='Ignore settings that give an issuer fewer signals than this (default: 20)'
+        )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=multiprocessing.cpu_count(),
+            help='Number of worker processes (default: number of CPU cores)'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Write the score of every setting and issuer to this CSV file'
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        
+        if options['jobs'] < 1:
+            raise CommandError('--jobs must be at least 1')
+        settings = sweep_settings(options['periods'])
+        try:
+            validate_sweep(options['periods'], settings, options['horizon'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        
+        issuers = Issuer.objects.all()
+        if options['symbol']:
+            issuers = issuers.filter(code=options['symbol'])
+        codes = dict(issuers.values_list('id', 'code'))
+        if not codes:
+            self.stdout.write(self.style.ERROR('No issuers found!'))
+            return
+        
+        dates, issuer_ids, close, high, low = load_price_matrix(codes)
+        if len(dates) == 0:
+            self.stdout.write(self.style.ERROR('No stock prices found!'))
+            return
+        
+        self.stdout.write(
+            f'Evaluating {len(settings)} settings on {len(issuer_ids)} issuers '
+            f'({dates[0]} - {dates[-1]}) with {options["jobs"]} workers'
+        )
+        
+        # Workers only get numpy arrays; don't let them inherit open connections
+        connections.close_all()
+        report = run_sweep(
+            close, high, low, issuer_ids, options['periods'], settings,
+            horizon=options['horizon'], jobs=options['jobs']
+        )
+        report.insert(len(SETTING_COLUMNS), 'symbol', report['issuer_id'].map(codes))
+        
+        if options['output']:
+            report.to_csv(options['output'], index=False)
+            self.stdout.write(f'Wrote {len(report)} rows to {options["output"]}')
+        
+        eligible = report[report['signals'] >= options['min_signals']]
+        overall = eligible.groupby(SETTING_COLUMNS)['mean_return'].agg(['mean', 'count'])
+        overall = overall[overall['count'] == overall['count'].max()].sort_values('mean', ascending=False)
+        
+        self.stdout.write(self.style.WARNING('\nBest settings across issuers:'))
+        with pd.option_context('display.width', 200, 'display.float_format', '{:.5f}'.format):
+            self.stdout.write(overall.head(10).to_string())
+            
+            for period in options['periods']:
+                default = overall['mean'].get(default_setting(period))
+                if default is not None:
+                    self.stdout.write(f'Default settings for period {period}: {default:.5f}')
+            
+            self.stdout.write(self.style.WARNING('\nBest settings per issuer:'))
+            best = best_settings(report, options['min_signals'])
+            self.stdout.write(best.set_index('symbol').to_string())
+        
+        duration = time.time() - start_time
+        self.stdout.write(
+            self.style.SUCCESS(f'Evaluated {len(settings)} settings in {duration:.2f} seconds')
+        )
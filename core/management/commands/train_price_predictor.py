@@ -1,12 +1,28 @@
 from django.core.management.base import BaseCommand
-from core.models import Issuer, StockPrice
-from core.lstm_prediction import TimeSeriesPredictor
-import numpy as np
-import joblib
+from django.db import connections
+from core.models import Issuer
+from core.lstm_prediction import (
+    load_training_prices, train_price_model, MIN_TRAINING_DAYS, INCREMENTAL_EPOCHS, FORECAST_HORIZON
+)
+from threadpoolctl import threadpool_limits
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
 import os
-from datetime import datetime, timedelta
+import time
 from django.conf import settings
 
+def _init_worker(blas_threads):
+    # Without a cap every worker's BLAS would start one thread per core
+    threadpool_limits(limits=blas_threads)
+
+def _train_issuer(symbol, dates, prices, models_dir, incremental, epochs, horizon):
+    """Train one issuer in a worker process; returns (symbol, metrics, mode, error)."""
+    try:
+        metrics, mode = train_price_model(symbol, dates, prices, models_dir, incremental, epochs, horizon)
+        return symbol, metrics, mode, None
+    except Exception as e:
+        return symbol, None, None, str(e)
+
 class Command(BaseCommand):
     help = 'Train price prediction models for all stocks'
 
@@ -16,10 +32,43 @@ class Command(BaseCommand):
             type=str,
             help='Stock symbol to train model for. If not provided, trains for all stocks.',
         )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=1,
+            help='Number of worker processes training issuers in parallel (default: 1)'
+        )
+        parser.add_argument(
+            '--horizon',
+            type=int,
+            default=FORECAST_HORIZON,
+            help=f'Days predicted at once by each model; 1 trains next-day models that are '
+                 f'applied recursively (default: {FORECAST_HORIZON})'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Continue training existing models on the new days instead of retraining '
+                 'from scratch; falls back to a full retrain when prices leave the scaler '
+                 'range or validation error drifts'
+        )
+        parser.add_argument(
+            '--epochs',
+            type=int,
+            default=INCREMENTAL_EPOCHS,
+            help=f'Training epochs of an incremental update (default: {INCREMENTAL_EPOCHS})'
+        )
+        parser.add_argument(
+            '--blas-threads',
+            type=int,
+            help='BLAS threads per worker (default: number of CPU cores divided by --jobs)'
+        )
 
     def handle(self, *args, **options):
+        start_time = time.time()
+
         # Create models directory if it doesn't exist
-        models_dir = os.path.join(settings.BASE_DIR, 'trained_models')
+        models_dir = settings.TRAINED_MODELS_DIR
         if not os.path.exists(models_dir):
             os.makedirs(models_dir)
 
@@ -28,47 +77,52 @@ class Command(BaseCommand):
         else:
             issuers = Issuer.objects.all()
 
+        # All price histories in one query
+        issuers = list(issuers)
+        histories = load_training_prices([issuer.id for issuer in issuers])
+
+        tasks = []
         for issuer in issuers:
-            self.stdout.write(f"Training model for {issuer.code}...")
-            
-            # Get historical prices
-            historical_prices = StockPrice.objects.filter(
-                issuer=issuer
-            ).order_by('date').values_list('last_trade_price', flat=True)
-            
-            if len(historical_prices) <= 30:
+            dates, prices = histories.get(issuer.code, ((), ()))
+            if len(prices) <= MIN_TRAINING_DAYS:
                 self.stdout.write(self.style.WARNING(
-                    f"Skipping {issuer.code}: Not enough data (need >30 days, got {len(historical_prices)})"
+                    f"Skipping {issuer.code}: Not enough data (need >{MIN_TRAINING_DAYS} days, got {len(prices)})"
                 ))
                 continue
+            tasks.append((issuer.code, dates, prices, models_dir, options['incremental'], options['epochs'],
+                          options['horizon']))
 
-            try:
-                # Convert to numpy array
-                prices = np.array([float(price) for price in historical_prices])
-                
-                # Initialize and train predictor
-                predictor = TimeSeriesPredictor(sequence_length=10)
-                training_results = predictor.train(prices)
-                
-                # Save the trained model and scaler
-                model_path = os.path.join(models_dir, f'{issuer.code}_model.joblib')
-                scaler_path = os.path.join(models_dir, f'{issuer.code}_scaler.joblib')
-                
-                joblib.dump(predictor.model, model_path)
-                joblib.dump(predictor.scaler, scaler_path)
-                
-                # Save training metrics
-                metrics_path = os.path.join(models_dir, f'{issuer.code}_metrics.joblib')
-                joblib.dump(training_results['metrics'], metrics_path)
-                
-                self.stdout.write(self.style.SUCCESS(
-                    f"Successfully trained model for {issuer.code} - "
-                    f"Train RMSE: {training_results['metrics']['train_rmse']:.2f}, "
-                    f"Val RMSE: {training_results['metrics']['val_rmse']:.2f}"
-                ))
-                
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(
-                    f"Error training model for {issuer.code}: {str(e)}"
-                ))
-                continue 
\ No newline at end of file
+        jobs = max(1, options['jobs'])
+        blas_threads = options['blas_threads'] or max(1, multiprocessing.cpu_count() // jobs)
+        trained = 0
+        if jobs > 1:
+            self.stdout.write(f"Training {len(tasks)} models with {jobs} workers, {blas_threads} BLAS threads each")
+            # Workers only get arrays, so don't let them inherit open connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                     initargs=(blas_threads,)) as executor:
+                futures = [executor.submit(_train_issuer, *task) for task in tasks]
+                for future in as_completed(futures):
+                    trained += self._report(*future.result())
+        else:
+            with threadpool_limits(limits=options['blas_threads']):
+                for task in tasks:
+                    self.stdout.write(f"Training model for {task[0]}...")
+                    trained += self._report(*_train_issuer(*task))
+
+        duration = time.time() - start_time
+        self.stdout.write(f"Trained {trained}/{len(tasks)} models in {duration:.2f} seconds")
+
+    def _report(self, symbol, metrics, mode, error):
+        if error is not None:
+            self.stdout.write(self.style.ERROR(f"Error training model for {symbol}: {error}"))
+            return 0
+        if mode == 'unchanged':
+            self.stdout.write(f"Model for {symbol} is up to date")
+            return 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully trained model for {symbol} ({mode}) - "
+            f"Train RMSE: {metrics['train_rmse']:.2f}, "
+            f"Val RMSE: {metrics['val_rmse']:.2f}"
+        ))
+        return 1
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from core.indicator_store import update_indicator_values, INDICATOR_PERIODS
+from core.models import Issuer, IndicatorValue, IndicatorState
+import time
+
+class Command(BaseCommand):
+    help = 'Computes and stores technical indicators for bars that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbol',
+            type=str,
+            help='Issuer code to update. If not provided, updates all issuers.',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Delete stored values first and recompute the full history'
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        
+        if options['symbol']:
+            issuers = Issuer.objects.filter(code=options['symbol'])
+        else:
+            issuers = Issuer.objects.all()
+        
+        if options['rebuild']:
+            IndicatorValue.objects.filter(issuer__in=issuers).delete()
+            IndicatorState.objects.filter(issuer__in=issuers).delete()
+        
+        total = 0
+        for issuer in issuers:
+            count = update_indicator_values(issuer, INDICATOR_PERIODS)
+            total += count
+            self.stdout.write(f'{issuer.code}: {count} values stored')
+        
+        duration = time.time() - start_time
+        self.stdout.write(
+            self.style.SUCCESS(f'Stored {total} indicator values in {duration:.2f} seconds')
+        )
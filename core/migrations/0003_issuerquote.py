@@ -0,0 +1,30 @@
+# Generated by Django 5.1.2 on 2026-10-18 18:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_issuernews'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssuerQuote',
+            fields=[
+                ('issuer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='quote', serialize=False, to='core.issuer')),
+                ('date', models.DateField()),
+                ('last_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('previous_close', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('price_change', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('last_volume', models.IntegerField()),
+                ('price_1w', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('price_1m', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('price_3m', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('price_1y', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
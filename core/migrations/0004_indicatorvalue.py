@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_issuerquote'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicatorValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('period', models.PositiveSmallIntegerField()),
+                ('sma', models.FloatField(null=True)),
+                ('ema', models.FloatField(null=True)),
+                ('wma', models.FloatField(null=True)),
+                ('tema', models.FloatField(null=True)),
+                ('kama', models.FloatField(null=True)),
+                ('rsi', models.FloatField(null=True)),
+                ('stoch', models.FloatField(null=True)),
+                ('cci', models.FloatField(null=True)),
+                ('macd', models.FloatField(null=True)),
+                ('willr', models.FloatField(null=True)),
+                ('issuer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='indicator_values', to='core.issuer')),
+            ],
+            options={
+                'unique_together': {('issuer', 'period', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_indicatorvalue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicatorState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.PositiveSmallIntegerField()),
+                ('date', models.DateField()),
+                ('state', models.JSONField()),
+                ('issuer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='indicator_states', to='core.issuer')),
+            ],
+            options={
+                'unique_together': {('issuer', 'period')},
+            },
+        ),
+    ]
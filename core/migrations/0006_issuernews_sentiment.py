@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_indicatorstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issuernews',
+            name='content_sentiment',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='issuernews',
+            name='sentiment_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='issuernews',
+            name='sentiment_version',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='issuernews',
+            name='title_sentiment',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
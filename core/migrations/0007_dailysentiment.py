@@ -0,0 +1,76 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Abs, TruncDate
+
+
+def build_daily_sentiment(apps, schema_editor, issuer_ids=None):
+    """Aggregate the articles scored before this migration.
+
+    Also used by 0008 to rebuild the issuers whose duplicate articles it
+    removed; issuer_ids limits the rebuild to those issuers.
+    """
+    IssuerNews = apps.get_model('core', 'IssuerNews')
+    DailySentiment = apps.get_model('core', 'DailySentiment')
+    news = IssuerNews.objects.filter(sentiment_score__isnull=False)
+    if issuer_ids is not None:
+        news = news.filter(issuer_id__in=issuer_ids)
+    score = F('sentiment_score')
+    aggregates = (
+        news.annotate(day=TruncDate('published_date'))
+        .values('issuer_id', 'day')
+        .annotate(
+            article_count=Count('id'),
+            score_sum=Sum(score),
+            abs_sum=Sum(Abs(score)),
+            weighted_sum=Sum(score * Abs(score)),
+            positive_count=Count('id', filter=Q(sentiment_score__gt=0.05)),
+            negative_count=Count('id', filter=Q(sentiment_score__lt=-0.05)),
+        )
+    )
+    DailySentiment.objects.bulk_create([
+        DailySentiment(
+            issuer_id=row['issuer_id'],
+            date=row['day'],
+            article_count=row['article_count'],
+            score_sum=row['score_sum'],
+            mean_score=row['score_sum'] / row['article_count'],
+            weighted_score=row['weighted_sum'] / row['abs_sum'] if row['abs_sum'] else None,
+            positive_count=row['positive_count'],
+            neutral_count=row['article_count'] - row['positive_count'] - row['negative_count'],
+            negative_count=row['negative_count'],
+        )
+        for row in aggregates
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_issuernews_sentiment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySentiment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('article_count', models.PositiveIntegerField()),
+                ('score_sum', models.FloatField()),
+                ('mean_score', models.FloatField()),
+                ('weighted_score', models.FloatField(null=True)),
+                ('positive_count', models.PositiveIntegerField()),
+                ('neutral_count', models.PositiveIntegerField()),
+                ('negative_count', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('issuer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sentiment', to='core.issuer')),
+            ],
+            options={
+                'unique_together': {('issuer', 'date')},
+            },
+        ),
+        migrations.RunPython(build_daily_sentiment, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:20
+
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# Module names starting with a digit can't be imported with an import statement
+daily_sentiment = import_module('core.migrations.0007_dailysentiment')
+
+
+def remove_duplicate_news(apps, schema_editor):
+    """Keep one article per (issuer, source_url) and rebuild the daily sentiment of affected issuers.
+
+    The kept row is the oldest one with content, or the oldest one if none
+    has content yet.
+    """
+    IssuerNews = apps.get_model('core', 'IssuerNews')
+    DailySentiment = apps.get_model('core', 'DailySentiment')
+    duplicates = (
+        IssuerNews.objects.exclude(source_url='')
+        .values('issuer_id', 'source_url')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+    )
+    to_delete = []
+    issuer_ids = set()
+    for group in duplicates:
+        rows = list(
+            IssuerNews.objects.filter(issuer_id=group['issuer_id'], source_url=group['source_url'])
+            .order_by('id')
+            .values_list('id', 'content')
+        )
+        keep = next((news_id for news_id, content in rows if content), rows[0][0])
+        to_delete.extend(news_id for news_id, _ in rows if news_id != keep)
+        issuer_ids.add(group['issuer_id'])
+    if not to_delete:
+        return
+
+    for start in range(0, len(to_delete), 500):
+        IssuerNews.objects.filter(id__in=to_delete[start:start + 500]).delete()
+
+    DailySentiment.objects.filter(issuer_id__in=issuer_ids).delete()
+    daily_sentiment.build_daily_sentiment(apps, schema_editor, issuer_ids=issuer_ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_dailysentiment'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_news, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='issuernews',
+            constraint=models.UniqueConstraint(condition=models.Q(('source_url', ''), _negated=True), fields=('issuer', 'source_url'), name='unique_issuer_news_source_url'),
+        ),
+    ]
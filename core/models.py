@@ -14,6 +14,11 @@ class IssuerNews(models.Model):
     content = models.TextField()
     published_date = models.DateTimeField()
     source_url = models.URLField(max_length=500, blank=True)
+    # VADER compound scores (-1 to 1), filled when the article is stored or updated
+    title_sentiment = models.FloatField(null=True, blank=True)
+    content_sentiment = models.FloatField(null=True, blank=True)
+    sentiment_score = models.FloatField(null=True, blank=True)
+    sentiment_version = models.CharField(max_length=20, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -24,6 +29,13 @@ class IssuerNews(models.Model):
             models.Index(fields=['published_date']),
             models.Index(fields=['issuer', 'published_date'])
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['issuer', 'source_url'],
+                condition=~models.Q(source_url=''),
+                name='unique_issuer_news_source_url'
+            )
+        ]
 
     def __str__(self):
         return f"{self.issuer.code} - {self.title[:50]}"
@@ -45,4 +57,88 @@ class StockPrice(models.Model):
         indexes = [
             models.Index(fields=['date']),
             models.Index(fields=['issuer', 'date'])
-        ]
\ No newline at end of file
+        ]
+
+class IssuerQuote(models.Model):
+    """Latest quote of an issuer, denormalized from StockPrice on ingest.
+
+    The reference prices are the last closes on or before 1 week, 1 month,
+    3 months and 1 year before the quote date.
+    """
+    issuer = models.OneToOneField(Issuer, on_delete=models.CASCADE, primary_key=True, related_name='quote')
+    date = models.DateField()
+    last_price = models.DecimalField(max_digits=10, decimal_places=2)
+    previous_close = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    price_change = models.DecimalField(max_digits=10, decimal_places=2)
+    last_volume = models.IntegerField()
+    price_1w = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    price_1m = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    price_3m = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    price_1y = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def change_since(self, field):
+        """Percentage change of last_price against one of the reference prices."""
+        reference = getattr(self, field)
+        if not reference:
+            return None
+        return float((self.last_price - reference) / reference * 100)
+
+    def __str__(self):
+        return f"{self.issuer.code} - {self.last_price} ({self.date})"
+
+class IndicatorValue(models.Model):
+    """Technical indicators of one issuer for one bar and period, filled after ingest."""
+    issuer = models.ForeignKey(Issuer, on_delete=models.CASCADE, related_name='indicator_values')
+    date = models.DateField()
+    period = models.PositiveSmallIntegerField()
+    sma = models.FloatField(null=True)
+    ema = models.FloatField(null=True)
+    wma = models.FloatField(null=True)
+    tema = models.FloatField(null=True)
+    kama = models.FloatField(null=True)
+    rsi = models.FloatField(null=True)
+    stoch = models.FloatField(null=True)
+    cci = models.FloatField(null=True)
+    macd = models.FloatField(null=True)
+    willr = models.FloatField(null=True)
+
+    class Meta:
+        # The unique index also serves range reads by (issuer, period, date)
+        unique_together = ['issuer', 'period', 'date']
+
+    def __str__(self):
+        return f"{self.issuer.code} - {self.date} ({self.period})"
+
+class IndicatorState(models.Model):
+    """Serialized IndicatorEngine of one issuer and period after its last stored bar."""
+    issuer = models.ForeignKey(Issuer, on_delete=models.CASCADE, related_name='indicator_states')
+    period = models.PositiveSmallIntegerField()
+    date = models.DateField()
+    state = models.JSONField()
+
+    class Meta:
+        unique_together = ['issuer', 'period']
+
+    def __str__(self):
+        return f"{self.issuer.code} - {self.period} @ {self.date}"
+
+class DailySentiment(models.Model):
+    """News sentiment of one issuer on one day, aggregated from the scored IssuerNews rows."""
+    issuer = models.ForeignKey(Issuer, on_delete=models.CASCADE, related_name='daily_sentiment')
+    date = models.DateField()
+    article_count = models.PositiveIntegerField()
+    score_sum = models.FloatField()
+    mean_score = models.FloatField()
+    # Mean weighted by |score|, so strongly worded articles count more; None if all scores are 0
+    weighted_score = models.FloatField(null=True)
+    positive_count = models.PositiveIntegerField()
+    neutral_count = models.PositiveIntegerField()
+    negative_count = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['issuer', 'date']
+
+    def __str__(self):
+        return f"{self.issuer.code} - {self.date}: {self.mean_score:.3f} ({self.article_count})"
@@ -1,20 +1,37 @@
 from abc import ABC, abstractmethod
 from typing import Any
 from .models import Issuer, StockPrice
-from .utils import WebScraper
-from decimal import Decimal
+from .utils import WebScraper, HttpScraper
+from .ingest import upsert_stock_prices, drop_placeholder_rows, refresh_issuer_quotes
+from .indicator_store import update_indicator_values
+from django.db.models import Max
+from django.utils import timezone
+from datetime import date, timedelta
 import pandas as pd
+import logging
 import time
 
+FETCH_BACKENDS = ('http', 'selenium')
+
 class Filter(ABC):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     @abstractmethod
     def process(self, input_data: Any) -> Any:
         pass
 
+    def close(self):
+        """Release resources such as pooled browsers held by the filter."""
+        pass
+
 class IssuerListFilter(Filter):
     def process(self, input_data=None):
-        scraper = WebScraper(headless=True)
-        symbols = scraper.get_symbols()
+        with WebScraper(max_workers=1, headless=True) as scraper:
+            symbols = scraper.get_symbols()
         
         # create or update issuers in database, excluding symbols starting with 'E'
         filtered_symbols = []
@@ -29,79 +46,52 @@ class IssuerListFilter(Filter):
         return filtered_symbols
 
 class DataFetchFilter(Filter):
-    def __init__(self, max_workers=10, save_to_db=True):
+    def __init__(self, max_workers=10, save_to_db=True, backend='http'):
+        if backend not in FETCH_BACKENDS:
+            raise ValueError(f"Unknown fetch backend '{backend}', expected one of {FETCH_BACKENDS}")
         self.max_workers = max_workers
+        self.backend = backend
+        self.http_scraper = HttpScraper(max_workers=max_workers) if backend == 'http' else None
         self.scraper = WebScraper(max_workers=max_workers, headless=True)
         self.save_to_db = save_to_db
 
-    def format_price(self, value):
-        """Format the price as '20.456,00'."""
-        if value is None:
-            return "0,00"
-        value = Decimal(value)
-        return f"{value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+    def _fetch_stock_data(self, symbol, from_date, to_date, raise_errors=False):
+        # The HTTP backend raises on failure, in which case we fall back to Selenium.
+        # With raise_errors a failed fallback raises too, instead of returning an
+        # empty history that is indistinguishable from a period without trades
+        if self.http_scraper is not None:
+            try:
+                return self.http_scraper.get_stock_data(symbol, from_date, to_date)
+            except Exception as e:
+                logging.warning(f"HTTP fetch failed for {symbol}, falling back to Selenium: {str(e)}")
+        return self.scraper.get_stock_data(symbol, from_date, to_date, raise_errors=raise_errors)
+
+    def close(self):
+        self.scraper.close()
 
     def _save_stock_data(self, df, issuer):
         if not self.save_to_db:
-            return
-            
-        # Rename columns to match our model fields
-        column_mapping = {
-            'last trade price': 'last_trade_price',
-            'avg. price': 'avg_price',
-            '%chg.': 'price_change',
-            'turnover in best in denars': 'turnover_best',
-            'total turnover in denars': 'total_turnover'
-        }
-        df = df.rename(columns=column_mapping)
+            return None
         
-        for _, row in df.iterrows():
-            try:
-                defaults = {}
-                fields = {
-                    'last_trade_price': lambda x: Decimal(str(x)) if pd.notna(x) else Decimal('0'),
-                    'max_price': lambda x: Decimal(str(x)) if pd.notna(x) else Decimal('0'),
-                    'min_price': lambda x: Decimal(str(x)) if pd.notna(x) else Decimal('0'),
-                    'avg_price': lambda x: Decimal(str(x)) if pd.notna(x) else Decimal('0'),
-                    'price_change': lambda x: Decimal(str(x)) if pd.notna(x) else Decimal('0'),
-                    'volume': lambda x: int(float(x)) if pd.notna(x) else 0,
-                    'turnover_best': lambda x: Decimal(str(x)) if pd.notna(x) else Decimal('0'),
-                    'total_turnover': lambda x: Decimal(str(x)) if pd.notna(x) else Decimal('0')
-                }
-                
-                for field, converter in fields.items():
-                    try:
-                        value = row.get(field)
-                        if isinstance(value, str):
-                            value = value.replace(',', '')
-                        defaults[field] = converter(value)
-                    except (ValueError, TypeError, KeyError) as e:
-                        print(f"Error converting {field}: {value} - {str(e)}")
-                        defaults[field] = Decimal('0') if field != 'volume' else 0
-
-                # Format the price fields
-                for field in ['last_trade_price', 'max_price', 'min_price', 'avg_price', 'price_change', 'turnover_best', 'total_turnover']:
-                    if field in defaults:
-                        defaults[field] = self.format_price(defaults[field])
-
-                StockPrice.objects.update_or_create(
-                    issuer=issuer,
-                    date=row['date'],
-                    defaults=defaults
-                )
-            except Exception as e:
-                print(f"Error saving row {row.get('date', 'unknown date')}: {str(e)}")
-                print(f"Row data: {row.to_dict()}")
-                continue
+        stats = upsert_stock_prices(issuer, df)
+        logging.info(
+            f"Saved {issuer.code}: {stats['inserted']} inserted, "
+            f"{stats['updated']} updated, {stats['unchanged']} unchanged"
+        )
+        if stats['inserted'] or stats['updated']:
+            refresh_issuer_quotes([issuer.pk])
+            update_indicator_values(issuer, since=stats['changed_from'])
+        return stats
     
     def process(self, input_data):
         if not input_data:
             return []
         
-        df = self.scraper.get_stock_data(
+        df = self._fetch_stock_data(
             input_data['symbol'], 
             input_data['from_date'],
-            input_data['to_date']
+            input_data['to_date'],
+            raise_errors=input_data.get('raise_errors', False)
         )
         
         if not df.empty:
@@ -109,6 +99,65 @@ class DataFetchFilter(Filter):
             return df.to_dict('records')
         return []
 
+class IncrementalFetchFilter(DataFetchFilter):
+    """Fetches and stores only the bars after an issuer's last stored date.
+
+    Expects input_data with 'symbol', 'issuer', 'last_date' (None when the
+    issuer has no prices yet) and optionally 'from_date'/'to_date'. Returns
+    the number of new rows stored, and raises when no fetch succeeded.
+    """
+
+    @staticmethod
+    def get_high_water_marks():
+        """Map issuer id to its latest stored StockPrice date in a single query."""
+        return dict(
+            StockPrice.objects.values('issuer')
+            .annotate(last_date=Max('date'))
+            .values_list('issuer', 'last_date')
+        )
+
+    @staticmethod
+    def _year_chunks(from_date, to_date):
+        # MSE only serves up to a year of history per request
+        start = from_date
+        while start <= to_date:
+            end = min(date(start.year, 12, 31), to_date)
+            yield start, end
+            start = end + timedelta(days=1)
+
+    def process(self, input_data):
+        if not input_data:
+            return 0
+        
+        last_date = input_data.get('last_date')
+        to_date = input_data.get('to_date') or timezone.now().date()
+        from_date = last_date + timedelta(days=1) if last_date else input_data['from_date']
+        if from_date > to_date:
+            return 0
+        
+        # Stop at the first failed chunk: storing later chunks would move the
+        # high-water mark past the gap and it would never be fetched again
+        frames = []
+        for start, end in self._year_chunks(from_date, to_date):
+            try:
+                frames.append(self._fetch_stock_data(input_data['symbol'], start, end, raise_errors=True))
+            except Exception as e:
+                if not frames:
+                    raise RuntimeError(f"Fetching {input_data['symbol']} from {start} failed: {str(e)}") from e
+                logging.warning(f"Fetching {input_data['symbol']} from {start} failed, storing the earlier days: {str(e)}")
+                break
+        df = pd.concat(frames, ignore_index=True)
+        
+        df = drop_placeholder_rows(df)
+        df = df[pd.to_datetime(df['date']).dt.date >= from_date]
+        row_count = 0
+        if not df.empty:
+            stats = self._save_stock_data(df, input_data['issuer'])
+            row_count = stats['inserted'] + stats['updated'] if stats else len(df)
+        # At least one fetch succeeded, so the issuer is up to date as far as MSE knows
+        Issuer.objects.filter(pk=input_data['issuer'].pk).update(last_updated=timezone.now())
+        return row_count
+
 class Pipeline:
     def __init__(self):
         self.filters = []
@@ -117,6 +166,10 @@ class Pipeline:
     def add_filter(self, filter: Filter):
         self.filters.append(filter)
 
+    def close(self):
+        for filter in self.filters:
+            filter.close()
+
     def execute(self, input_data=None):
         self.start_time = time.time()
         data = input_data
@@ -0,0 +1,174 @@
+from datetime import date
+import json
+import os
+import threading
+from typing import List
+import numpy as np
+import pandas as pd
+from .ingest import PRICE_FIELDS, clean_price_frame, drop_placeholder_rows
+
+PRICE_STORE_DIR = 'price_store'
+
+MAGIC = b'MSEPRC01'
+# Magic + little-endian uint32 format version + uint32 record size
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('version', '<u4'), ('record_size', '<u4')])
+FORMAT_VERSION = 1
+
+# Dates are stored as days since 1970-01-01
+RECORD_DTYPE = np.dtype(
+    [('date', '<i4')] +
+    [(field, '<i8') if field == 'volume' else (field, '<f8') for field in PRICE_FIELDS]
+)
+
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+def frame_to_records(df: pd.DataFrame) -> np.ndarray:
+    """Convert a price frame into a date-sorted record array."""
+    df = clean_price_frame(df)
+    records = np.empty(len(df), dtype=RECORD_DTYPE)
+    dates = pd.to_datetime(df['date']).to_numpy().astype('datetime64[D]')
+    records['date'] = (dates - _EPOCH).astype('int32')
+    for field in PRICE_FIELDS:
+        records[field] = df[field].to_numpy()
+    return np.sort(records, order='date')
+
+def records_to_frame(records: np.ndarray) -> pd.DataFrame:
+    """Convert stored records back into a frame with datetime.date values."""
+    df = pd.DataFrame({field: records[field] for field in PRICE_FIELDS})
+    dates = _EPOCH + records['date'].astype('timedelta64[D]')
+    df.insert(0, 'date', pd.to_datetime(dates).date)
+    return df
+
+class PriceStore:
+    """One binary file per issuer holding fixed-size typed price records.
+
+    The file is a small header followed by RECORD_DTYPE records sorted by
+    date, so a whole history opens with one np.memmap call and each field
+    (records['last_trade_price'], ...) is a zero-copy view. New bars are
+    appended in place; out-of-order writes fall back to an atomic rewrite.
+    """
+
+    def __init__(self, root: str = PRICE_STORE_DIR):
+        self.root = root
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, symbol: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def path(self, symbol: str) -> str:
+        return os.path.join(self.root, f'{symbol}.prices')
+
+    def symbols(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            filename[:-len('.prices')]
+            for filename in os.listdir(self.root)
+            if filename.endswith('.prices')
+        )
+
+    def read(self, symbol: str) -> np.ndarray:
+        """Memory-map the full history of an issuer (read-only, zero-copy)."""
+        path = self.path(symbol)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=RECORD_DTYPE)
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) != 1 or header['magic'][0] != MAGIC:
+            raise ValueError(f'{path} is not a price store file')
+        if header['version'][0] != FORMAT_VERSION or header['record_size'][0] != RECORD_DTYPE.itemsize:
+            raise ValueError(f'{path} has unsupported format version {header["version"][0]}')
+        if os.path.getsize(path) == HEADER_DTYPE.itemsize:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_DTYPE.itemsize)
+
+    def read_frame(self, symbol: str) -> pd.DataFrame:
+        return records_to_frame(self.read(symbol))
+
+    def has_data_between(self, symbol: str, from_date, to_date) -> bool:
+        dates = self.read(symbol)['date']
+        start = (np.datetime64(from_date, 'D') - _EPOCH).astype('int32')
+        end = (np.datetime64(to_date, 'D') - _EPOCH).astype('int32')
+        return bool(np.any((dates >= start) & (dates <= end)))
+
+    def _empty_ranges_path(self, symbol: str) -> str:
+        return os.path.join(self.root, f'{symbol}.empty.json')
+
+    def _empty_ranges(self, symbol: str) -> list:
+        path = self._empty_ranges_path(symbol)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return json.load(f)
+
+    def mark_empty(self, symbol: str, from_date, to_date):
+        """Record that the issuer had no trades from from_date to to_date.
+
+        Such ranges have no records, so without this is_covered would
+        report them missing and they would be fetched again on every run.
+        """
+        with self._lock(symbol):
+            ranges = self._empty_ranges(symbol)
+            entry = [from_date.isoformat(), to_date.isoformat()]
+            if entry in ranges:
+                return
+            ranges.append(entry)
+            os.makedirs(self.root, exist_ok=True)
+            path = self._empty_ranges_path(symbol)
+            tmp_path = f'{path}.tmp{os.getpid()}'
+            with open(tmp_path, 'w') as f:
+                json.dump(sorted(ranges), f)
+            os.replace(tmp_path, path)
+
+    def is_covered(self, symbol: str, from_date, to_date) -> bool:
+        """Whether the range has stored data or was recorded as having no trades.
+
+        A range that is not over yet only counts once a row dated today or
+        later is stored, so a partly stored current year keeps being fetched.
+        """
+        if self.has_data_between(symbol, from_date, to_date):
+            today = date.today()
+            if to_date < today:
+                return True
+            dates = self.read(symbol)['date']
+            return bool(dates[-1] >= (np.datetime64(today, 'D') - _EPOCH).astype('int32'))
+        start, end = from_date.isoformat(), to_date.isoformat()
+        return any(first <= start and end <= last for first, last in self._empty_ranges(symbol))
+
+    def append(self, symbol: str, df: pd.DataFrame) -> int:
+        """Add rows for an issuer, replacing rows on dates that already exist.
+
+        Returns the number of rows written.
+        """
+        records = frame_to_records(drop_placeholder_rows(df))
+        if len(records) == 0:
+            return 0
+
+        with self._lock(symbol):
+            existing = self.read(symbol)
+            if len(existing) == 0 or records['date'][0] > existing['date'][-1]:
+                if len(existing) == 0:
+                    self._write(symbol, records)
+                else:
+                    with open(self.path(symbol), 'ab') as f:
+                        records.tofile(f)
+                return len(records)
+
+            merged = np.concatenate([np.asarray(existing), records])
+            # np.unique keeps the first occurrence, so reverse to let new rows win
+            _, index = np.unique(merged['date'][::-1], return_index=True)
+            merged = merged[::-1][index]
+            del existing
+            self._write(symbol, merged)
+            return len(records)
+
+    def _write(self, symbol: str, records: np.ndarray):
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(symbol)
+        tmp_path = f'{path}.tmp{os.getpid()}'
+        header = np.array([(MAGIC, FORMAT_VERSION, RECORD_DTYPE.itemsize)], dtype=HEADER_DTYPE)
+        with open(tmp_path, 'wb') as f:
+            header.tofile(f)
+            records.tofile(f)
+        os.replace(tmp_path, path)
@@ -1,18 +1,44 @@
+import threading
 import nltk
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
 import numpy as np
+import pandas as pd
 from typing import Dict, Tuple
-from datetime import datetime, timedelta
-from django.db.models import QuerySet
-from .models import IssuerNews
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import QuerySet, Count, Sum, F, Q
+from django.db.models.functions import Abs, TruncDate
+from .models import IssuerNews, DailySentiment
+
+# Stored with each score; bump when the lexicon or the weighting changes so
+# outdated rows are rescored by the score_issuer_news command
+SENTIMENT_VERSION = 'vader-1'
+
+# Title has more weight as it's more concise
+TITLE_WEIGHT = 0.4
+CONTENT_WEIGHT = 0.6
+
+def sentiment_label(score: float) -> str:
+    return 'positive' if score > 0.05 else 'negative' if score < -0.05 else 'neutral'
 
 class NewsSentimentAnalyzer:
-    def __init__(self):
+    def __init__(self, data_dir: str = None):
+        """Load the VADER lexicon from the local NLTK data directory.
+        
+        Never downloads; use get_sentiment_analyzer() to share one instance
+        per process instead of parsing the lexicon again.
+        """
+        data_dir = str(data_dir or settings.NLTK_DATA_DIR)
+        if data_dir not in nltk.data.path:
+            nltk.data.path.insert(0, data_dir)
         try:
-            nltk.data.find('sentiment/vader_lexicon.zip')
+            self.sentiment_analyzer = SentimentIntensityAnalyzer()
         except LookupError:
-            nltk.download('vader_lexicon')
-        self.sentiment_analyzer = SentimentIntensityAnalyzer()
+            raise ImproperlyConfigured(
+                f'VADER lexicon not found in {data_dir}; install it with '
+                f'"python -m nltk.downloader -d {data_dir} vader_lexicon"'
+            )
     
     def analyze_text(self, text: str) -> Dict[str, float]:
         """Analyze sentiment of a single text."""
@@ -36,88 +62,231 @@ class NewsSentimentAnalyzer:
             'score': compound
         }
     
+    def score_news(self, title: str, content: str) -> Dict[str, float]:
+        """Score one article; returns the values of the IssuerNews sentiment fields."""
+        title_score = self.sentiment_analyzer.polarity_scores(title)['compound']
+        content_score = self.sentiment_analyzer.polarity_scores(content)['compound']
+        return {
+            'title_sentiment': title_score,
+            'content_sentiment': content_score,
+            'sentiment_score': title_score * TITLE_WEIGHT + content_score * CONTENT_WEIGHT,
+            'sentiment_version': SENTIMENT_VERSION
+        }
+    
+    def apply_scores(self, news: IssuerNews) -> IssuerNews:
+        """Set the sentiment fields of an article from its title and content (does not save)."""
+        for field, value in self.score_news(news.title, news.content).items():
+            setattr(news, field, value)
+        return news
+    
     def analyze_news(self, news_items: QuerySet) -> Dict[str, any]:
-        """Analyze sentiment for a collection of news items."""
-        if not news_items:
-            return {
-                'overall_sentiment': 'neutral',
-                'confidence': 0,
-                'sentiment_distribution': {'positive': 0, 'neutral': 0, 'negative': 0},
-                'trading_signal': 'HOLD'
-            }
+        """Analyze sentiment for a collection of news items.
         
-        sentiments = []
+        Uses the stored scores and only runs VADER for articles that were
+        not scored with the current SENTIMENT_VERSION.
+        """
+        scores = []
+        dates = []
         for news in news_items:
-            # Analyze both title and content
-            title_sentiment = self.analyze_text(news.title)
-            content_sentiment = self.analyze_text(news.content)
-            
-            # Weighted average (title has more weight as it's more concise)
-            combined_score = (title_sentiment['score'] * 0.4 + content_sentiment['score'] * 0.6)
-            sentiments.append({
-                'score': combined_score,
-                'date': news.published_date,
-                'sentiment': 'positive' if combined_score > 0.05 else 'negative' if combined_score < -0.05 else 'neutral'
-            })
-        
-        # Calculate time-weighted scores (more recent news has more impact)
-        now = datetime.now()
-        max_days = 30  # Consider news up to 30 days old
-        weighted_scores = []
-        
-        for s in sentiments:
-            days_old = (now - s['date'].replace(tzinfo=None)).days
-            if days_old <= max_days:
-                time_weight = 1 - (days_old / max_days)
-                weighted_scores.append(s['score'] * time_weight)
-        
-        if not weighted_scores:
-            return {
-                'overall_sentiment': 'neutral',
-                'confidence': 0,
-                'sentiment_distribution': {'positive': 0, 'neutral': 0, 'negative': 0},
-                'trading_signal': 'HOLD'
-            }
-        
-        # Calculate overall sentiment
-        avg_score = np.mean(weighted_scores)
-        sentiment_strength = abs(avg_score)
-        overall_sentiment = 'positive' if avg_score > 0.05 else 'negative' if avg_score < -0.05 else 'neutral'
-        
-        # Calculate sentiment distribution
-        sentiment_counts = {'positive': 0, 'neutral': 0, 'negative': 0}
-        for s in sentiments:
-            sentiment_counts[s['sentiment']] += 1
-        total = len(sentiments)
-        sentiment_distribution = {k: (v/total)*100 for k, v in sentiment_counts.items()}
-        
-        # Calculate confidence based on sentiment strength and consistency
-        sentiment_confidence = sentiment_strength * 100  # Convert to percentage
-        
-        # Determine trading signal
-        if overall_sentiment == 'positive' and sentiment_confidence > 60:
-            trading_signal = 'BUY'
-        elif overall_sentiment == 'negative' and sentiment_confidence > 60:
-            trading_signal = 'SELL'
-        else:
-            trading_signal = 'HOLD'
-        
+            if news.sentiment_version != SENTIMENT_VERSION or news.sentiment_score is None:
+                self.apply_scores(news)
+            scores.append(news.sentiment_score)
+            dates.append(news.published_date)
+        return summarize_sentiment(scores, dates)
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+def get_sentiment_analyzer() -> NewsSentimentAnalyzer:
+    """Process-wide analyzer, built on first use.
+    
+    Called from gunicorn's when_ready hook so the lexicon is parsed once in
+    the master (preload_app) and shared by the forked workers.
+    """
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = NewsSentimentAnalyzer()
+    return _analyzer
+
+def _summarize(days_old: np.ndarray, article_counts: np.ndarray, score_sums: np.ndarray,
+               class_counts: Dict[str, int], max_days: int = 30) -> Dict[str, any]:
+    """Overall sentiment and trading signal from scores grouped by age in days.
+    
+    Each article's score is weighted by 1 - days_old / max_days (more recent
+    news has more impact) and the weighted scores are averaged.
+    """
+    recent = days_old <= max_days
+    if not article_counts[recent].sum():
         return {
-            'overall_sentiment': overall_sentiment,
-            'confidence': sentiment_confidence,
-            'sentiment_distribution': sentiment_distribution,
-            'trading_signal': trading_signal
+            'overall_sentiment': 'neutral',
+            'confidence': 0,
+            'sentiment_distribution': {'positive': 0, 'neutral': 0, 'negative': 0},
+            'trading_signal': 'HOLD'
         }
+    
+    # Calculate overall sentiment
+    weights = 1 - days_old[recent] / max_days
+    avg_score = np.sum(score_sums[recent] * weights) / article_counts[recent].sum()
+    sentiment_strength = abs(avg_score)
+    overall_sentiment = sentiment_label(avg_score)
+    
+    # Calculate sentiment distribution
+    total = sum(class_counts.values())
+    sentiment_distribution = {k: (v / total) * 100 for k, v in class_counts.items()}
+    
+    # Calculate confidence based on sentiment strength and consistency
+    sentiment_confidence = sentiment_strength * 100  # Convert to percentage
+    
+    # Determine trading signal
+    if overall_sentiment == 'positive' and sentiment_confidence > 60:
+        trading_signal = 'BUY'
+    elif overall_sentiment == 'negative' and sentiment_confidence > 60:
+        trading_signal = 'SELL'
+    else:
+        trading_signal = 'HOLD'
+    
+    return {
+        'overall_sentiment': overall_sentiment,
+        'confidence': sentiment_confidence,
+        'sentiment_distribution': sentiment_distribution,
+        'trading_signal': trading_signal
+    }
+
+def summarize_sentiment(scores, dates) -> Dict[str, any]:
+    """Combine per-article scores into the overall sentiment and trading signal."""
+    scores = np.asarray(scores, dtype=float)
+    now = datetime.now()
+    days_old = np.array([(now - date.replace(tzinfo=None)).days for date in dates], dtype=float)
+    class_counts = {
+        'positive': int((scores > 0.05).sum()),
+        'neutral': int(((scores >= -0.05) & (scores <= 0.05)).sum()),
+        'negative': int((scores < -0.05).sum())
+    }
+    return _summarize(days_old, np.ones(len(scores)), scores, class_counts)
+
+def summarize_daily_sentiment(rows, now=None) -> Dict[str, any]:
+    """Same as summarize_sentiment, from DailySentiment rows instead of articles.
+    
+    Ages are the same datetime difference summarize_sentiment uses, taking
+    each day's articles as published at midnight, which is how the scraper
+    stores their publication dates.
+    """
+    now = now or datetime.now()
+    rows = list(rows)
+    class_counts = {
+        'positive': sum(row.positive_count for row in rows),
+        'neutral': sum(row.neutral_count for row in rows),
+        'negative': sum(row.negative_count for row in rows)
+    }
+    return _summarize(
+        np.array([(now - datetime.combine(row.date, time.min)).days for row in rows], dtype=float),
+        np.array([row.article_count for row in rows], dtype=float),
+        np.array([row.score_sum for row in rows], dtype=float),
+        class_counts
+    )
+
+def refresh_daily_sentiment(issuer_ids=None, since=None) -> int:
+    """Rebuild the DailySentiment rows of the given issuers (all if None) from `since` on.
+    
+    The aggregates are computed in SQL from the stored article scores and
+    written with one bulk upsert. Returns the number of rows written.
+    """
+    news = IssuerNews.objects.filter(sentiment_score__isnull=False)
+    if issuer_ids is not None:
+        news = news.filter(issuer_id__in=list(issuer_ids))
+    news = news.annotate(day=TruncDate('published_date'))
+    if since is not None:
+        news = news.filter(day__gte=since)
+    
+    score = F('sentiment_score')
+    aggregates = news.values('issuer_id', 'day').annotate(
+        article_count=Count('id'),
+        score_sum=Sum(score),
+        abs_sum=Sum(Abs(score)),
+        weighted_sum=Sum(score * Abs(score)),
+        positive_count=Count('id', filter=Q(sentiment_score__gt=0.05)),
+        negative_count=Count('id', filter=Q(sentiment_score__lt=-0.05))
+    )
+    
+    rows = [
+        DailySentiment(
+            issuer_id=row['issuer_id'],
+            date=row['day'],
+            article_count=row['article_count'],
+            score_sum=row['score_sum'],
+            mean_score=row['score_sum'] / row['article_count'],
+            weighted_score=row['weighted_sum'] / row['abs_sum'] if row['abs_sum'] else None,
+            positive_count=row['positive_count'],
+            neutral_count=row['article_count'] - row['positive_count'] - row['negative_count'],
+            negative_count=row['negative_count']
+        )
+        for row in aggregates
+    ]
+    if rows:
+        DailySentiment.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['issuer', 'date'],
+            update_fields=[
+                'article_count', 'score_sum', 'mean_score', 'weighted_score',
+                'positive_count', 'neutral_count', 'negative_count', 'updated_at'
+            ]
+        )
+    return len(rows)
+
+def sentiment_series(issuer, start, end, max_days: int = 30) -> pd.DataFrame:
+    """Daily sentiment of an issuer from start to end, for charts and joins with prices.
+    
+    Returns a frame indexed by every calendar day with 'article_count',
+    'mean_score' (NaN on days without news) and 'decayed_score', the same
+    time-weighted average get_news_sentiment_signal uses, as of each day.
+    """
+    rows = DailySentiment.objects.filter(
+        issuer=issuer,
+        date__range=[start - timedelta(days=max_days), end]
+    ).values_list('date', 'article_count', 'score_sum')
+    days = pd.date_range(start - timedelta(days=max_days), end, freq='D')
+    daily = pd.DataFrame.from_records(list(rows), columns=['date', 'article_count', 'score_sum'])
+    daily = daily.set_index(pd.to_datetime(daily['date'])).reindex(days, fill_value=0)
+    counts = daily['article_count'].to_numpy(dtype=float)
+    sums = daily['score_sum'].to_numpy(dtype=float)
+    
+    # Linear decay over the last max_days days as one convolution per series
+    kernel = 1 - np.arange(max_days + 1) / max_days
+    decayed_sums = np.convolve(sums, kernel)[:len(days)]
+    window_counts = np.convolve(counts, np.ones(max_days + 1))[:len(days)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        series = pd.DataFrame({
+            'article_count': counts.astype(int),
+            'mean_score': np.where(counts > 0, sums / counts, np.nan),
+            'decayed_score': np.where(window_counts > 0, decayed_sums / window_counts, np.nan)
+        }, index=days.date)
+    return series.iloc[max_days:]
 
 def get_news_sentiment_signal(issuer_code: str) -> Tuple[str, float]:
-    """Get trading signal based on news sentiment for a given issuer."""
-    analyzer = NewsSentimentAnalyzer()
+    """Get trading signal based on news sentiment for a given issuer.
     
+    Reads the DailySentiment aggregates of the last 30 days; only when
+    some recent articles are not scored yet are they analyzed here.
+    """
     # Get recent news (last 30 days)
     recent_news = IssuerNews.objects.filter(
         issuer__code=issuer_code,
         published_date__gte=datetime.now() - timedelta(days=30)
     ).order_by('-published_date')
     
-    analysis = analyzer.analyze_news(recent_news)
-    return analysis['trading_signal'], analysis['confidence'] 
\ No newline at end of file
+    unscored = recent_news.filter(Q(sentiment_score__isnull=True) | ~Q(sentiment_version=SENTIMENT_VERSION))
+    if unscored.exists():
+        analysis = get_sentiment_analyzer().analyze_news(recent_news)
+    else:
+        now = datetime.now()
+        analysis = summarize_daily_sentiment(
+            DailySentiment.objects.filter(
+                issuer__code=issuer_code,
+                date__gt=now.date() - timedelta(days=30)
+            ),
+            now
+        )
+    return analysis['trading_signal'], analysis['confidence']
@@ -0,0 +1,161 @@
+import itertools
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from .backtest import left_align
+from .technical_analysis import (
+    INDICATOR_NAMES, OSCILLATOR_THRESHOLDS, CONSENSUS_QUORUM,
+    calculate_indicators, generate_signals, get_consensus_signal
+)
+
+# (sell above, buy below) candidates per oscillator; the defaults come first
+SWEEP_THRESHOLDS = {
+    'rsi': [(70, 30), (65, 35), (75, 25), (80, 20)],
+    'stoch': [(80, 20), (75, 25), (85, 15), (90, 10)],
+    'cci': [(100, -100), (50, -50), (150, -150), (200, -200)],
+    'willr': [(-20, -80), (-30, -70), (-10, -90)],
+}
+SWEEP_QUORUMS = [CONSENSUS_QUORUM, 0.5, 0.6]
+
+# Days ahead over which a signal is scored
+FORWARD_DAYS = 5
+
+SETTING_COLUMNS = ['period', *SWEEP_THRESHOLDS, 'quorum']
+
+def sweep_settings(periods: List[int], thresholds: Dict[str, list] = SWEEP_THRESHOLDS,
+                   quorums: List[float] = SWEEP_QUORUMS) -> List[tuple]:
+    """Every combination of period, oscillator thresholds and consensus quorum."""
+    return list(itertools.product(periods, *thresholds.values(), quorums))
+
+def validate_sweep(periods: List[int], settings: List[tuple], horizon: int = FORWARD_DAYS):
+    """Raise ValueError for a sweep run_sweep can't score."""
+    if not periods or min(periods) < 1:
+        raise ValueError('Periods must be positive integers')
+    if horizon < 1:
+        raise ValueError('The horizon must be at least 1 trading day')
+    for period, *oscillator_thresholds, quorum in settings:
+        if period not in periods:
+            raise ValueError(f'Setting period {period} is not one of the swept periods {periods}')
+        if not 0 < quorum <= 1:
+            raise ValueError(f'Quorum {quorum} is not in (0, 1]')
+        for name, (sell_above, buy_below) in zip(SWEEP_THRESHOLDS, oscillator_thresholds):
+            if sell_above <= buy_below:
+                raise ValueError(f'{name} sell threshold {sell_above} is not above its buy threshold {buy_below}')
+
+def build_indicator_cache(directory: str, close: np.ndarray, high: np.ndarray, low: np.ndarray,
+                          periods: List[int], horizon: int = FORWARD_DAYS):
+    """Compute the indicators once and save them as .npy files workers can memory-map.
+
+    Columns are left-aligned per issuer (bars without a trade price are
+    dropped) and 'forward_returns' holds the return `horizon` bars ahead.
+    """
+    valid = np.isfinite(close) & (close > 0)
+    close, _ = left_align(np.where(valid, close, np.nan), valid)
+    high, _ = left_align(high, valid)
+    low, _ = left_align(low, valid)
+    forward_returns = np.full(close.shape, np.nan)
+    forward_returns[:-horizon] = close[horizon:] / close[:-horizon] - 1
+
+    arrays = {'close_price': close, 'forward_returns': forward_returns}
+    indicators = calculate_indicators({'close_price': close, 'high': high, 'low': low}, INDICATOR_NAMES, periods)
+    for period_indicators in indicators.values():
+        arrays.update(period_indicators)
+    for name, values in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), values)
+
+def open_indicator_cache(directory: str) -> Dict[str, np.ndarray]:
+    return {
+        filename[:-len('.npy')]: np.load(os.path.join(directory, filename), mmap_mode='r')
+        for filename in os.listdir(directory)
+        if filename.endswith('.npy')
+    }
+
+def score_signals(codes: np.ndarray, forward_returns: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per-issuer mean forward return in the direction of the signals, hit rate and signal count."""
+    scored = (codes != 0) & np.isfinite(forward_returns)
+    signed = np.where(scored, codes * np.nan_to_num(forward_returns), 0.0)
+    count = scored.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'mean_return': np.where(count > 0, signed.sum(axis=0) / count, np.nan),
+            'hit_rate': np.where(count > 0, (signed > 0).sum(axis=0) / count, np.nan),
+            'signals': count,
+        }
+
+_cache = None
+
+def _open_worker_cache(directory: str):
+    global _cache
+    _cache = open_indicator_cache(directory)
+
+def _cache_period(period: int) -> Dict[str, np.ndarray]:
+    columns = {'close_price': _cache['close_price']}
+    columns.update({f'{name}_{period}': _cache[f'{name}_{period}'] for name in INDICATOR_NAMES})
+    return columns
+
+def evaluate_settings(settings: List[tuple]) -> List[Dict[str, np.ndarray]]:
+    """Score the consensus signal of each setting against the cached forward returns."""
+    results = []
+    for period, *oscillator_thresholds, quorum in settings:
+        thresholds = dict(zip(SWEEP_THRESHOLDS, oscillator_thresholds))
+        signals = generate_signals(_cache_period(period), period, thresholds)
+        consensus = get_consensus_signal(signals, period, quorum)
+        results.append(score_signals(consensus, _cache['forward_returns']))
+    return results
+
+def run_sweep(close: np.ndarray, high: np.ndarray, low: np.ndarray, issuer_ids,
+              periods: List[int], settings: List[tuple] = None, horizon: int = FORWARD_DAYS,
+              jobs: int = 1) -> pd.DataFrame:
+    """Score every setting for every issuer.
+
+    The base indicators are computed once per period and shared with the
+    worker processes through a memory-mapped cache; workers only derive
+    signals and scores for their share of the grid.
+
+    Returns:
+        DataFrame with one row per (setting, issuer): SETTING_COLUMNS,
+        'issuer_id', 'mean_return', 'hit_rate' and 'signals'
+
+    Raises:
+        ValueError: If validate_sweep rejects the periods, settings or horizon
+    """
+    global _cache
+    settings = settings or sweep_settings(periods)
+    validate_sweep(periods, settings, horizon)
+    with tempfile.TemporaryDirectory(prefix='indicator_cache_') as directory:
+        build_indicator_cache(directory, close, high, low, periods, horizon)
+        if jobs > 1:
+            batches = [settings[start::jobs * 4] for start in range(jobs * 4)]
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_open_worker_cache,
+                                     initargs=(directory,)) as executor:
+                batch_results = list(executor.map(evaluate_settings, batches))
+            ordered = [None] * len(settings)
+            for start, results in enumerate(batch_results):
+                ordered[start::jobs * 4] = results
+        else:
+            _open_worker_cache(directory)
+            try:
+                ordered = evaluate_settings(settings)
+            finally:
+                _cache = None
+
+    frames = []
+    for setting, scores in zip(settings, ordered):
+        frame = pd.DataFrame(scores)
+        frame.insert(0, 'issuer_id', np.asarray(issuer_ids))
+        for column, value in zip(SETTING_COLUMNS, setting):
+            frame.insert(SETTING_COLUMNS.index(column), column, [value] * len(frame))
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+def default_setting(period: int) -> tuple:
+    return (period, *(OSCILLATOR_THRESHOLDS[name] for name in SWEEP_THRESHOLDS), CONSENSUS_QUORUM)
+
+def best_settings(report: pd.DataFrame, min_signals: int = 20) -> pd.DataFrame:
+    """Best setting per issuer by mean directional forward return, among settings with enough signals."""
+    eligible = report[(report['signals'] >= min_signals) & report['mean_return'].notna()]
+    best = eligible.loc[eligible.groupby('issuer_id')['mean_return'].idxmax()]
+    return best.set_index('issuer_id')
@@ -1,121 +1,503 @@
 import pandas as pd
 import numpy as np
+from collections import deque
+from functools import cached_property
 from typing import Dict, List, Tuple
-import ta
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+INDICATOR_NAMES = ['sma', 'ema', 'wma', 'tema', 'kama', 'rsi', 'stoch', 'cci', 'macd', 'willr']
 
 def calculate_technical_indicators(df: pd.DataFrame, periods: List[int] = [1, 5, 20]) -> Dict[str, pd.DataFrame]:
     """Calculate technical indicators for different time periods.
     
+    Compatibility wrapper around calculate_indicators; prefer that when only
+    some indicators are needed. The input frame is not modified.
+    
     Args:
         df: DataFrame with columns ['date', 'close_price', 'volume', 'high', 'low']
         periods: List of periods to calculate indicators for [1-day, 1-week, 1-month]
     
     Returns:
-        Dictionary containing DataFrames with calculated indicators
+        Dictionary of DataFrames with the input columns and that period's indicators
     """
-    results = {}
-    
-    # Convert Decimal columns to float
-    numeric_columns = ['close_price', 'high', 'low', 'volume']
-    for col in numeric_columns:
-        df[col] = df[col].astype(float)
-    
-    for period in periods:
-        # Moving Averages
-        df[f'sma_{period}'] = ta.trend.sma_indicator(df['close_price'], window=period)
-        df[f'ema_{period}'] = ta.trend.ema_indicator(df['close_price'], window=period)
-        df[f'wma_{period}'] = df['close_price'].rolling(window=period).apply(
-            lambda x: np.sum(x * np.arange(1, len(x) + 1)) / np.sum(np.arange(1, len(x) + 1))
-        )
-        
-        # Calculate TEMA manually
-        ema1 = ta.trend.ema_indicator(df['close_price'], window=period)
-        ema2 = ta.trend.ema_indicator(ema1, window=period)
-        ema3 = ta.trend.ema_indicator(ema2, window=period)
-        df[f'tema_{period}'] = 3 * ema1 - 3 * ema2 + ema3
-        
-        df[f'kama_{period}'] = ta.momentum.kama(df['close_price'], window=period)
-        
-        # Oscillators
-        df[f'rsi_{period}'] = ta.momentum.rsi(df['close_price'], window=period)
-        df[f'stoch_{period}'] = ta.momentum.stoch(df['high'], df['low'], df['close_price'], window=period)
-        df[f'cci_{period}'] = ta.trend.cci(df['high'], df['low'], df['close_price'], window=period)
-        df[f'macd_{period}'] = ta.trend.macd_diff(df['close_price'], window_slow=period*2, window_fast=period)
-        df[f'willr_{period}'] = ta.momentum.williams_r(df['high'], df['low'], df['close_price'], lbp=period)
-        
-        results[period] = df.copy()
-    
-    return results
+    base = df.astype({col: float for col in ['close_price', 'high', 'low', 'volume']})
+    indicators = calculate_indicators(base, INDICATOR_NAMES, periods)
+    return {
+        period: pd.concat([base, pd.DataFrame(columns, index=df.index).drop(columns='close_price')], axis=1)
+        for period, columns in indicators.items()
+    }
+
+MOVING_AVERAGES = ['sma', 'ema', 'wma', 'tema', 'kama']
+
+# Oscillator value above the first threshold is SELL, below the second BUY
+OSCILLATOR_THRESHOLDS = {
+    'rsi': (70, 30),
+    'stoch': (80, 20),
+    'cci': (100, -100),
+    'willr': (-20, -80),
+}
+
+# Share of the indicators that must agree for a BUY or SELL consensus
+CONSENSUS_QUORUM = 1 / 3
+
+# Signals are int8 codes; SIGNAL_LABELS[code + 1] gives the API string
+SELL, HOLD, BUY = -1, 0, 1
+SIGNAL_LABELS = np.array(['SELL', 'HOLD', 'BUY'])
 
-def generate_signals(indicators_df: pd.DataFrame, period: int) -> pd.DataFrame:
+def signal_labels(codes):
+    """Map int8 signal codes to 'SELL'/'HOLD'/'BUY' strings (for API responses)."""
+    return SIGNAL_LABELS[np.asarray(codes, dtype=np.int8) + 1]
+
+def _threshold_signal(values, sell_above, buy_below) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    return ((values < buy_below).astype(np.int8) - (values > sell_above).astype(np.int8))
+
+def generate_signals(indicators_df, period: int, thresholds: Dict[str, Tuple[float, float]] = None):
     """Generate trading signals based on technical indicators.
     
     Args:
-        indicators_df: DataFrame with calculated technical indicators
+        indicators_df: DataFrame with calculated technical indicators, or one
+            period of calculate_indicator_matrix (dict of dates x issuers arrays)
         period: Time period for the indicators
+        thresholds: (sell above, buy below) per oscillator, overriding
+            OSCILLATOR_THRESHOLDS
     
     Returns:
-        DataFrame with trading signals
+        int8 signal codes (BUY=1, HOLD=0, SELL=-1) as a DataFrame, or as a
+        dict of arrays when given arrays; HOLD wherever the close or the
+        indicator is NaN
     """
-    signals = pd.DataFrame(index=indicators_df.index)
+    thresholds = {**OSCILLATOR_THRESHOLDS, **(thresholds or {})}
+    close = np.asarray(indicators_df['close_price'], dtype=float)
+    signals = {}
     
     # Moving Average Signals
-    signals[f'sma_signal_{period}'] = np.where(
-        indicators_df['close_price'] > indicators_df[f'sma_{period}'], 'BUY', 'SELL'
-    )
-    signals[f'ema_signal_{period}'] = np.where(
-        indicators_df['close_price'] > indicators_df[f'ema_{period}'], 'BUY', 'SELL'
-    )
-    signals[f'wma_signal_{period}'] = np.where(
-        indicators_df['close_price'] > indicators_df[f'wma_{period}'], 'BUY', 'SELL'
-    )
-    signals[f'tema_signal_{period}'] = np.where(
-        indicators_df['close_price'] > indicators_df[f'tema_{period}'], 'BUY', 'SELL'
-    )
-    signals[f'kama_signal_{period}'] = np.where(
-        indicators_df['close_price'] > indicators_df[f'kama_{period}'], 'BUY', 'SELL'
-    )
+    for name in MOVING_AVERAGES:
+        values = np.asarray(indicators_df[f'{name}_{period}'], dtype=float)
+        signals[f'{name}_signal_{period}'] = np.where(close > values, BUY, SELL).astype(np.int8)
     
     # Oscillator Signals
-    signals[f'rsi_signal_{period}'] = np.where(
-        indicators_df[f'rsi_{period}'] > 70, 'SELL',
-        np.where(indicators_df[f'rsi_{period}'] < 30, 'BUY', 'HOLD')
-    )
-    signals[f'stoch_signal_{period}'] = np.where(
-        indicators_df[f'stoch_{period}'] > 80, 'SELL',
-        np.where(indicators_df[f'stoch_{period}'] < 20, 'BUY', 'HOLD')
-    )
-    signals[f'cci_signal_{period}'] = np.where(
-        indicators_df[f'cci_{period}'] > 100, 'SELL',
-        np.where(indicators_df[f'cci_{period}'] < -100, 'BUY', 'HOLD')
-    )
-    signals[f'macd_signal_{period}'] = np.where(
-        indicators_df[f'macd_{period}'] > 0, 'BUY',
-        np.where(indicators_df[f'macd_{period}'] < 0, 'SELL', 'HOLD')
-    )
-    signals[f'willr_signal_{period}'] = np.where(
-        indicators_df[f'willr_{period}'] > -20, 'SELL',
-        np.where(indicators_df[f'willr_{period}'] < -80, 'BUY', 'HOLD')
-    )
+    for name in ['rsi', 'stoch', 'cci', 'macd', 'willr']:
+        values = indicators_df[f'{name}_{period}']
+        if name == 'macd':
+            signals[f'{name}_signal_{period}'] = -_threshold_signal(values, 0, 0)
+            continue
+        signals[f'{name}_signal_{period}'] = _threshold_signal(values, *thresholds[name])
+    
+    # No signal during warm-up or where an issuer has no bar (NaN in the matrix)
+    missing_close = np.isnan(close)
+    for name in INDICATOR_NAMES:
+        missing = missing_close | np.isnan(np.asarray(indicators_df[f'{name}_{period}'], dtype=float))
+        signals[f'{name}_signal_{period}'][missing] = HOLD
     
+    if isinstance(indicators_df, pd.DataFrame):
+        return pd.DataFrame(signals, index=indicators_df.index)
     return signals
 
-def get_consensus_signal(signals: pd.DataFrame, period: int) -> str:
-    """Get consensus signal based on all indicators.
+def get_consensus_signal(signals, period: int, quorum: float = CONSENSUS_QUORUM):
+    """Get consensus signal based on all indicators, for every row.
+    
+    A row is BUY (SELL) when more indicators say BUY than SELL (SELL than
+    BUY) and more than `quorum` of them agree; otherwise HOLD.
     
     Args:
-        signals: DataFrame with trading signals
+        signals: Output of generate_signals
         period: Time period for the indicators
+        quorum: Fraction of the indicators that must agree
     
     Returns:
-        Consensus signal (BUY, SELL, or HOLD)
+        int8 consensus codes per row: a Series for a DataFrame, otherwise an
+        array shaped like the signal arrays
     """
-    period_signals = signals[[col for col in signals.columns if str(period) in col]]
-    buy_count = (period_signals == 'BUY').sum().sum()
-    sell_count = (period_signals == 'SELL').sum().sum()
+    suffix = f'_signal_{period}'
+    columns = [col for col in signals.keys() if col.endswith(suffix)]
+    stacked = np.stack([np.asarray(signals[col], dtype=np.int8) for col in columns])
+    buy_count = (stacked == BUY).sum(axis=0)
+    sell_count = (stacked == SELL).sum(axis=0)
+    required = len(columns) * quorum
     
-    if buy_count > sell_count and buy_count > len(period_signals.columns) / 3:
-        return 'BUY'
-    elif sell_count > buy_count and sell_count > len(period_signals.columns) / 3:
-        return 'SELL'
-    return 'HOLD'
\ No newline at end of file
+    consensus = (
+        ((buy_count > sell_count) & (buy_count > required)).astype(np.int8)
+        - ((sell_count > buy_count) & (sell_count > required)).astype(np.int8)
+    )
+    if isinstance(signals, pd.DataFrame):
+        return pd.Series(consensus, index=signals.index, name=f'consensus_{period}')
+    return consensus
+
+def _divide(numerator: float, denominator: float) -> float:
+    """Float division with pandas semantics: x/0 is +-inf and 0/0 is NaN."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.float64(numerator) / np.float64(denominator))
+
+class IndicatorEngine:
+    """Streaming version of calculate_technical_indicators for one issuer and period.
+
+    Holds the running state of every indicator so each new bar costs O(1)
+    (O(period) for the windowed min/max and CCI deviation) instead of a
+    pass over the whole history. Outputs match calculate_indicators (the
+    `ta` library formulas), including the warm-up NaNs. The state round-trips
+    through to_state()/from_state() as plain JSON types so a stored
+    engine can resume after a restart.
+    """
+
+    MACD_SIGNAL_WINDOW = 9
+    KAMA_FAST = 2
+    KAMA_SLOW = 30
+    CCI_CONSTANT = 0.015
+
+    def __init__(self, period: int):
+        self.period = period
+        self.count = 0
+        self.closes = deque(maxlen=period + 1)
+        self.highs = deque(maxlen=period)
+        self.lows = deque(maxlen=period)
+        self.typical = deque(maxlen=period)
+        self.changes = deque(maxlen=period)
+        self.close_sum = 0.0
+        self.wma_numerator = 0.0
+        self.change_sum = 0.0
+        self.ema = None
+        self.ema2 = None
+        self.ema2_count = 0
+        self.ema3 = None
+        self.ema3_count = 0
+        self.ema_slow = None
+        self.macd_signal = None
+        self.macd_signal_count = 0
+        self.avg_up = 0.0
+        self.avg_down = 0.0
+        self.kama = None
+
+    @staticmethod
+    def _ema_step(previous, value, alpha):
+        return value if previous is None else previous + alpha * (value - previous)
+
+    def update(self, close: float, high: float, low: float) -> Dict[str, float]:
+        """Add one bar and return the indicator values for it (NaN while warming up)."""
+        period = self.period
+        index = self.count
+        close, high, low = float(close), float(high), float(low)
+        previous_close = self.closes[-1] if self.closes else None
+        nan = float('nan')
+        values = dict.fromkeys(INDICATOR_NAMES, nan)
+
+        # Running sums over the last `period` closes for SMA and WMA
+        if len(self.closes) >= period:
+            dropped = self.closes[-period]
+            self.wma_numerator += period * close - self.close_sum
+            self.close_sum += close - dropped
+        else:
+            self.wma_numerator += (len(self.closes) + 1) * close
+            self.close_sum += close
+        self.closes.append(close)
+        self.highs.append(high)
+        self.lows.append(low)
+        typical = (high + low + close) / 3.0
+        self.typical.append(typical)
+        full_window = index >= period - 1
+
+        if full_window:
+            values['sma'] = self.close_sum / period
+            values['wma'] = self.wma_numerator / (period * (period + 1) / 2)
+
+        # EMA, TEMA and MACD; each stage starts once its input leaves warm-up
+        alpha = 2.0 / (period + 1)
+        self.ema = self._ema_step(self.ema, close, alpha)
+        if full_window:
+            values['ema'] = self.ema
+            self.ema2 = self._ema_step(self.ema2, self.ema, alpha)
+            self.ema2_count += 1
+            if self.ema2_count >= period:
+                self.ema3 = self._ema_step(self.ema3, self.ema2, alpha)
+                self.ema3_count += 1
+                if self.ema3_count >= period:
+                    values['tema'] = 3 * self.ema - 3 * self.ema2 + self.ema3
+
+        self.ema_slow = self._ema_step(self.ema_slow, close, 2.0 / (2 * period + 1))
+        if index >= 2 * period - 1:
+            macd_line = self.ema - self.ema_slow
+            self.macd_signal = self._ema_step(self.macd_signal, macd_line, 2.0 / (self.MACD_SIGNAL_WINDOW + 1))
+            self.macd_signal_count += 1
+            if self.macd_signal_count >= self.MACD_SIGNAL_WINDOW:
+                values['macd'] = macd_line - self.macd_signal
+
+        # RSI (Wilder smoothing); the first bar has no change and counts as 0
+        change = 0.0 if previous_close is None else close - previous_close
+        rsi_alpha = 1.0 / period
+        if index == 0:
+            self.avg_up = max(change, 0.0)
+            self.avg_down = max(-change, 0.0)
+        else:
+            self.avg_up += rsi_alpha * (max(change, 0.0) - self.avg_up)
+            self.avg_down += rsi_alpha * (max(-change, 0.0) - self.avg_down)
+        if full_window:
+            if self.avg_down == 0:
+                values['rsi'] = 100.0
+            else:
+                values['rsi'] = 100 - 100 / (1 + self.avg_up / self.avg_down)
+
+        # KAMA: seeded with the close of the first full window
+        if previous_close is not None:
+            if len(self.changes) == period:
+                self.change_sum -= self.changes[0]
+            self.changes.append(abs(change))
+            self.change_sum += abs(change)
+        if index == period - 1:
+            self.kama = close
+        elif index >= period:
+            direction = abs(close - self.closes[0])
+            efficiency = direction / self.change_sum if self.change_sum != 0 else 0.0
+            fast = 2.0 / (self.KAMA_FAST + 1)
+            slow = 2.0 / (self.KAMA_SLOW + 1)
+            smoothing = (efficiency * (fast - slow) + slow) ** 2
+            self.kama += smoothing * (close - self.kama)
+        if full_window:
+            values['kama'] = self.kama
+
+            # Windowed oscillators
+            lowest = min(self.lows)
+            highest = max(self.highs)
+            values['stoch'] = _divide(100 * (close - lowest), highest - lowest)
+            values['willr'] = _divide(-100 * (highest - close), highest - lowest)
+
+            mean_typical = sum(self.typical) / period
+            deviation = sum(abs(value - mean_typical) for value in self.typical) / period
+            values['cci'] = _divide(typical - mean_typical, self.CCI_CONSTANT * deviation)
+
+        self.count += 1
+        return values
+
+    def run(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Feed all bars of a frame with 'close_price', 'high' and 'low' columns.
+
+        Returns a frame with '<indicator>_<period>' columns, one row per bar.
+        """
+        rows = [
+            self.update(close, high, low)
+            for close, high, low in zip(
+                df['close_price'].astype(float), df['high'].astype(float), df['low'].astype(float)
+            )
+        ]
+        result = pd.DataFrame(rows, columns=INDICATOR_NAMES, index=df.index)
+        result.columns = [f'{name}_{self.period}' for name in INDICATOR_NAMES]
+        return result
+
+    _DEQUES = ['closes', 'highs', 'lows', 'typical', 'changes']
+    _SCALARS = [
+        'count', 'close_sum', 'wma_numerator', 'change_sum', 'ema', 'ema2', 'ema2_count',
+        'ema3', 'ema3_count', 'ema_slow', 'macd_signal', 'macd_signal_count',
+        'avg_up', 'avg_down', 'kama'
+    ]
+
+    def to_state(self) -> Dict:
+        """Serialize the running state to JSON-compatible types."""
+        state = {'period': self.period}
+        state.update({name: list(getattr(self, name)) for name in self._DEQUES})
+        state.update({name: getattr(self, name) for name in self._SCALARS})
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'IndicatorEngine':
+        engine = cls(state['period'])
+        for name in cls._DEQUES:
+            getattr(engine, name).extend(state[name])
+        for name in cls._SCALARS:
+            setattr(engine, name, state[name])
+        return engine
+
+
+def _rolling_windows(values: np.ndarray, window: int) -> np.ndarray:
+    """(T, N) -> (T, N, window) view of trailing windows, NaN padded before the first full one."""
+    padding = np.full((window - 1, values.shape[1]), np.nan)
+    return sliding_window_view(np.concatenate([padding, values]), window, axis=0)
+
+def _ewm_matrix(values: np.ndarray, alpha: float, window: int, start: int = 0) -> np.ndarray:
+    """Column-wise ewm(adjust=False) seeded at row `start`, NaN before start + window - 1."""
+    result = np.full(values.shape, np.nan)
+    if start >= len(values):
+        return result
+    x = values[start:]
+    smoothed, _ = lfilter([alpha], [1, alpha - 1], x, axis=0, zi=(1 - alpha) * x[:1])
+    result[start + window - 1:] = smoothed[window - 1:]
+    return result
+
+# Indicators that need the 'high' and 'low' columns besides 'close_price'
+HIGH_LOW_INDICATORS = {'stoch', 'cci', 'willr'}
+
+class _PeriodIndicators:
+    """Indicators of one period over left-aligned (T, N) columns, computed on first access.
+
+    Every indicator is a cached property named after it, and intermediate
+    series (EMAs, price changes, window extremes) are shared, so asking
+    for TEMA and MACD computes the base EMA once and nothing else.
+    """
+
+    def __init__(self, close: np.ndarray, high, low, period: int):
+        self.close = close
+        self.high = high
+        self.low = low
+        self.period = period
+
+    @cached_property
+    def _close_windows(self):
+        return _rolling_windows(self.close, self.period)
+
+    @cached_property
+    def _ema_alpha(self):
+        return 2 / (self.period + 1)
+
+    @cached_property
+    def _change(self):
+        return np.diff(self.close, axis=0, prepend=np.nan)
+
+    @cached_property
+    def _extremes(self):
+        lowest = _rolling_windows(self.low, self.period).min(axis=-1)
+        highest = _rolling_windows(self.high, self.period).max(axis=-1)
+        return lowest, highest
+
+    @cached_property
+    def _ema2(self):
+        return _ewm_matrix(self.ema, self._ema_alpha, self.period, start=self.period - 1)
+
+    # Moving Averages
+    @cached_property
+    def sma(self):
+        return self._close_windows.mean(axis=-1)
+
+    @cached_property
+    def ema(self):
+        return _ewm_matrix(self.close, self._ema_alpha, self.period)
+
+    @cached_property
+    def wma(self):
+        weights = np.arange(1, self.period + 1, dtype=float)
+        return self._close_windows @ weights / weights.sum()
+
+    @cached_property
+    def tema(self):
+        ema3 = _ewm_matrix(self._ema2, self._ema_alpha, self.period, start=2 * self.period - 2)
+        return 3 * self.ema - 3 * self._ema2 + ema3
+
+    @cached_property
+    def kama(self):
+        close, period = self.close, self.period
+        volatility = _rolling_windows(np.abs(self._change), period).sum(axis=-1)
+        direction = np.full(close.shape, np.nan)
+        direction[period:] = np.abs(close[period:] - close[:-period])
+        efficiency = np.where(volatility != 0, direction / volatility, 0.0)
+        efficiency[np.isnan(volatility)] = np.nan
+        fast = 2 / (IndicatorEngine.KAMA_FAST + 1)
+        slow = 2 / (IndicatorEngine.KAMA_SLOW + 1)
+        smoothing = (efficiency * (fast - slow) + slow) ** 2
+        kama = np.full(close.shape, np.nan)
+        if period - 1 < len(close):
+            kama[period - 1] = close[period - 1]
+        for row in range(period, len(close)):
+            kama[row] = kama[row - 1] + smoothing[row] * (close[row] - kama[row - 1])
+        return kama
+
+    # Oscillators
+    @cached_property
+    def rsi(self):
+        change = self._change
+        average_up = _ewm_matrix(np.where(change > 0, change, 0.0), 1 / self.period, self.period)
+        average_down = _ewm_matrix(np.where(change < 0, -change, 0.0), 1 / self.period, self.period)
+        return np.where(average_down == 0, 100.0, 100 - 100 / (1 + average_up / average_down))
+
+    @cached_property
+    def stoch(self):
+        lowest, highest = self._extremes
+        return 100 * (self.close - lowest) / (highest - lowest)
+
+    @cached_property
+    def cci(self):
+        typical = (self.high + self.low + self.close) / 3
+        typical_windows = _rolling_windows(typical, self.period)
+        typical_mean = typical_windows.mean(axis=-1)
+        deviation = np.abs(typical_windows - typical_mean[..., None]).mean(axis=-1)
+        return (typical - typical_mean) / (IndicatorEngine.CCI_CONSTANT * deviation)
+
+    @cached_property
+    def macd(self):
+        period = self.period
+        macd_line = self.ema - _ewm_matrix(self.close, 2 / (2 * period + 1), 2 * period)
+        signal_window = IndicatorEngine.MACD_SIGNAL_WINDOW
+        macd_signal = _ewm_matrix(macd_line, 2 / (signal_window + 1), signal_window, start=2 * period - 1)
+        return macd_line - macd_signal
+
+    @cached_property
+    def willr(self):
+        lowest, highest = self._extremes
+        return -100 * (highest - self.close) / (highest - lowest)
+
+def calculate_indicators(data, indicators: List[str] = INDICATOR_NAMES,
+                         periods: List[int] = [1, 5, 20]) -> Dict[int, Dict[str, np.ndarray]]:
+    """Calculate only the requested indicators for the requested periods.
+
+    Args:
+        data: DataFrame or dict with 'close_price' (and 'high'/'low' for
+            stoch, cci and willr) as 1-D arrays in date order, or as
+            (dates x issuers) arrays with NaN where an issuer has no bar.
+            It is not modified.
+        indicators: Indicator names, any of INDICATOR_NAMES
+        periods: List of periods to calculate indicators for
+
+    Returns:
+        {period: {'close_price': close, '<indicator>_<period>': array}} with
+        float arrays of the input shape, usable with generate_signals
+    """
+    unknown = set(indicators) - set(INDICATOR_NAMES)
+    if unknown:
+        raise ValueError(f'Unknown indicators: {", ".join(sorted(unknown))}')
+
+    close = np.asarray(data['close_price'], dtype=float)
+    needs_high_low = bool(HIGH_LOW_INDICATORS & set(indicators))
+    inputs = [close]
+    if needs_high_low:
+        inputs += [np.asarray(data['high'], dtype=float), np.asarray(data['low'], dtype=float)]
+    inputs = [values.reshape(len(values), -1) for values in inputs]
+
+    # Move every issuer's bars to the top of its column so all series start at
+    # row 0 and share the same warm-up rows, then scatter the results back
+    valid = ~np.isnan(inputs[0])
+    order = None
+    if not valid.all():
+        order = np.argsort(~valid, axis=0, kind='stable')
+        inputs = [np.take_along_axis(values, order, axis=0) for values in inputs]
+    if not needs_high_low:
+        inputs += [None, None]
+
+    results = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for period in periods:
+            computed = _PeriodIndicators(*inputs, period)
+            period_results = {'close_price': close}
+            for name in indicators:
+                values = getattr(computed, name)
+                if order is not None:
+                    scattered = np.empty_like(values)
+                    np.put_along_axis(scattered, order, values, axis=0)
+                    scattered[~valid] = np.nan
+                    values = scattered
+                period_results[f'{name}_{period}'] = values.reshape(close.shape)
+            results[period] = period_results
+    return results
+
+def calculate_indicator_matrix(close: np.ndarray, high: np.ndarray, low: np.ndarray,
+                               periods: List[int] = [1, 5, 20]) -> Dict[int, Dict[str, np.ndarray]]:
+    """Calculate all technical indicators for many issuers at once.
+
+    Args:
+        close, high, low: Aligned (dates x issuers) float arrays in date order,
+            NaN where an issuer has no bar on a date
+        periods: List of periods to calculate indicators for
+
+    Returns:
+        {period: {'close_price': close, '<indicator>_<period>': array}} with
+        arrays of the input shape. Each issuer's values equal
+        calculate_technical_indicators over its own bars; cells without
+        data are NaN.
+    """
+    return calculate_indicators({'close_price': close, 'high': high, 'low': low}, INDICATOR_NAMES, periods)
@@ -1,3 +1,797 @@
-from django.test import TestCase
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+import json
+import os
+import tempfile
+from unittest import mock
+import joblib
+import numpy as np
+import pandas as pd
+from django.apps import apps
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import ignore_warnings
+from django.urls import reverse
+from django.utils import timezone
+from sklearn.exceptions import ConvergenceWarning
+from .backtest import backtest_chunk, signal_positions, strategy_metrics
+from .ingest import refresh_issuer_quotes, upsert_stock_prices
+from .lstm_prediction import (
+    BUNDLE_FORMAT, PricePredictor, PredictorRegistry, TimeSeriesPredictor, bundle_path,
+    forecast_issuers, legacy_artifact_paths, load_model_bundle, predict_batch, save_model_bundle,
+    train_price_model
+)
+from .models import DailySentiment, Issuer, IssuerNews, StockPrice
+from .pipeline import DataFetchFilter
+from .management.commands.fetch_all_stock_data import Command as FetchAllStockDataCommand
+from .management.commands.fetch_issuer_news import Command as FetchNewsCommand
+from .management.commands.fetch_issuer_news_content import Command as FetchNewsContentCommand
+from .price_store import PriceStore
+from .sentiment_analysis import refresh_daily_sentiment, summarize_daily_sentiment, summarize_sentiment
+from .sweep import SWEEP_THRESHOLDS, run_sweep, sweep_settings, validate_sweep
+from .technical_analysis import BUY, HOLD, SELL, INDICATOR_NAMES, IndicatorEngine, calculate_indicators
+from .utils import HostRateLimiter, get_http_session, parse_news_content, parse_symbol_history
 
-# Create your tests here.
+TESTDATA_DIR = os.path.join(os.path.dirname(__file__), 'testdata')
+
+
+def read_testdata(filename):
+    with open(os.path.join(TESTDATA_DIR, filename), encoding='utf-8') as f:
+        return f.read()
+
+
+def price_frame(dates, closes):
+    """Scraped-style price rows with the given dates and last trade prices."""
+    return pd.DataFrame({
+        'date': dates,
+        'last_trade_price': closes,
+        'max_price': [close + 1 for close in closes],
+        'min_price': [close - 1 for close in closes],
+        'avg_price': closes,
+        'price_change': [0.5] * len(closes),
+        'volume': [100] * len(closes),
+        'turnover_best': [1000.0] * len(closes),
+        'total_turnover': [1000.0] * len(closes),
+    })
+
+
+def random_bars(count, seed=0):
+    """Random-walk close, high and low prices."""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    spread = rng.uniform(0.1, 2, count)
+    return pd.DataFrame({'close_price': close, 'high': close + spread, 'low': close - spread})
+
+
+def trained_predictor(prices, horizon=1):
+    """TimeSeriesPredictor trained reproducibly on prices; returns (predictor, metrics)."""
+    predictor = TimeSeriesPredictor(horizon=horizon)
+    predictor.model.set_params(random_state=0)
+    return predictor, predictor.train(prices)['metrics']
+
+
+def price_history(count, start='2024-01-01', seed=0):
+    """Business-day dates and positive random-walk prices."""
+    dates = pd.bdate_range(start, periods=count).to_numpy().astype('datetime64[D]')
+    return dates, random_bars(count, seed)['close_price'].to_numpy()
+
+
+class UpsertStockPricesTests(TestCase):
+    def setUp(self):
+        self.issuer = Issuer.objects.create(code='TST', name='Test Issuer')
+
+    def test_counts_inserted_updated_and_unchanged_rows(self):
+        stats = upsert_stock_prices(self.issuer, price_frame(['2024-01-02', '2024-01-03'], [10.0, 11.0]))
+        self.assertEqual((stats['inserted'], stats['updated'], stats['unchanged']), (2, 0, 0))
+        self.assertEqual(stats['changed_from'], date(2024, 1, 2))
+
+        stats = upsert_stock_prices(
+            self.issuer, price_frame(['2024-01-02', '2024-01-03', '2024-01-04'], [10.0, 11.5, 12.0])
+        )
+        self.assertEqual((stats['inserted'], stats['updated'], stats['unchanged']), (1, 1, 1))
+        self.assertEqual(stats['changed_from'], date(2024, 1, 3))
+        self.assertEqual(
+            list(StockPrice.objects.filter(issuer=self.issuer).order_by('date').values_list('last_trade_price', flat=True)),
+            [Decimal('10.00'), Decimal('11.50'), Decimal('12.00')]
+        )
+
+    def test_repeated_upsert_writes_nothing(self):
+        df = price_frame(['2024-01-02', '2024-01-03'], [1000.0, 1010.5])
+        upsert_stock_prices(self.issuer, df)
+        stats = upsert_stock_prices(self.issuer, df)
+        self.assertEqual((stats['inserted'], stats['updated'], stats['unchanged']), (0, 0, 2))
+        self.assertIsNone(stats['changed_from'])
+
+
+class PriceStoreTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = PriceStore(directory.name)
+
+    def test_newer_rows_are_appended_in_place(self):
+        self.assertEqual(self.store.append('TST', price_frame(['2024-01-02', '2024-01-03'], [10.0, 11.0])), 2)
+        inode = os.stat(self.store.path('TST')).st_ino
+        self.assertEqual(self.store.append('TST', price_frame(['2024-01-04'], [12.0])), 1)
+
+        self.assertEqual(os.stat(self.store.path('TST')).st_ino, inode)
+        frame = self.store.read_frame('TST')
+        self.assertEqual(list(frame['date']), [date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4)])
+        self.assertEqual(list(frame['last_trade_price']), [10.0, 11.0, 12.0])
+
+    def test_out_of_order_rows_rewrite_the_file_sorted(self):
+        self.store.append('TST', price_frame(['2024-01-03', '2024-01-05'], [11.0, 13.0]))
+        inode = os.stat(self.store.path('TST')).st_ino
+        self.store.append('TST', price_frame(['2024-01-02', '2024-01-03'], [10.0, 11.5]))
+
+        self.assertNotEqual(os.stat(self.store.path('TST')).st_ino, inode)
+        frame = self.store.read_frame('TST')
+        self.assertEqual(list(frame['date']), [date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 5)])
+        # The row written last wins on a date stored twice
+        self.assertEqual(list(frame['last_trade_price']), [10.0, 11.5, 13.0])
+        self.assertEqual(os.listdir(self.store.root), ['TST.prices'])
+
+    def test_placeholder_rows_are_not_stored(self):
+        df = price_frame(['2024-01-02', '2024-01-03'], [10.0, 11.0])
+        df.loc[1, df.columns != 'date'] = 0
+        self.assertEqual(self.store.append('TST', df), 1)
+        self.assertFalse(self.store.has_data_between('TST', date(2024, 1, 3), date(2024, 1, 3)))
+
+    def test_empty_years_are_covered_once_marked(self):
+        year = (date(2015, 1, 1), date(2015, 12, 31))
+        self.assertFalse(self.store.is_covered('TST', *year))
+        self.store.mark_empty('TST', *year)
+        self.assertTrue(self.store.is_covered('TST', *year))
+        self.assertFalse(self.store.is_covered('TST', date(2016, 1, 1), date(2016, 12, 31)))
+        self.assertEqual(self.store.symbols(), [])
+
+    def test_partial_current_year_is_not_covered(self):
+        today = date.today()
+        year = (date(today.year, 1, 1), date(today.year, 12, 31))
+        self.store.append('TST', price_frame([year[0]], [10.0]))
+        if today != year[0]:
+            self.assertFalse(self.store.is_covered('TST', *year))
+        self.store.append('TST', price_frame([today], [11.0]))
+        self.assertTrue(self.store.is_covered('TST', *year))
+
+        self.store.append('TST', price_frame([date(2015, 6, 1)], [9.0]))
+        self.assertTrue(self.store.is_covered('TST', date(2015, 1, 1), date(2015, 12, 31)))
+
+
+class IndicatorEngineTests(SimpleTestCase):
+    def test_resumed_engine_matches_full_recompute(self):
+        bars = random_bars(150)
+        for period in [1, 5, 20]:
+            with self.subTest(period=period):
+                engine = IndicatorEngine(period)
+                first = engine.run(bars.iloc[:90])
+                # The state is stored as JSON between runs
+                engine = IndicatorEngine.from_state(json.loads(json.dumps(engine.to_state())))
+                streamed = pd.concat([first, engine.run(bars.iloc[90:])])
+
+                expected = calculate_indicators(bars, INDICATOR_NAMES, [period])[period]
+                for name in INDICATOR_NAMES:
+                    column = f'{name}_{period}'
+                    np.testing.assert_allclose(streamed[column], expected[column], rtol=1e-9, atol=1e-9,
+                                               equal_nan=True, err_msg=column)
+
+    def test_matches_ta_reference_values(self):
+        # Values computed with the ta package (0.11.0) before it was dropped
+        reference = pd.read_csv(os.path.join(TESTDATA_DIR, 'ta_indicators.csv'))
+        indicators = calculate_indicators(reference, INDICATOR_NAMES, [1, 5, 20])
+        for period, columns in indicators.items():
+            for name in INDICATOR_NAMES:
+                column = f'{name}_{period}'
+                np.testing.assert_allclose(columns[column], reference[column], rtol=1e-9, atol=1e-9,
+                                           equal_nan=True, err_msg=column)
+
+
+class BacktestTests(SimpleTestCase):
+    def test_signal_positions_hold_until_the_next_signal(self):
+        codes = np.array([HOLD, BUY, HOLD, HOLD, SELL, HOLD, BUY], dtype=np.int8)
+        self.assertEqual(signal_positions(codes).tolist(), [0, 1, 1, 1, 0, 0, 1])
+
+    def test_position_earns_from_the_next_bar_only(self):
+        # A BUY at the close of bar 1 must not earn bar 1's own +10%
+        close = np.array([100.0, 110.0, 55.0, 66.0])
+        returns = np.r_[np.nan, close[1:] / close[:-1] - 1][:, None]
+        positions = np.array([0, 1, 0, 0], dtype=np.int8)[:, None]
+        active = np.ones(returns.shape, dtype=bool)
+
+        metrics = strategy_metrics(positions, returns, active)
+        np.testing.assert_allclose(metrics['total_return'], [-0.5])
+        self.assertEqual(metrics['trades'].tolist(), [1])
+        self.assertEqual(metrics['hit_rate'].tolist(), [0.0])
+        np.testing.assert_allclose(metrics['exposure'], [0.25])
+
+    def test_buy_and_hold_skips_days_without_trades(self):
+        bars = random_bars(60)
+        close = bars['close_price'].to_numpy()[:, None].copy()
+        close[[10, 11, 30]] = np.nan
+        high = bars['high'].to_numpy()[:, None]
+        low = bars['low'].to_numpy()[:, None]
+
+        results = backtest_chunk(close, high, low, [5])
+        np.testing.assert_allclose(results['buy_and_hold']['total_return'], [close[-1, 0] / close[0, 0] - 1])
+        self.assertIn('consensus_5', results)
+
+
+class SweepValidationTests(SimpleTestCase):
+    def test_default_grid_is_accepted(self):
+        validate_sweep([5, 20], sweep_settings([5, 20]))
+
+    def test_bad_input_is_rejected(self):
+        setting = sweep_settings([5])[0]
+        cases = {
+            'period below 1': ([0], sweep_settings([0]), 5),
+            'horizon below 1': ([5], [setting], 0),
+            'period not swept': ([5], sweep_settings([20]), 5),
+            'zero quorum': ([5], [setting[:-1] + (0,)], 5),
+            'quorum above 1': ([5], [setting[:-1] + (1.5,)], 5),
+            'inverted thresholds': ([5], [(5, (30, 70)) + setting[2:]], 5),
+        }
+        for case, (periods, settings, horizon) in cases.items():
+            with self.subTest(case):
+                with self.assertRaises(ValueError):
+                    validate_sweep(periods, settings, horizon)
+
+    def test_run_sweep_scores_every_setting(self):
+        bars = random_bars(200)
+        settings = sweep_settings([5], {name: values[:1] for name, values in SWEEP_THRESHOLDS.items()}, [0.5])
+        report = run_sweep(
+            bars[['close_price']].to_numpy(), bars[['high']].to_numpy(), bars[['low']].to_numpy(),
+            [7], [5], settings
+        )
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report['issuer_id'].tolist(), [7])
+        with self.assertRaises(ValueError):
+            run_sweep(bars[['close_price']].to_numpy(), bars[['high']].to_numpy(), bars[['low']].to_numpy(),
+                      [7], [5], settings, horizon=0)
+
+
+class SweepCommandTests(TestCase):
+    def test_invalid_arguments_fail_before_loading_prices(self):
+        for arguments in (['--periods', '0'], ['--horizon', '0'], ['--jobs', '0']):
+            with self.subTest(arguments=arguments):
+                with self.assertRaises(CommandError):
+                    call_command('sweep_signal_parameters', *arguments)
+
+
+class StockDataPeriodsTests(TestCase):
+    def setUp(self):
+        issuer = Issuer.objects.create(code='TST', name='Test Issuer')
+        days = pd.bdate_range(end=date.today(), periods=40)
+        upsert_stock_prices(issuer, price_frame(days.date, list(random_bars(40)['close_price'].round(2))))
+        self.url = reverse('stock_data', args=['TST'])
+
+    def test_periods_within_limits_are_served(self):
+        for periods in ['5', '1,5,20', '250']:
+            with self.subTest(periods=periods):
+                self.assertEqual(self.client.get(self.url, {'periods': periods}).status_code, 200)
+
+    def test_periods_outside_limits_are_rejected(self):
+        for periods in ['0', '-5', '251', '50000', 'x', '5,', '1,2,3,4,5,6']:
+            with self.subTest(periods=periods):
+                response = self.client.get(self.url, {'periods': periods})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('periods', response.json()['message'])
+
+
+class DailySentimentTests(TestCase):
+    def setUp(self):
+        self.issuer = Issuer.objects.create(code='TST', name='Test Issuer')
+
+    def add_news(self, published_date, score):
+        return IssuerNews.objects.create(
+            issuer=self.issuer, title='Title', content='', published_date=published_date,
+            source_url=f'https://example.com/{IssuerNews.objects.count()}', sentiment_score=score
+        )
+
+    def test_aggregates_per_issuer_and_day(self):
+        day = timezone.make_aware(datetime(2024, 3, 4, 9))
+        for score in [0.5, -0.25, 0.0]:
+            self.add_news(day, score)
+        self.add_news(day + timedelta(days=1), 0.0)
+        self.add_news(day + timedelta(days=1), None)
+
+        self.assertEqual(refresh_daily_sentiment([self.issuer.id]), 2)
+        first, second = DailySentiment.objects.filter(issuer=self.issuer).order_by('date')
+        self.assertEqual(first.date, date(2024, 3, 4))
+        self.assertEqual(first.article_count, 3)
+        self.assertAlmostEqual(first.score_sum, 0.25)
+        self.assertAlmostEqual(first.mean_score, 0.25 / 3)
+        self.assertAlmostEqual(first.weighted_score, (0.5 * 0.5 - 0.25 * 0.25) / 0.75)
+        self.assertEqual((first.positive_count, first.neutral_count, first.negative_count), (1, 1, 1))
+        # Unscored articles are left out and all-zero days have no weighted score
+        self.assertEqual(second.article_count, 1)
+        self.assertIsNone(second.weighted_score)
+
+    def test_refresh_since_rewrites_later_days_only(self):
+        day = timezone.make_aware(datetime(2024, 3, 4, 9))
+        self.add_news(day, 0.5)
+        self.add_news(day + timedelta(days=1), 0.5)
+        refresh_daily_sentiment([self.issuer.id])
+        IssuerNews.objects.update(sentiment_score=-0.5)
+
+        self.assertEqual(refresh_daily_sentiment([self.issuer.id], since=date(2024, 3, 5)), 1)
+        self.assertEqual(
+            list(DailySentiment.objects.filter(issuer=self.issuer).order_by('date').values_list('score_sum', flat=True)),
+            [0.5, -0.5]
+        )
+
+    def test_migration_backfill_matches_refresh(self):
+        day = timezone.make_aware(datetime(2024, 3, 4, 9))
+        for offset, score in enumerate([0.5, -0.25, 0.75, 0.0]):
+            self.add_news(day + timedelta(days=offset // 2), score)
+        refresh_daily_sentiment([self.issuer.id])
+        fields = ['date', 'article_count', 'score_sum', 'mean_score', 'weighted_score',
+                  'positive_count', 'neutral_count', 'negative_count']
+        expected = list(DailySentiment.objects.order_by('date').values_list(*fields))
+
+        DailySentiment.objects.all().delete()
+        backfill = import_module('core.migrations.0007_dailysentiment')
+        backfill.build_daily_sentiment(apps, None, issuer_ids=[self.issuer.id])
+        self.assertEqual(list(DailySentiment.objects.order_by('date').values_list(*fields)), expected)
+
+    def test_daily_summary_matches_article_summary(self):
+        # Scraped articles carry only a date, stored as midnight
+        today = timezone.now().date()
+        scores = [0.9, 0.8, -0.1, 0.7, 0.6, 0.0]
+        news = [
+            self.add_news(timezone.make_aware(datetime.combine(today - timedelta(days=days_old), time.min)), score)
+            for days_old, score in zip([0, 0, 3, 10, 29, 35], scores)
+        ]
+        refresh_daily_sentiment([self.issuer.id])
+
+        expected = summarize_sentiment(scores, [item.published_date for item in news])
+        summary = summarize_daily_sentiment(DailySentiment.objects.filter(issuer=self.issuer))
+        self.assertEqual(summary['trading_signal'], expected['trading_signal'])
+        self.assertAlmostEqual(summary['confidence'], expected['confidence'])
+        self.assertEqual(summary['sentiment_distribution'], expected['sentiment_distribution'])
+
+
+@ignore_warnings(category=ConvergenceWarning)
+class SaveNewsTests(TestCase):
+    def setUp(self):
+        self.issuer = Issuer.objects.create(code='TST', name='Test Issuer')
+        self.command = FetchNewsCommand()
+        self.command.analyzer = mock.Mock()
+
+    def test_counts_only_rows_inserted_by_this_run(self):
+        items = [
+            ('Early', timezone.make_aware(datetime(2024, 3, 4, 9)), 'https://example.com/early'),
+            ('Late', timezone.make_aware(datetime(2024, 3, 6, 9)), 'https://example.com/late'),
+        ]
+        bulk_create = IssuerNews.objects.bulk_create
+
+        def concurrent_bulk_create(objs, **kwargs):
+            # Another run stores the earlier item between the lookup and the insert
+            IssuerNews.objects.create(
+                issuer=self.issuer, title='Early', content='', published_date=items[0][1],
+                source_url=items[0][2]
+            )
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(IssuerNews.objects, 'bulk_create', side_effect=concurrent_bulk_create), \
+                mock.patch('core.management.commands.fetch_issuer_news.refresh_daily_sentiment') as refresh, \
+                self.assertLogs(level='INFO') as logs:
+            self.assertEqual(self.command.save_news(self.issuer, items), 1)
+
+        self.assertEqual(IssuerNews.objects.filter(issuer=self.issuer).count(), 2)
+        self.assertEqual([line for line in logs.output if 'Added news' in line], ['INFO:root:Added news for TST: Late'])
+        refresh.assert_called_once_with([self.issuer.id], since=date(2024, 3, 6))
+
+    def test_known_items_are_skipped(self):
+        published = timezone.make_aware(datetime(2024, 3, 4, 9))
+        IssuerNews.objects.create(
+            issuer=self.issuer, title='Known', content='', published_date=published,
+            source_url='https://example.com/known'
+        )
+        self.assertEqual(self.command.save_news(self.issuer, [('Known', published, 'https://example.com/known')]), 0)
+
+
+class PredictorRegistryTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.models_dir = directory.name
+        self.dates, self.prices = price_history(80)
+
+    def save(self, symbol):
+        predictor, metrics = trained_predictor(self.prices)
+        return save_model_bundle(symbol, predictor, metrics, (self.dates[0].item(), self.dates[-1].item()),
+                                 self.models_dir)
+
+    def test_predictor_is_loaded_once(self):
+        self.save('TST')
+        registry = PredictorRegistry(max_size=2, models_dir=self.models_dir)
+        self.assertIs(registry.get('TST'), registry.get('TST'))
+        self.assertEqual(len(registry), 1)
+
+    def test_retrained_model_is_reloaded(self):
+        self.save('TST')
+        registry = PredictorRegistry(max_size=2, models_dir=self.models_dir)
+        old = registry.get('TST')
+        version = self.save('TST')
+
+        new = registry.get('TST')
+        self.assertIsNot(new, old)
+        self.assertEqual(new.version, version)
+        self.assertIs(registry.get('TST'), new)
+
+    def test_least_recently_used_predictor_is_dropped(self):
+        for symbol in ['AAA', 'BBB', 'CCC']:
+            self.save(symbol)
+        registry = PredictorRegistry(max_size=2, models_dir=self.models_dir)
+        first = registry.get('AAA')
+        registry.get('BBB')
+        registry.get('AAA')
+        registry.get('CCC')
+
+        self.assertEqual(len(registry), 2)
+        self.assertIs(registry.get('AAA'), first)
+        self.assertEqual(registry.preload(['BBB', 'MISSING']), 1)
+
+    def test_missing_model_raises(self):
+        registry = PredictorRegistry(models_dir=self.models_dir)
+        with self.assertRaises(FileNotFoundError):
+            registry.get('MISSING')
+
+
+@ignore_warnings(category=ConvergenceWarning)
+class ModelBundleTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.models_dir = directory.name
+        self.dates, self.prices = price_history(80)
+        self.data_range = (self.dates[0].item(), self.dates[-1].item())
+
+    def test_bundle_round_trip(self):
+        predictor, metrics = trained_predictor(self.prices)
+        version = save_model_bundle('TST', predictor, metrics, self.data_range, self.models_dir)
+
+        bundle = load_model_bundle('TST', self.models_dir)
+        self.assertEqual(bundle['format'], BUNDLE_FORMAT)
+        self.assertEqual(bundle['version'], version)
+        self.assertEqual(bundle['data_range'], self.data_range)
+        self.assertEqual(bundle['features']['sequence_length'], predictor.sequence_length)
+        self.assertEqual(bundle['features']['horizon'], 1)
+        self.assertEqual(bundle['metrics'], metrics)
+        X, _ = predictor.prepare_data(self.prices, fit_scaler=False)
+        np.testing.assert_array_equal(bundle['model'].predict(X), predictor.model.predict(X))
+        self.assertEqual(os.listdir(self.models_dir), ['TST.joblib'])
+
+    def test_failed_save_keeps_the_previous_bundle(self):
+        predictor, metrics = trained_predictor(self.prices)
+        version = save_model_bundle('TST', predictor, metrics, self.data_range, self.models_dir)
+
+        with mock.patch('core.lstm_prediction.joblib.dump', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                save_model_bundle('TST', predictor, metrics, self.data_range, self.models_dir)
+        self.assertEqual(load_model_bundle('TST', self.models_dir)['version'], version)
+        self.assertEqual(os.listdir(self.models_dir), ['TST.joblib'])
+
+    def test_unsupported_format_is_refused(self):
+        joblib.dump({'format': BUNDLE_FORMAT + 1}, bundle_path('TST', self.models_dir))
+        with self.assertRaises(ValueError):
+            load_model_bundle('TST', self.models_dir)
+
+    def test_legacy_artifacts_are_loaded_and_replaced_by_a_bundle(self):
+        predictor, metrics = trained_predictor(self.prices)
+        paths = legacy_artifact_paths('TST', self.models_dir)
+        joblib.dump(predictor.model, paths['model'])
+        joblib.dump(predictor.scaler, paths['scaler'])
+        joblib.dump(metrics, paths['metrics'])
+
+        legacy = PricePredictor('TST', self.models_dir)
+        self.assertIsNone(legacy.version)
+        self.assertEqual((legacy.sequence_length, legacy.horizon), (10, 1))
+        self.assertEqual(legacy.predict_future(self.prices, 5).shape, (5,))
+
+        _, mode = train_price_model('TST', self.dates, self.prices, self.models_dir)
+        self.assertEqual(mode, 'full')
+        self.assertEqual(os.listdir(self.models_dir), ['TST.joblib'])
+        self.assertIsNotNone(PricePredictor('TST', self.models_dir).version)
+
+    def test_missing_model_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            load_model_bundle('MISSING', self.models_dir)
+
+
+@ignore_warnings(category=ConvergenceWarning)
+class IncrementalTrainingTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.models_dir = directory.name
+        np.random.seed(0)
+        self.dates, self.prices = price_history(90)
+        train_price_model('TST', self.dates[:80], self.prices[:80], self.models_dir, incremental=True)
+
+    def train(self, dates, prices, **kwargs):
+        return train_price_model('TST', dates, prices, self.models_dir, incremental=True, epochs=5, **kwargs)[1]
+
+    def extended(self, new_prices):
+        dates = pd.bdate_range(pd.Timestamp(self.dates[79]), periods=len(new_prices) + 1)[1:]
+        return np.r_[self.dates[:80], dates.to_numpy().astype('datetime64[D]')], np.r_[self.prices[:80], new_prices]
+
+    def test_first_training_is_full(self):
+        self.assertEqual(load_model_bundle('TST', self.models_dir)['data_range'],
+                         (self.dates[0].item(), self.dates[79].item()))
+
+    def test_same_history_is_unchanged(self):
+        version = load_model_bundle('TST', self.models_dir)['version']
+        self.assertEqual(self.train(self.dates[:80], self.prices[:80]), 'unchanged')
+        self.assertEqual(load_model_bundle('TST', self.models_dir)['version'], version)
+
+    def test_new_days_within_the_scaler_range_are_incremental(self):
+        dates, prices = self.extended(self.prices[40:45])
+        baseline = load_model_bundle('TST', self.models_dir)['baseline_val_rmse']
+        with mock.patch('core.lstm_prediction.DRIFT_TOLERANCE', np.inf):
+            self.assertEqual(self.train(dates, prices), 'incremental')
+
+        bundle = load_model_bundle('TST', self.models_dir)
+        self.assertEqual(bundle['data_range'], (dates[0].item(), dates[-1].item()))
+        self.assertEqual(bundle['baseline_val_rmse'], baseline)
+
+    def test_prices_outside_the_scaler_range_retrain_in_full(self):
+        dates, prices = self.extended([self.prices[:80].max() * 2])
+        self.assertEqual(self.train(dates, prices), 'full')
+
+    def test_drifting_validation_error_retrains_in_full(self):
+        dates, prices = self.extended(self.prices[40:45])
+        with mock.patch('core.lstm_prediction.DRIFT_TOLERANCE', 0):
+            self.assertEqual(self.train(dates, prices), 'full')
+
+    def test_horizon_change_retrains_in_full(self):
+        self.assertEqual(load_model_bundle('TST', self.models_dir)['features']['horizon'], 30)
+        self.assertEqual(self.train(self.dates[:80], self.prices[:80], horizon=1), 'full')
+        self.assertEqual(load_model_bundle('TST', self.models_dir)['features']['horizon'], 1)
+
+
+@ignore_warnings(category=ConvergenceWarning)
+class PredictBatchTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.models_dir = directory.name
+
+    def load(self, symbol, prices, horizon):
+        predictor, metrics = trained_predictor(prices, horizon)
+        save_model_bundle(symbol, predictor, metrics, ('2024-01-01', '2024-12-31'), self.models_dir)
+        return PricePredictor(symbol, self.models_dir)
+
+    @staticmethod
+    def sklearn_forecast(predictor, prices, days_ahead):
+        """Forecast with MLPRegressor.predict, feeding predictions back in."""
+        window = list(predictor.scaler.transform(prices[-predictor.sequence_length:].reshape(-1, 1))[:, 0])
+        scaled = []
+        while len(scaled) < days_ahead:
+            output = np.atleast_1d(predictor.model.predict(np.array([window[-predictor.sequence_length:]]))[0])
+            scaled.extend(output)
+            window.extend(output)
+        return predictor.scaler.inverse_transform(np.array(scaled[:days_ahead]).reshape(-1, 1))[:, 0]
+
+    def test_matches_sklearn_predict(self):
+        histories = [price_history(100, seed=seed)[1] for seed in range(4)]
+        predictors = [
+            self.load('ONE1', histories[0], 1),
+            self.load('MUL1', histories[1], 30),
+            self.load('ONE2', histories[2], 1),
+            self.load('MUL2', histories[3], 30),
+        ]
+        for days_ahead in [1, 30, 45]:
+            with self.subTest(days_ahead=days_ahead):
+                forecasts = predict_batch(predictors, histories, days_ahead)
+                for predictor, prices, forecast in zip(predictors, histories, forecasts):
+                    np.testing.assert_allclose(forecast, self.sklearn_forecast(predictor, prices, days_ahead),
+                                               rtol=1e-9, err_msg=predictor.symbol)
+
+    def test_short_history_is_rejected(self):
+        predictor = self.load('TST', price_history(100)[1], 1)
+        with self.assertRaisesRegex(ValueError, 'TST needs at least 10 prices, got 9'):
+            predict_batch([predictor], [np.ones(9)])
+
+
+@ignore_warnings(category=ConvergenceWarning)
+class ForecastIssuersTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        registry = PredictorRegistry(models_dir=directory.name)
+        patcher = mock.patch('core.lstm_prediction.get_predictor_registry', return_value=registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        for code, count in [('LONG', 40), ('SHORT', 5), ('NOMODEL', 40)]:
+            issuer = Issuer.objects.create(code=code, name=code)
+            dates, prices = price_history(count)
+            upsert_stock_prices(issuer, price_frame(dates.astype(object), list(prices.round(2))))
+            if code != 'NOMODEL':
+                predictor, metrics = trained_predictor(price_history(80)[1])
+                save_model_bundle(code, predictor, metrics, ('2024-01-01', '2024-12-31'), directory.name)
+
+    def test_forecasts_issuers_with_a_model_and_enough_prices(self):
+        forecasts = forecast_issuers(['LONG', 'SHORT', 'NOMODEL', 'UNKNOWN'], days_ahead=7)
+        self.assertEqual(list(forecasts), ['LONG'])
+        self.assertEqual(forecasts['LONG'].shape, (7,))
+
+    def test_recommendations_show_the_forecast(self):
+        refresh_issuer_quotes()
+        response = self.client.get(reverse('recommendations'))
+        self.assertEqual(response.status_code, 200)
+        forecasts = {rec['issuer'].code: rec.get('forecast_price') for rec in response.context['recommendations']}
+        self.assertIsNotNone(forecasts.get('LONG'))
+        self.assertContains(response, '30-Day Forecast')
+
+
+@ignore_warnings(category=ConvergenceWarning)
+class TrainPricePredictorCommandTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.models_dir = directory.name
+        for seed, (code, count) in enumerate([('AAA', 80), ('BBB', 80), ('SHORT', 20)]):
+            issuer = Issuer.objects.create(code=code, name=code)
+            dates, prices = price_history(count, seed=seed)
+            upsert_stock_prices(issuer, price_frame(dates.astype(object), list(prices.round(2))))
+
+    def test_trains_issuers_in_worker_processes(self):
+        output = StringIO()
+        with override_settings(TRAINED_MODELS_DIR=self.models_dir):
+            call_command('train_price_predictor', '--jobs', '2', '--blas-threads', '1', stdout=output)
+
+        self.assertIn('Skipping SHORT', output.getvalue())
+        self.assertIn('Trained 2/2 models', output.getvalue())
+        self.assertEqual(sorted(os.listdir(self.models_dir)), ['AAA.joblib', 'BBB.joblib'])
+        self.assertEqual(load_model_bundle('AAA', self.models_dir)['symbol'], 'AAA')
+
+
+class SymbolHistoryParserTests(SimpleTestCase):
+    def test_results_page(self):
+        df = parse_symbol_history(read_testdata('symbol_history_results.html'), 'TEL',
+                                  date(2024, 3, 1), date(2024, 3, 5))
+        self.assertEqual(list(df['date']), [date(2024, 3, 5), date(2024, 3, 4)])
+        self.assertEqual(list(df['last_trade_price']), [1050.0, 1040.0])
+        self.assertEqual(list(df['turnover_best']), [126300, 36400])
+        self.assertTrue(np.isnan(df['max_price'].iloc[1]))
+
+    def test_no_data_page_is_zero_filled(self):
+        df = parse_symbol_history(read_testdata('symbol_history_no_data.html'), 'TEL',
+                                  date(2015, 1, 1), date(2015, 1, 3))
+        self.assertEqual(list(df['date']), [date(2015, 1, 1), date(2015, 1, 2), date(2015, 1, 3)])
+        self.assertFalse(df.drop(columns='date').to_numpy().any())
+
+    def test_unexpected_page_raises(self):
+        with self.assertRaises(ValueError):
+            parse_symbol_history(read_testdata('symbol_history_unexpected.html'), 'TEL',
+                                 date(2024, 3, 1), date(2024, 3, 5))
+
+    def test_unexpected_page_falls_back_to_selenium(self):
+        fetch_filter = DataFetchFilter(max_workers=1, save_to_db=False)
+        response = mock.Mock(text=read_testdata('symbol_history_unexpected.html'))
+        fallback = pd.DataFrame({'date': [date(2024, 3, 5)]})
+        with mock.patch.object(fetch_filter.http_scraper.session, 'post', return_value=response), \
+                mock.patch.object(fetch_filter.scraper, '_fetch_data_chunk', return_value=fallback) as selenium, \
+                self.assertLogs(level='WARNING'):
+            self.assertIs(fetch_filter._fetch_stock_data('TEL', date(2024, 3, 1), date(2024, 3, 5)), fallback)
+            selenium.assert_called_once()
+
+            selenium.side_effect = ValueError('no results table')
+            with self.assertRaises(ValueError):
+                fetch_filter._fetch_stock_data('TEL', date(2024, 3, 1), date(2024, 3, 5), raise_errors=True)
+
+
+class FetchAllStockDataTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cwd = os.getcwd()
+        os.chdir(directory.name)
+        self.addCleanup(os.chdir, cwd)
+        os.makedirs('stock_data')
+        self.command = FetchAllStockDataCommand()
+        self.today = timezone.now().date()
+
+    def fetch_filter(self, df):
+        fetch_filter = mock.Mock()
+        fetch_filter.process.return_value = df.to_dict('records')
+        return fetch_filter
+
+    def test_current_year_is_never_skipped(self):
+        for year in [self.today.year - 1, self.today.year]:
+            open(f'stock_data/TST_{year}.csv', 'w').close()
+        self.assertTrue(self.command._year_exists(None, 'TST', self.today.year - 1))
+        self.assertFalse(self.command._year_exists(None, 'TST', self.today.year))
+
+    def test_current_year_is_fetched_up_to_today_without_placeholders(self):
+        year_start = date(self.today.year, 1, 1)
+        df = price_frame([year_start, self.today], [10.0, 11.0])
+        df.loc[1, df.columns != 'date'] = 0
+        fetch_filter = self.fetch_filter(df)
+
+        self.assertEqual(self.command._process_year(fetch_filter, 'TST', self.today.year), ('TST', self.today.year, True))
+        request = fetch_filter.process.call_args[0][0]
+        self.assertEqual((request['from_date'], request['to_date']), (year_start, self.today))
+        self.assertEqual(pd.read_csv(f'stock_data/TST_{self.today.year}.csv')['date'].tolist(), [str(year_start)])
+
+    def test_year_without_trades_writes_no_placeholder_rows(self):
+        df = price_frame([date(2015, 1, 1), date(2015, 1, 2)], [0.0, 0.0])
+        df[df.columns[1:]] = 0
+        self.assertEqual(self.command._process_year(self.fetch_filter(df), 'TST', 2015), ('TST', 2015, False))
+        self.assertTrue(pd.read_csv('stock_data/TST_2015.csv').empty)
+
+
+class HostRateLimiterTests(SimpleTestCase):
+    def response(self, status_code, headers=None):
+        return mock.Mock(status_code=status_code, headers=headers or {})
+
+    def test_retries_wait_for_retry_after(self):
+        session = mock.Mock()
+        session.get.side_effect = [self.response(429, {'Retry-After': '2'}), self.response(200)]
+        limiter = HostRateLimiter(rate=1000)
+
+        with mock.patch('core.utils.time.sleep') as sleep:
+            response = limiter.get(session, 'https://www.mse.mk/en/issuer/x', timeout=5)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(session.get.call_count, 2)
+        session.get.assert_called_with('https://www.mse.mk/en/issuer/x', timeout=5)
+        # The retry took a limiter token that Retry-After had pushed back
+        self.assertEqual(sleep.call_count, 1)
+        self.assertAlmostEqual(sleep.call_args[0][0], 2, places=1)
+
+    def test_last_response_is_returned_after_retries(self):
+        session = mock.Mock()
+        session.get.return_value = self.response(503)
+        limiter = HostRateLimiter(rate=1000)
+
+        with mock.patch('core.utils.time.sleep'):
+            response = limiter.get(session, 'https://www.mse.mk/en/issuer/x', retries=2)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(session.get.call_count, 3)
+
+    def test_session_without_retries(self):
+        adapter = get_http_session(retries=False).get_adapter('https://www.mse.mk')
+        self.assertEqual(adapter.max_retries.total, 0)
+        self.assertIsNot(get_http_session(retries=False), get_http_session())
+
+
+class NewsContentParserTests(SimpleTestCase):
+    url = 'https://www.seinet.com.mk/document/123'
+
+    def test_article_page(self):
+        self.assertEqual(
+            parse_news_content(read_testdata('news_article.html'), self.url),
+            'Notice of the Annual General Meeting\n\n'
+            'The Board of Directors convenes the Annual General Meeting on 15 May 2024.\n'
+            'Proposed dividend: 24 denars per share.\n\n'
+            'agm-2024.pdf\n'
+            'Link: https://www.seinet.com.mk/Repository/Attachments/report.pdf\n'
+            'Link: https://www.seinet.com.mk/document/123#top'
+        )
+
+    def test_app_shell_has_no_content(self):
+        self.assertIsNone(parse_news_content(read_testdata('news_app_shell.html'), self.url))
+
+    def test_unfilled_rows_have_no_content(self):
+        html = ('<div id="root"><main class="main text-center"><div class="container">'
+                '<div class="row"><div class="col-12"> </div></div></div></main></div>')
+        self.assertIsNone(parse_news_content(html, self.url))
+
+    def test_empty_http_page_falls_back_to_selenium(self):
+        command = FetchNewsContentCommand()
+        command.backend = 'http'
+        command.rate_limiter = mock.Mock()
+        command.session = mock.Mock()
+        command.session.get.return_value = mock.Mock(text=read_testdata('news_app_shell.html'))
+        command.scraper = mock.Mock()
+        command.scraper.get_page_source.return_value = read_testdata('news_article.html')
+        news = IssuerNews(source_url=self.url)
+
+        self.assertTrue(command.fetch_content(news).startswith('Notice of the Annual General Meeting'))
+        command.scraper.get_page_source.assert_called_once()
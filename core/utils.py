@@ -4,16 +4,287 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
+from selenium.common.exceptions import TimeoutException
 from bs4 import BeautifulSoup
+import lxml.html
 import pandas as pd
 import time
 import queue
 import logging
+import re
+import threading
+import requests
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+SYMBOL_HISTORY_URL = "https://www.mse.mk/en/stats/symbolhistory/{symbol}"
+
+# Rough resident size of one headless Chrome, used to cap the driver pool
+DRIVER_MEMORY_MB = 400
+# Drivers are recycled after this many page loads to keep memory from creeping up
+MAX_DRIVER_USES = 50
+
+SYMBOL_HISTORY_COLUMNS = [
+    'date', 'last_trade_price', 'max_price', 'min_price',
+    'avg_price', 'price_change', 'volume', 'turnover_best',
+    'total_turnover'
+]
+
+# Responses worth retrying: throttling and transient server errors
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+_http_sessions = {}
+_http_session_lock = threading.Lock()
+
+def get_http_session(pool_size=10, retries=True):
+    """Return the process-wide pooled requests session used for MSE requests.
+
+    Sessions used together with a HostRateLimiter should pass retries=False
+    and retry through HostRateLimiter.get, otherwise urllib3 retries skip the
+    limiter.
+    """
+    with _http_session_lock:
+        if retries not in _http_sessions:
+            session = requests.Session()
+            retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=['GET', 'POST']
+            ) if retries else Retry(total=0, raise_on_status=False)
+            adapter = HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=retry
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+                              '(KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+            })
+            _http_sessions[retries] = session
+        return _http_sessions[retries]
+
+def retry_after_seconds(response):
+    """Seconds requested by a Retry-After header, or None when absent or unparseable."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class HostRateLimiter:
+    """Token bucket per host, shared by all threads of a crawler.
+
+    Each host gets `rate` requests per second on average with bursts of up
+    to `burst` requests. wait() reserves a token under the lock and sleeps
+    outside it, so concurrent callers are spaced out instead of racing.
+    """
+
+    def __init__(self, rate=1.0, burst=1):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(host, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate) - 1
+            self._buckets[host] = (tokens, now)
+        if tokens < 0:
+            time.sleep(-tokens / self.rate)
+
+    def defer(self, url, delay):
+        """Hold back the next request to the host of `url` for at least `delay` seconds."""
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(host, (self.burst, now))
+            tokens = min(1, tokens + (now - updated) * self.rate) - delay * self.rate
+            self._buckets[host] = (tokens, now)
+
+    def get(self, session, url, retries=3, backoff=0.5, **kwargs):
+        """GET `url` with every attempt, retries included, going through the limiter.
+
+        429 and 5xx responses and connection errors are retried with
+        exponential backoff, or after the Retry-After delay when the server
+        sends one. The delay applies to the whole host, so other threads
+        back off too. The last response is returned as is.
+        """
+        for attempt in range(retries + 1):
+            self.wait(url)
+            try:
+                response = session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == retries:
+                    raise
+                self.defer(url, backoff * 2 ** attempt)
+                continue
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+            delay = retry_after_seconds(response)
+            self.defer(url, backoff * 2 ** attempt if delay is None else delay)
+            response.close()
+
+def available_memory_mb():
+    """Return MemAvailable from /proc/meminfo in MB, or None where it is not readable."""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def empty_symbol_history(from_date, to_date):
+    """Zero-filled frame returned when MSE has no trades for the requested range."""
+    df = pd.DataFrame({
+        'date': pd.date_range(from_date, to_date),
+        'last_trade_price': 0,
+        'max_price': 0,
+        'min_price': 0,
+        'avg_price': 0,
+        'price_change': 0,
+        'volume': 0,
+        'turnover_best': 0,
+        'total_turnover': 0
+    })
+    df['date'] = df['date'].dt.date
+    return df
+
+def parse_symbol_history(html, symbol, from_date, to_date):
+    """Parse the symbolhistory page into a DataFrame with SYMBOL_HISTORY_COLUMNS.
+
+    Returns the zero-filled empty_symbol_history only when the page says
+    there is no data. Raises ValueError for any other page without result
+    rows (a rejected form, a changed layout), so callers can tell a failed
+    fetch from a period without trades.
+    """
+    soup = BeautifulSoup(html, 'lxml')
+    
+    no_results = soup.find('div', {'class': 'no-results'})
+    if no_results and 'No data' in no_results.text:
+        logging.debug(f'No data found for {symbol} between {from_date} and {to_date}')
+        return empty_symbol_history(from_date, to_date)
+    
+    table = soup.find('table', {'id': 'resultsTable'})
+    tbody = table.find('tbody') if table else None
+    if not tbody or not tbody.find_all('tr'):
+        raise ValueError(
+            f'Unexpected symbol history page for {symbol} between {from_date} and {to_date}: '
+            f'no results table and no "No data" message'
+        )
+    
+    rows = []
+    for tr in tbody.find_all('tr'):
+        row = []
+        for td in tr.find_all('td'):
+            value = td.text.strip().replace(',', '')
+            row.append(value)
+        rows.append(row)
+        
+    df = pd.DataFrame(rows, columns=SYMBOL_HISTORY_COLUMNS)
+    
+    df['date'] = pd.to_datetime(df['date']).dt.date
+    
+    for col in SYMBOL_HISTORY_COLUMNS[1:]:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    
+    return df
+
+# Rows of a rendered seinet article, read by parse_news_content
+NEWS_ROW_SELECTOR = '#root main.main.text-center .container .row'
+
+WHITESPACE = re.compile(r'\s+')
+
+# Elements that start a new line in the rendered text of a news page
+BLOCK_TAGS = ['p', 'br', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'table', 'ul', 'ol', 'section', 'article']
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+def _element_text(element):
+    """Approximate Selenium's WebElement.text: one line per block, whitespace collapsed."""
+    lines = (' '.join(line.split()) for line in element.text_content().splitlines())
+    return '\n'.join(line for line in lines if line)
+
+def _news_text(element):
+    """Text of the innermost divs below element, or their links when they have no text.
+
+    Mirrors the Selenium extraction it replaces: like find_elements, './/div'
+    matches every descendant div, not only direct children.
+    """
+    divs = element.xpath('.//div')
+    if not divs:
+        text = _element_text(element)
+        if text:
+            return text
+        hrefs = [link.get('href') for link in element.iter('a')]
+        return '\n'.join(f"Link: {href}" for href in hrefs if href and not href.startswith('#')) or None
+
+    texts = [text for text in map(_news_text, divs) if text]
+    return '\n'.join(texts) if texts else None
+
+def parse_news_content(html, url):
+    """Extract the article text from a seinet news page.
+
+    Returns the text of every row of the main container joined by blank
+    lines, or None when the page has no rendered article: the app shell
+    served before JavaScript runs, or a container whose rows are not
+    filled yet.
+    """
+    document = lxml.html.fromstring(html)
+    for element in document.xpath('//script|//style|//noscript|//template'):
+        element.drop_tree()
+    # Like a browser, treat line breaks in the source as spaces; lines come from blocks only
+    for element in document.iter():
+        if element.text:
+            element.text = WHITESPACE.sub(' ', element.text)
+        if element.tail:
+            element.tail = WHITESPACE.sub(' ', element.tail)
+    for element in document.iter(*BLOCK_TAGS):
+        element.tail = '\n' + (element.tail or '')
+    # Selenium returns resolved hrefs
+    document.make_links_absolute(url, resolve_base_href=True, handle_failures='ignore')
+
+    containers = document.xpath(
+        f"//*[@id='root']//main[{_has_class('main')} and {_has_class('text-center')}]"
+        f"//*[{_has_class('container')}]"
+    )
+    if not containers:
+        return None
+    rows = containers[0].xpath(f".//*[{_has_class('row')}]")
+    return '\n\n'.join(text for text in map(_news_text, rows) if text) or None
 
 class WebScraper:
-    def __init__(self, max_workers=10, headless=True):
+    _driver_path = None
+    _driver_path_lock = threading.Lock()
+
+    def __init__(self, max_workers=10, headless=True, max_uses=MAX_DRIVER_USES,
+                 driver_memory_mb=DRIVER_MEMORY_MB):
         self.max_workers = max_workers
         self.headless = headless
+        self.max_uses = max_uses
+        self.max_drivers = self._memory_capped_drivers(max_workers, driver_memory_mb)
         
         self.chrome_options = Options()
         if headless:
@@ -36,29 +307,122 @@ class WebScraper:
             }
         }
         self.chrome_options.add_experimental_option('prefs', prefs)
-        self.driver_pool = queue.Queue()
+        
+        # Idle drivers wait in driver_pool; a slot is held for every checked out driver,
+        # so at most max_drivers browsers exist at any time
+        self.driver_pool = queue.LifoQueue()
+        self._driver_slots = threading.BoundedSemaphore(self.max_drivers)
+        self._driver_uses = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def _memory_capped_drivers(max_workers, driver_memory_mb):
+        available = available_memory_mb()
+        if available is None:
+            return max(1, max_workers)
+        return max(1, min(max_workers, available // driver_memory_mb))
+
+    @classmethod
+    def _get_driver_path(cls):
+        # ChromeDriverManager().install() hits the network, so resolve it once per process
+        with cls._driver_path_lock:
+            if cls._driver_path is None:
+                from webdriver_manager.chrome import ChromeDriverManager
+                cls._driver_path = ChromeDriverManager().install()
+            return cls._driver_path
         
     def _create_driver(self):
         from selenium.webdriver.chrome.service import Service
-        from webdriver_manager.chrome import ChromeDriverManager
         
-        service = Service(ChromeDriverManager().install())
-        return webdriver.Chrome(service=service, options=self.chrome_options)
+        service = Service(self._get_driver_path())
+        driver = webdriver.Chrome(service=service, options=self.chrome_options)
+        with self._lock:
+            self._driver_uses[driver] = 0
+        return driver
+
+    def _is_healthy(self, driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _discard_driver(self, driver):
+        with self._lock:
+            self._driver_uses.pop(driver, None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
     
     def _get_driver(self):
+        if self._closed:
+            raise RuntimeError('WebScraper is closed')
+        self._driver_slots.acquire()
         try:
-            driver = self.driver_pool.get_nowait()
-        except queue.Empty:
-            driver = self._create_driver()
-        return driver
+            while True:
+                try:
+                    driver = self.driver_pool.get_nowait()
+                except queue.Empty:
+                    return self._create_driver()
+                if self._is_healthy(driver):
+                    return driver
+                logging.debug('Discarding unresponsive WebDriver')
+                self._discard_driver(driver)
+        except Exception:
+            self._driver_slots.release()
+            raise
     
-    def _return_driver(self, driver):
-        self.driver_pool.put(driver)
+    def _return_driver(self, driver, healthy=True):
+        try:
+            with self._lock:
+                uses = self._driver_uses.get(driver, 0) + 1
+                self._driver_uses[driver] = uses
+            if not healthy or self._closed or uses >= self.max_uses:
+                self._discard_driver(driver)
+            else:
+                self.driver_pool.put(driver)
+        finally:
+            self._driver_slots.release()
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                driver = self.driver_pool.get_nowait()
+            except queue.Empty:
+                break
+            self._discard_driver(driver)
         
+    def get_page_source(self, url, wait_for=(By.ID, 'root'), timeout=10):
+        """Load url in a pooled browser and return the HTML once the wait_for locator is present."""
+        driver = self._get_driver()
+        healthy = True
+        try:
+            driver.get(url)
+            WebDriverWait(driver, timeout).until(EC.presence_of_element_located(wait_for))
+            return driver.page_source
+        except TimeoutException:
+            # The page loaded without the element; the browser itself is fine
+            raise
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            self._return_driver(driver, healthy=healthy)
+
     def get_symbols(self):
         driver = self._get_driver()
+        healthy = True
         try:
-            driver.get("https://www.mse.mk/en/stats/symbolhistory/TEL")
+            driver.get(SYMBOL_HISTORY_URL.format(symbol='TEL'))
             wait = WebDriverWait(driver, 10)
             wait.until(EC.presence_of_element_located((By.ID, "Code")))
             
@@ -77,14 +441,18 @@ class WebScraper:
                         })
             return symbols
             
+        except Exception:
+            healthy = False
+            raise
         finally:
-            self._return_driver(driver)
+            self._return_driver(driver, healthy=healthy)
             
     def _fetch_data_chunk(self, args):
         symbol, from_date, to_date = args
         driver = self._get_driver()
+        healthy = True
         try:
-            driver.get("https://www.mse.mk/en/stats/symbolhistory/TEL")
+            driver.get(SYMBOL_HISTORY_URL.format(symbol='TEL'))
             wait = WebDriverWait(driver, 10)
             
             from_date_input = wait.until(EC.presence_of_element_located((By.ID, "FromDate")))
@@ -106,95 +474,65 @@ class WebScraper:
                                     driver.find_element(By.CLASS_NAME, "no-results"))
             time.sleep(1)
             
-            html = driver.page_source
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            no_results = soup.find('div', {'class': 'no-results'})
-            if no_results and 'No data' in no_results.text:
-                logging.debug(f'No data found for {symbol} between {from_date} and {to_date}')
-                driver.quit()
-                return pd.DataFrame({
-                    'date': pd.date_range(from_date, to_date),
-                    'last_trade_price': 0,
-                    'max_price': 0,
-                    'min_price': 0,
-                    'avg_price': 0,
-                    'price_change': 0,
-                    'volume': 0,
-                    'turnover_best': 0,
-                    'total_turnover': 0
-                })
-            
-            table = soup.find('table', {'id': 'resultsTable'})
-            
-            headers = [
-                'date', 'last_trade_price', 'max_price', 'min_price', 
-                'avg_price', 'price_change', 'volume', 'turnover_best', 
-                'total_turnover'
-            ]
-            
-            if not table or not table.find('tbody').find_all('tr'):
-                date_range = pd.date_range(from_date, to_date)
-                df = pd.DataFrame({
-                    'date': date_range,
-                    'last_trade_price': 0,
-                    'max_price': 0,
-                    'min_price': 0,
-                    'avg_price': 0,
-                    'price_change': 0,
-                    'volume': 0,
-                    'turnover_best': 0,
-                    'total_turnover': 0
-                })
-                df['date'] = df['date'].dt.date
-                return df
-            
-            rows = []
-            for tr in table.find('tbody').find_all('tr'):
-                row = []
-                for td in tr.find_all('td'):
-                    value = td.text.strip().replace(',', '')
-                    row.append(value)
-                rows.append(row)
-                
-            df = pd.DataFrame(rows, columns=headers)
-            
-            df['date'] = pd.to_datetime(df['date']).dt.date
-            
-            numeric_columns = ['last_trade_price', 'max_price', 'min_price', 
-                              'avg_price', 'price_change', 'volume', 
-                              'turnover_best', 'total_turnover']
-            
-            for col in numeric_columns:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            return df
+            return parse_symbol_history(driver.page_source, symbol, from_date, to_date)
             
         except Exception as e:
             logging.error(f"Error in _fetch_data_chunk: {str(e)}")
-            driver.quit()
+            healthy = False
             raise
         finally:
-            try:
-                driver.quit()
-            except:
-                pass
+            self._return_driver(driver, healthy=healthy)
             
-    def get_stock_data(self, symbol, from_date, to_date):
+    def get_stock_data(self, symbol, from_date, to_date, raise_errors=False):
+        """Fetch a symbol's history; on failure return an empty history, or raise with raise_errors."""
         try:
             return self._fetch_data_chunk((symbol, from_date, to_date))
         except Exception as e:
+            if raise_errors:
+                raise
             logging.error(f"Error in get_stock_data: {str(e)}")
-            date_range = pd.date_range(from_date, to_date)
-            return pd.DataFrame({
-                'date': date_range,
-                'last_trade_price': 0,
-                'max_price': 0,
-                'min_price': 0,
-                'avg_price': 0,
-                'price_change': 0,
-                'volume': 0,
-                'turnover_best': 0,
-                'total_turnover': 0
-            })
\ No newline at end of file
+            return empty_symbol_history(from_date, to_date)
+
+
+class HttpScraper:
+    """Fetches symbol history by submitting the MSE form over plain HTTP.
+
+    Much cheaper than WebScraper: no browser is started and requests share
+    a pooled keep-alive session. Unlike WebScraper.get_stock_data, errors
+    are raised so callers can fall back to the Selenium scraper.
+    """
+
+    def __init__(self, max_workers=10, timeout=30):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = get_http_session(pool_size=max_workers)
+
+    def get_symbols(self):
+        response = self.session.get(SYMBOL_HISTORY_URL.format(symbol='TEL'), timeout=self.timeout)
+        response.raise_for_status()
+        soup = BeautifulSoup(response.text, 'lxml')
+        symbol_select = soup.find('select', {'id': 'Code'})
+        
+        symbols = []
+        if symbol_select:
+            for option in symbol_select.find_all('option'):
+                symbol = option['value']
+                if not any(char.isdigit() for char in symbol):
+                    symbols.append({
+                        'symbol': symbol,
+                        'name': option.text
+                    })
+        return symbols
+
+    def get_stock_data(self, symbol, from_date, to_date):
+        response = self.session.post(
+            SYMBOL_HISTORY_URL.format(symbol=symbol),
+            data={
+                'FromDate': from_date.strftime('%-m/%-d/%Y'),
+                'ToDate': to_date.strftime('%-m/%-d/%Y'),
+                'Code': symbol
+            },
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return parse_symbol_history(response.text, symbol, from_date, to_date)
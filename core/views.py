@@ -2,14 +2,15 @@ from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils import timezone
-from .models import Issuer, StockPrice, IssuerNews
+from .models import Issuer, StockPrice, IssuerNews, IssuerQuote
 import json
 from datetime import datetime, timedelta
 import numpy as np
 import pandas as pd
-from .technical_analysis import calculate_technical_indicators, generate_signals, get_consensus_signal
+from .technical_analysis import calculate_indicators, generate_signals, get_consensus_signal, signal_labels
+from .indicator_store import read_indicator_values, INDICATOR_PERIODS
 from .sentiment_analysis import get_news_sentiment_signal
-from .lstm_prediction import prepare_prediction
+from .lstm_prediction import prepare_prediction, forecast_issuers
 
 def home(request):
     return render(request, 'core/home.html')
@@ -32,10 +33,10 @@ def stock_detail(request, symbol):
     start_date = datetime(current_year, 1, 1).date()
     end_date = timezone.now().date()
     
-    prices = StockPrice.objects.filter(
+    prices = list(StockPrice.objects.filter(
         issuer=issuer,
         date__range=[start_date, end_date]
-    ).order_by('-date')
+    ).order_by('-date'))
     
     price_data = [
         {
@@ -53,135 +54,191 @@ def stock_detail(request, symbol):
     return render(request, 'core/stock_detail.html', {
         'issuer': issuer,
         'prices': json.dumps(price_data),
-        'last_price': prices.first()
+        'last_price': prices[0] if prices else None
     })
 
+MOVING_AVERAGES = ['sma', 'ema', 'wma', 'tema', 'kama']
+OSCILLATORS = ['rsi', 'stoch', 'cci', 'macd', 'willr']
+
+# Limits of ?periods=; indicator memory grows with period x rows x periods
+MAX_INDICATOR_PERIOD = 250
+MAX_PERIODS = 5
+
+PRICE_FIELDS = [
+    'date', 'last_trade_price', 'max_price', 'min_price', 'avg_price',
+    'price_change', 'volume', 'total_turnover'
+]
+
+def _json_column(values):
+    """Convert an array to a list of floats with NaN/inf mapped to None."""
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isfinite(values), values, None).tolist()
+
 def stock_data(request, symbol):
     issuer = get_object_or_404(Issuer, code=symbol)
     from_date = request.GET.get('from_date')
     to_date = request.GET.get('to_date')
     
+    periods = INDICATOR_PERIODS
+    if request.GET.get('periods'):
+        try:
+            periods = sorted({int(period) for period in request.GET['periods'].split(',')})
+        except ValueError:
+            periods = []
+        if not periods or min(periods) < 1 or max(periods) > MAX_INDICATOR_PERIOD or len(periods) > MAX_PERIODS:
+            return JsonResponse({
+                'message': f'periods must be a comma separated list of at most {MAX_PERIODS} '
+                           f'integers between 1 and {MAX_INDICATOR_PERIOD}'
+            }, status=400)
+    
     prices_query = StockPrice.objects.filter(issuer=issuer)
     
     if from_date and to_date:
         prices_query = prices_query.filter(
             date__range=[from_date, to_date]
-        ).order_by('-date')
+        )
     else:
         current_year = timezone.now().year
         start_date = datetime(current_year, 1, 1).date()
         end_date = timezone.now().date()
         prices_query = prices_query.filter(
             date__range=[start_date, end_date]
-        ).order_by('-date')
+        )
     
-    prices = prices_query.order_by('-date')
+    # One query; everything below works on columns of this frame
+    df = pd.DataFrame.from_records(
+        prices_query.order_by('-date').values_list(*PRICE_FIELDS),
+        columns=PRICE_FIELDS
+    )
     
-    if not prices.exists():
+    if df.empty:
         return JsonResponse({
             'prices': [],
             'last_price': None,
             'message': 'No data available for the selected period'
         })
     
+    last_row = df.iloc[0]
+    last_price_data = {
+        'date': last_row['date'].strftime('%Y-%m-%d'),
+        'last_trade_price': str(last_row['last_trade_price']),
+        'max_price': str(last_row['max_price']),
+        'min_price': str(last_row['min_price']),
+        'avg_price': str(last_row['avg_price']),
+        'price_change': str(last_row['price_change']),
+        'volume': int(last_row['volume']),
+        'total_turnover': str(last_row['total_turnover'])
+    }
+    
     # Convert to DataFrame for technical analysis
-    df = pd.DataFrame(list(prices.values()))
     df = df.rename(columns={
         'last_trade_price': 'close_price',
         'max_price': 'high',
         'min_price': 'low'
     })
     
-    # Calculate technical indicators for different periods
-    periods = [1, 5, 20]  # 1 day, 1 week, 1 month
-    indicators = calculate_technical_indicators(df, periods)
+    # Read precomputed indicators, computing them only when they are not stored yet
+    # (e.g. for periods requested with ?periods=10,50)
+    indicators = read_indicator_values(issuer, df['date'], periods)
+    if indicators is None:
+        # Indicators run in date order; rows are newest first
+        computed = calculate_indicators(df.iloc[::-1], MOVING_AVERAGES + OSCILLATORS, periods)
+        indicators = {
+            period: {name: values[::-1] for name, values in columns.items()}
+            for period, columns in computed.items()
+        }
+    else:
+        for period in periods:
+            indicators[period]['close_price'] = df['close_price'].astype(float)
     
-    # Generate signals for each period
+    # Generate signals for each period; codes become strings only in the response
     signals = {}
     consensus = {}
     for period in periods:
         signals[period] = generate_signals(indicators[period], period)
-        consensus[period] = get_consensus_signal(signals[period], period)
+        consensus[period] = signal_labels(get_consensus_signal(signals[period], period)).tolist()
     
-    def handle_nan(value):
-        if pd.isna(value) or np.isinf(value):
-            return None
-        if isinstance(value, float):
-            return float(value)
-        return value
+    columns = {
+        'date': pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d').tolist(),
+        'close_price': _json_column(df['close_price']),
+        'volume': df['volume'].astype(int).tolist(),
+        'max_price': _json_column(df['high']),
+        'min_price': _json_column(df['low']),
+        'avg_price': _json_column(df['avg_price']),
+        'price_change': _json_column(df['price_change'])
+    }
+    indicator_columns = {
+        period: {
+            name: _json_column(indicators[period][f'{name}_{period}'])
+            for name in MOVING_AVERAGES + OSCILLATORS
+        }
+        for period in periods
+    }
+    signal_columns = {
+        period: {
+            name: signal_labels(signals[period][f'{name}_signal_{period}']).tolist()
+            for name in MOVING_AVERAGES + OSCILLATORS
+        }
+        for period in periods
+    }
+    # Rows are newest first, so the current consensus is the first one
+    technical_analysis = {
+        period: {
+            'consensus': consensus[period][0]
+        }
+        for period in periods
+    }
     
-    price_data = [
-        {
-            'date': price.date.strftime('%Y-%m-%d'),
-            'close_price': float(price.last_trade_price),
-            'volume': price.volume,
-            'max_price': float(price.max_price),
-            'min_price': float(price.min_price),
-            'avg_price': float(price.avg_price),
-            'price_change': float(price.price_change),
+    if request.GET.get('format') == 'columns':
+        return JsonResponse({
+            'prices': columns,
             'technical_indicators': {
                 period: {
-                    'moving_averages': {
-                        'sma': handle_nan(indicators[period].iloc[i][f'sma_{period}']),
-                        'ema': handle_nan(indicators[period].iloc[i][f'ema_{period}']),
-                        'wma': handle_nan(indicators[period].iloc[i][f'wma_{period}']),
-                        'tema': handle_nan(indicators[period].iloc[i][f'tema_{period}']),
-                        'kama': handle_nan(indicators[period].iloc[i][f'kama_{period}'])
-                    },
-                    'oscillators': {
-                        'rsi': handle_nan(indicators[period].iloc[i][f'rsi_{period}']),
-                        'stoch': handle_nan(indicators[period].iloc[i][f'stoch_{period}']),
-                        'cci': handle_nan(indicators[period].iloc[i][f'cci_{period}']),
-                        'macd': handle_nan(indicators[period].iloc[i][f'macd_{period}']),
-                        'willr': handle_nan(indicators[period].iloc[i][f'willr_{period}'])
-                    },
-                    'signals': {
-                        'moving_averages': {
-                            'sma': signals[period].iloc[i][f'sma_signal_{period}'],
-                            'ema': signals[period].iloc[i][f'ema_signal_{period}'],
-                            'wma': signals[period].iloc[i][f'wma_signal_{period}'],
-                            'tema': signals[period].iloc[i][f'tema_signal_{period}'],
-                            'kama': signals[period].iloc[i][f'kama_signal_{period}']
-                        },
-                        'oscillators': {
-                            'rsi': signals[period].iloc[i][f'rsi_signal_{period}'],
-                            'stoch': signals[period].iloc[i][f'stoch_signal_{period}'],
-                            'cci': signals[period].iloc[i][f'cci_signal_{period}'],
-                            'macd': signals[period].iloc[i][f'macd_signal_{period}'],
-                            'willr': signals[period].iloc[i][f'willr_signal_{period}']
-                        },
-                        'consensus': consensus[period]
-                    }
+                    'values': indicator_columns[period],
+                    'signals': signal_columns[period],
+                    'consensus': consensus[period][0],
+                    'consensus_history': consensus[period]
                 }
                 for period in periods
+            },
+            'last_price': last_price_data,
+            'technical_analysis': technical_analysis
+        })
+    
+    def indicator_row(period, i):
+        values = indicator_columns[period]
+        period_signals = signal_columns[period]
+        return {
+            'moving_averages': {name: values[name][i] for name in MOVING_AVERAGES},
+            'oscillators': {name: values[name][i] for name in OSCILLATORS},
+            'signals': {
+                'moving_averages': {name: period_signals[name][i] for name in MOVING_AVERAGES},
+                'oscillators': {name: period_signals[name][i] for name in OSCILLATORS},
+                'consensus': consensus[period][i]
             }
         }
-        for i, price in enumerate(prices)
-    ]
     
-    last_price = prices.first()
-    last_price_data = None
-    if last_price:
-        last_price_data = {
-            'date': last_price.date.strftime('%Y-%m-%d'),
-            'last_trade_price': str(last_price.last_trade_price),
-            'max_price': str(last_price.max_price),
-            'min_price': str(last_price.min_price),
-            'avg_price': str(last_price.avg_price),
-            'price_change': str(last_price.price_change),
-            'volume': last_price.volume,
-            'total_turnover': str(last_price.total_turnover)
+    price_data = [
+        {
+            'date': columns['date'][i],
+            'close_price': columns['close_price'][i],
+            'volume': columns['volume'][i],
+            'max_price': columns['max_price'][i],
+            'min_price': columns['min_price'][i],
+            'avg_price': columns['avg_price'][i],
+            'price_change': columns['price_change'][i],
+            'technical_indicators': {
+                period: indicator_row(period, i)
+                for period in periods
+            }
         }
+        for i in range(len(df))
+    ]
     
     return JsonResponse({
         'prices': price_data,
         'last_price': last_price_data,
-        'technical_analysis': {
-            period: {
-                'consensus': consensus[period]
-            }
-            for period in periods
-        }
+        'technical_analysis': technical_analysis
     })
 
 def predict_view(request):
@@ -198,8 +255,12 @@ def predict_view(request):
         ).order_by('date').values_list('last_trade_price', flat=True)
         
         # Get latest price for sentiment prediction
-        latest_price = StockPrice.objects.filter(issuer=issuer).order_by('-date').first()
-        current_price = float(latest_price.last_trade_price)
+        quote = IssuerQuote.objects.filter(issuer=issuer).first()
+        if quote:
+            current_price = float(quote.last_price)
+        else:
+            latest_price = StockPrice.objects.filter(issuer=issuer).order_by('-date').first()
+            current_price = float(latest_price.last_trade_price)
         
         # Get news sentiment signal
         sentiment_signal, sentiment_confidence = get_news_sentiment_signal(issuer_code)
@@ -283,48 +344,32 @@ def about(request):
 def recommendations(request):
     recommendations = []
     
-    for issuer in Issuer.objects.all():
-        try:
-            latest_price = StockPrice.objects.filter(issuer=issuer).order_by('-date').first()
-            if not latest_price or not latest_price.last_trade_price:
-                continue
-                
-            # Get last month's first price for comparison
-            month_ago_price = StockPrice.objects.filter(
-                issuer=issuer,
-                date__lte=timezone.now() - timedelta(days=30)
-            ).order_by('-date').first()
-            
-            if not month_ago_price or not month_ago_price.last_trade_price:
-                continue
-                
-            # Convert to float and check for zero
-            latest_price_float = float(latest_price.last_trade_price)
-            month_ago_price_float = float(month_ago_price.last_trade_price)
-            
-            if month_ago_price_float == 0:
-                continue
-                
-            # Calculate monthly performance
-            monthly_change = ((latest_price_float - month_ago_price_float) / month_ago_price_float * 100)
-            
-            # Format volume with commas
-            volume = latest_price.volume if latest_price.volume else 0
-            formatted_volume = "{:,}".format(volume)
-            
-            recommendations.append({
-                'issuer': issuer,
-                'latest_price': latest_price,
-                'monthly_change': monthly_change,
-                'daily_change': float(latest_price.price_change) if latest_price.price_change else 0,
-                'volume': formatted_volume
-            })
-        except (ValueError, TypeError, ZeroDivisionError):
+    # Latest and month-ago prices are maintained in IssuerQuote on ingest
+    for quote in IssuerQuote.objects.select_related('issuer'):
+        monthly_change = quote.change_since('price_1m')
+        if monthly_change is None or not quote.last_price:
             continue
+        
+        recommendations.append({
+            'issuer': quote.issuer,
+            'latest_price': quote.last_price,
+            'monthly_change': monthly_change,
+            'daily_change': float(quote.price_change) if quote.price_change else 0,
+            'volume': "{:,}".format(quote.last_volume or 0)
+        })
     
     # Sort by monthly performance
     recommendations.sort(key=lambda x: x['monthly_change'], reverse=True)
+    recommendations = recommendations[:10]  # Show only top 10
+    
+    # One batched forecast for all shown issuers that have a trained model
+    forecasts = forecast_issuers([rec['issuer'].code for rec in recommendations], days_ahead=30)
+    for rec in recommendations:
+        forecast = forecasts.get(rec['issuer'].code)
+        if forecast is not None:
+            rec['forecast_price'] = float(forecast[-1])
+            rec['forecast_change'] = (rec['forecast_price'] / float(rec['latest_price']) - 1) * 100
     
     return render(request, 'core/recommendations.html', {
-        'recommendations': recommendations[:10]  # Show only top 10
+        'recommendations': recommendations
     })
\ No newline at end of file
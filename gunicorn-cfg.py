@@ -20,3 +20,22 @@ enable_stdio_inheritance = True
 worker_tmp_dir = '/dev/shm'
 preload_app = True
 preload = True
+
+def when_ready(server):
+    # Runs in the master after the app is preloaded and before workers are
+    # forked, so process-wide caches built here are shared by all workers
+    from django.db import connections
+    from core.sentiment_analysis import get_sentiment_analyzer
+    from core.lstm_prediction import get_predictor_registry, hot_symbols
+    try:
+        get_sentiment_analyzer()
+    except Exception as e:
+        server.log.warning(f'Sentiment analyzer not preloaded: {e}')
+    try:
+        loaded = get_predictor_registry().preload(hot_symbols())
+        server.log.info(f'Preloaded {loaded} price predictors')
+    except Exception as e:
+        server.log.warning(f'Price predictors not preloaded: {e}')
+    finally:
+        # Workers must open their own database connections
+        connections.close_all()
@@ -146,6 +146,16 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# NLTK data (the VADER sentiment lexicon) is read from this directory and is
+# never downloaded at runtime; fill it with
+# python -m nltk.downloader -d nltk_data vader_lexicon
+NLTK_DATA_DIR = os.environ.get('NLTK_DATA_DIR', str(BASE_DIR / 'nltk_data'))
+
+# Price prediction models written by train_price_predictor; each process keeps
+# up to PREDICTOR_CACHE_SIZE loaded predictors in memory
+TRAINED_MODELS_DIR = os.environ.get('TRAINED_MODELS_DIR', str(BASE_DIR / 'trained_models'))
+PREDICTOR_CACHE_SIZE = int(os.environ.get('PREDICTOR_CACHE_SIZE', 32))
+
 # Security settings
 CSRF_TRUSTED_ORIGINS = [
     "http://localhost:8000",